@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: compiled DeviceFilter vs the original per-call filters.
+
+Selects devices from the SPARC test configuration (replicated to get a
+realistic device count) with a few typical filter combinations, once with
+the original ``_matches_filters`` logic (copied below as
+``legacy_matches``) and once with a DeviceFilter compiled per query.
+
+Usage:
+    python benchmarks/bench_filters.py [--copies N] [--repeat N]
+"""
+
+import argparse
+import re
+import time
+from pathlib import Path
+
+import yaml
+
+from infn_ophyd_hal.device_filter import DeviceFilter
+
+CONFIG = Path(__file__).resolve().parent.parent / 'tests' / 'sparc_beamline.yaml'
+
+QUERIES = [
+    {'devgroup': 'mag'},
+    {'devgroup': 'mot', 'devtype': 'tml'},
+    {'name_pattern': r'^AC\dSOL'},
+    {'devgroup': 'vac', 'iocname': 'regex:^vac-(gun|ac\d)'},
+    {'devgroup': 'vac', 'iocname': ['gunvpc', 'ptlvpc']},
+]
+
+
+def legacy_matches(device_name, device_config, name_pattern=None, devtype=None,
+                   devgroup=None, **custom_filters):
+    """The filter logic of DeviceFactory._matches_filters before compilation."""
+    if name_pattern:
+        try:
+            if not re.search(name_pattern, device_name, re.IGNORECASE):
+                return False
+        except re.error:
+            return False
+    for key, pattern in (('devtype', devtype), ('devgroup', devgroup)):
+        if pattern:
+            value = device_config.get(key, '') or ''
+            try:
+                if not re.search(pattern, value, re.IGNORECASE):
+                    if value.lower() != pattern.lower():
+                        return False
+            except re.error:
+                if value.lower() != pattern.lower():
+                    return False
+    for key, value in custom_filters.items():
+        if value is None:
+            continue
+        config_value = device_config.get(key, '')
+        if not config_value:
+            return False
+        if not isinstance(config_value, str):
+            config_value = str(config_value)
+        if isinstance(value, str) and value.startswith('regex:'):
+            try:
+                if not re.search(value[6:], config_value, re.IGNORECASE):
+                    return False
+            except re.error:
+                return False
+        else:
+            try:
+                if isinstance(value, list):
+                    matched = False
+                    for v in value:
+                        if re.search(str(v), config_value, re.IGNORECASE):
+                            matched = True
+                            break
+                    if not matched:
+                        return False
+                if not re.search(str(value), config_value, re.IGNORECASE):
+                    if config_value.lower() != str(value).lower():
+                        return False
+            except re.error:
+                if config_value.lower() != str(value).lower():
+                    return False
+    return True
+
+
+def load_devices(copies):
+    """Return (name, merged_config) pairs the way the factory builds them."""
+    with open(CONFIG) as f:
+        config = yaml.safe_load(f)
+    devices = []
+    for copy in range(copies):
+        for ioc in config['epicsConfiguration']['iocs']:
+            if not ioc.get('devgroup'):
+                continue
+            for dev in ioc.get('devices') or [{'name': ioc['name']}]:
+                merged = ioc.copy()
+                merged['iocname'] = ioc['name']
+                merged.update(dev)
+                devices.append((f"{dev['name']}{copy}", merged))
+    return devices
+
+
+def bench(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--copies', type=int, default=10,
+                        help='replicate the SPARC config N times')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    devices = load_devices(args.copies)
+    print(f"{len(devices)} devices, best of {args.repeat}\n")
+    print(f"{'query':<50} {'legacy ms':>10} {'compiled ms':>12} {'speedup':>8} {'hits':>6}")
+
+    for query in QUERIES:
+        legacy_t, legacy = bench(
+            lambda: [n for n, c in devices if legacy_matches(n, c, **query)],
+            args.repeat)
+
+        def compiled_query():
+            selected = DeviceFilter(**query)
+            return [n for n, c in devices if selected.matches(n, c)]
+
+        compiled_t, compiled = bench(compiled_query, args.repeat)
+        note = '' if legacy == compiled else '  (legacy list handling differs)'
+        print(f"{str(query):<50} {legacy_t * 1e3:>10.2f} {compiled_t * 1e3:>12.2f} "
+              f"{legacy_t / compiled_t:>7.1f}x {len(compiled):>6}{note}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for the infn_ophyd_hal package.
+
+Each scenario runs in a fresh interpreter and is timed from process start
+to exit, best of N runs, next to a bare ``python -c pass`` baseline. The
+"everything" scenario touches every public name, which is what
+``import infn_ophyd_hal`` used to cost before names were loaded lazily.
+
+Usage:
+    python benchmarks/bench_import.py [--repeat N]
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+SCENARIOS = [
+    ('baseline (python -c pass)', 'pass'),
+    ('import infn_ophyd_hal', 'import infn_ophyd_hal'),
+    ('ChannelFinderClient', 'from infn_ophyd_hal import ChannelFinderClient'),
+    ('DeviceFilter + BeamlineIndex',
+     'from infn_ophyd_hal import DeviceFilter, BeamlineIndex'),
+    ('OphydMotorSim', 'from infn_ophyd_hal import OphydMotorSim'),
+    ('everything (eager import)',
+     'import infn_ophyd_hal as h\n'
+     'for n in h.__all__: getattr(h, n)'),
+]
+
+REPORT = "\nimport sys; print('ophyd' in sys.modules, 'epics' in sys.modules)"
+
+
+def run(code, repeat):
+    best = float('inf')
+    loaded = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', code + REPORT], check=True,
+                             capture_output=True, text=True).stdout
+        best = min(best, time.perf_counter() - start)
+        loaded = out.split()[-2:]
+    return best, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"best of {args.repeat}\n")
+    print(f"{'scenario':<32} {'ms':>8} {'ophyd':>6} {'epics':>6}")
+    for label, code in SCENARIOS:
+        elapsed, (ophyd, epics) = run(code, args.repeat)
+        print(f"{label:<32} {elapsed * 1e3:>8.1f} {ophyd:>6} {epics:>6}")
+
+
+if __name__ == '__main__':
+    main()
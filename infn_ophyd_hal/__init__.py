@@ -1,22 +1,85 @@
+"""
+INFN Ophyd HAL: Ophyd devices for EPIK8S beamlines.
 
-from .epik8s_device import epik8sDevice
-from .asyn_ophyd_motor import OphydAsynMotor, OphydMotorSim
-from .tml_ophyd_motor import OphydTmlMotor
-from .spp_ophyd_bpm import SppOphydBpm
-from .ophyd_ps import OphydPS, ophyd_ps_state, PowerSupplyFactory, PowerSupplyState
-from .ophyd_ps_sim import OphydPSSim
-from .ophyd_ps_dantemag import OphydPSDante
-from .unimag_ophyd_ps import OphydPSUnimag
-from .io_basic import OphydDI, OphydDO, OphydAI, OphydAO, OphydRTD
-from .vac_basic import OphydVPC, OphydVGC
-from .device_factory import DeviceFactory, create_devices_from_beamline_config
-from .channelfinder_client import ChannelFinderClient
-from .sim_devices import (
-    OphydBpmSim, OphydDISim, OphydDOSim, OphydAISim, OphydAOSim,
-    OphydRTDSim, OphydVPCSim, OphydVGCSim,
-)
-
-PowerSupplyFactory.register_type("sim", OphydPSSim)
-PowerSupplyFactory.register_type("dante", OphydPSDante)
-PowerSupplyFactory.register_type("unimag", OphydPSUnimag)
+Public names are imported on first access (PEP 562), so that
+``import infn_ophyd_hal`` does not pull in ophyd and pyepics until a
+device class is actually used; e.g. ``ChannelFinderClient`` or the
+configuration helpers can be used without any Channel Access setup.
+"""
 
+import importlib
+
+# Public name -> submodule defining it
+_LAZY_ATTRS = {
+    'epik8sDevice': '.epik8s_device',
+    'epik8sDeviceGroup': '.device_group',
+    'OphydAsynMotor': '.asyn_ophyd_motor',
+    'OphydMotorSim': '.asyn_ophyd_motor',
+    'OphydTmlMotor': '.tml_ophyd_motor',
+    'SppOphydBpm': '.spp_ophyd_bpm',
+    'OphydPS': '.ophyd_ps',
+    'ophyd_ps_state': '.ophyd_ps',
+    'PowerSupplyFactory': '.ophyd_ps',
+    'PowerSupplyState': '.ophyd_ps',
+    'OphydPSSim': '.ophyd_ps_sim',
+    'OphydPSDante': '.ophyd_ps_dantemag',
+    'OphydPSUnimag': '.unimag_ophyd_ps',
+    'OphydDI': '.io_basic',
+    'OphydDO': '.io_basic',
+    'OphydAI': '.io_basic',
+    'OphydAO': '.io_basic',
+    'OphydRTD': '.io_basic',
+    'OphydVPC': '.vac_basic',
+    'OphydVGC': '.vac_basic',
+    'DeviceFactory': '.device_factory',
+    'create_devices_from_beamline_config': '.device_factory',
+    'DeviceRegistry': '.device_registry',
+    'default_registry': '.device_registry',
+    'PlannedDevice': '.device_plan',
+    'save_plan': '.device_plan',
+    'load_plan': '.device_plan',
+    'BatchReading': '.batch_read',
+    'read_many': '.batch_read',
+    'Snapshot': '.save_restore',
+    'take_snapshot': '.save_restore',
+    'diff_snapshot': '.save_restore',
+    'restore_snapshot': '.save_restore',
+    'CallbackDispatcher': '.callback_dispatcher',
+    'default_dispatcher': '.callback_dispatcher',
+    'MetricsRegistry': '.metrics',
+    'default_metrics': '.metrics',
+    'PrometheusHttpExporter': '.metrics',
+    'PrometheusTextfileExporter': '.metrics',
+    'ConnectionReport': '.connection',
+    'LazyDevice': '.lazy_device',
+    'StartupProfile': '.profiling',
+    'ConfigView': '.config_view',
+    'DeviceFilter': '.device_filter',
+    'DeviceQuery': '.device_query',
+    'QuerySyntaxError': '.device_query',
+    'BeamlineIndex': '.beamline_index',
+    'ChannelFinderClient': '.channelfinder_client',
+    'OphydBpmSim': '.sim_devices',
+    'OphydDISim': '.sim_devices',
+    'OphydDOSim': '.sim_devices',
+    'OphydAISim': '.sim_devices',
+    'OphydAOSim': '.sim_devices',
+    'OphydRTDSim': '.sim_devices',
+    'OphydVPCSim': '.sim_devices',
+    'OphydVGCSim': '.sim_devices',
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
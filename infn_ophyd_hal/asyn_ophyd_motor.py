@@ -54,9 +54,11 @@ class OphydAsynMotor(epik8sDevice, EpicsMotor):
     motor_hlm = Cpt(EpicsSignal, '.HLM', kind='config')
     motor_llm = Cpt(EpicsSignal, '.LLM', kind='config')
 
+    _readback_signals = ('user_readback',)
+    _setpoint_signals = ('user_setpoint',)
+
     def __init__(self, prefix, *, read_attrs=None, configuration_attrs=None,
                  name=None, parent=None, poi=None, **kwargs):
-        kwargs.pop('config', None)
         if read_attrs is None:
             read_attrs = ['user_readback', 'user_setpoint']
         super().__init__(prefix, read_attrs=read_attrs,
@@ -85,10 +87,20 @@ class OphydMotorSim:
         self._homed = False
         self._egu = 'mm'
         self._precision = 3
+        self._set_soft_limits()
+
+    def _set_soft_limits(self):
         cfg = (self._config or {}).get('motor', {}) or {}
         self._low_limit = cfg.get('dllm', float('-inf'))
         self._high_limit = cfg.get('dhlm', float('inf'))
 
+    def reconfigure(self, config=None, poi=None, **kwargs):
+        """Apply a new configuration (see ``epik8sDevice.reconfigure``)."""
+        self._config = config
+        if poi is not None:
+            self.poi = poi
+        self._set_soft_limits()
+
     # ------------------------------------------------------------------
     # Properties aligned with PositionerBase / EpicsMotor
     # ------------------------------------------------------------------
@@ -0,0 +1,176 @@
+"""
+Batched reads of many devices.
+
+Reading an orbit one BPM at a time costs one CA round trip per signal.
+``read_many`` issues the CA gets of every requested signal of every
+device first, then collects the replies against one deadline, so the
+whole read takes about one round trip. Signals that are not connected are
+reported as failed straight away instead of each waiting for its own
+timeout.
+
+Example:
+    >>> reading = epik8sDevice.read_many(bpms, signals=['x', 'y', 'sum'], timeout=0.5)
+    >>> x, x_timestamps = reading.array('x')
+    >>> reading.failed
+    {'BPM07': ['x', 'y', 'sum']}
+"""
+
+import logging
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+class BatchReading(NamedTuple):
+    """Outcome of read_many()."""
+    keys: List[str]                                 # device keys, in request order
+    values: Dict[str, Dict[str, Dict[str, Any]]]    # key -> signal -> {'value', 'timestamp'}
+    failed: Dict[str, List[str]]                    # key -> signals not read
+    elapsed: float                                  # seconds spent reading
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def value(self, key: str, signal: str, default: Any = None) -> Any:
+        """Value read for one device signal (default if it was not read)."""
+        reading = self.values.get(key, {}).get(signal)
+        return default if reading is None else reading['value']
+
+    def array(self, signal: str, dtype=float) -> Tuple[Any, Any]:
+        """
+        A scalar signal of every device as numpy arrays, in key order.
+
+        Returns:
+            (values, timestamps); missing readings are NaN (requires numpy)
+        """
+        import numpy as np
+        values = np.full(len(self.keys), np.nan, dtype=dtype)
+        timestamps = np.full(len(self.keys), np.nan)
+        for pos, key in enumerate(self.keys):
+            reading = self.values.get(key, {}).get(signal)
+            if reading is not None:
+                values[pos] = reading['value']
+                timestamps[pos] = reading['timestamp']
+        return values, timestamps
+
+
+def _default_signals(device) -> List[str]:
+    return list(getattr(device, 'read_attrs', None) or ())
+
+
+def _lookup(device, attr: str):
+    obj = device
+    for part in attr.split('.'):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _channel(signal):
+    """pyepics channel id of an EpicsSignal, or None for other objects."""
+    pv = getattr(signal, '_read_pv', None)
+    return pv, getattr(pv, 'chid', None)
+
+
+def _read_local(obj) -> Tuple[Any, float]:
+    """Value and timestamp of a soft signal or plain attribute."""
+    get = getattr(obj, 'get', None)
+    if callable(get):
+        return get(), getattr(obj, 'timestamp', None) or time.time()
+    return (obj() if callable(obj) else obj), time.time()
+
+
+def read_many(devices: Union[Mapping, Iterable],
+              signals: Union[Sequence[str], Callable[[Any], Sequence[str]], None] = None,
+              timeout: float = 2.0,
+              log: Optional[logging.Logger] = None) -> BatchReading:
+    """
+    Read signals of many devices with one batch of CA requests.
+
+    Args:
+        devices: Dictionary of device key to device, or an iterable of
+                 devices (keyed by their name)
+        signals: Attribute names to read on every device, dotted for
+                 sub-devices, or a function returning the names for a
+                 device (optional, defaults to each device's read_attrs)
+        timeout: Overall deadline in seconds, for all devices together
+        log: Logger (optional)
+
+    Returns:
+        BatchReading with the values read and, per device, the signals that
+        were missing, disconnected or did not answer in time
+    """
+    from epics import ca
+
+    log = log or logger
+    if not isinstance(devices, Mapping):
+        devices = {getattr(device, 'name', None) or str(pos): device
+                   for pos, device in enumerate(devices)}
+    start = time.monotonic()
+    deadline = start + timeout
+    values: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    failed: Dict[str, List[str]] = {}
+    pending = []
+
+    def fail(key, attr):
+        failed.setdefault(key, []).append(attr)
+
+    if signals is None:
+        signals = _default_signals
+    # Issue every request before waiting for any reply
+    for key, device in devices.items():
+        values[key] = {}
+        for attr in (signals(device) if callable(signals) else signals):
+            try:
+                signal = _lookup(device, attr)
+            except AttributeError:
+                fail(key, attr)
+                continue
+            pv, chid = _channel(signal)
+            if chid is None:
+                try:
+                    value, timestamp = _read_local(signal)
+                except Exception as e:
+                    log.debug(f"Reading {key}.{attr} failed: {e}")
+                    fail(key, attr)
+                    continue
+                values[key][attr] = {'value': value, 'timestamp': timestamp}
+                continue
+            if not pv.connected:
+                fail(key, attr)
+                continue
+            try:
+                # pyepics keeps pending gets per field type: the reply is
+                # collected under the same (promoted) type it was asked for
+                ftype = ca.promote_type(chid, use_time=True)
+                ca.get_with_metadata(chid, ftype=ftype, wait=False)
+            except Exception as e:
+                log.debug(f"Reading {key}.{attr} failed: {e}")
+                fail(key, attr)
+                continue
+            pending.append((key, attr, chid, ftype))
+
+    if pending:
+        ca.flush_io()
+    for key, attr, chid, ftype in pending:
+        remaining = max(deadline - time.monotonic(), 1e-4)
+        try:
+            reply = ca.get_complete_with_metadata(chid, ftype=ftype, timeout=remaining)
+        except Exception as e:
+            log.debug(f"Reading {key}.{attr} failed: {e}")
+            reply = None
+        if reply is None or reply.get('value') is None:
+            fail(key, attr)
+            continue
+        values[key][attr] = {'value': reply['value'],
+                             'timestamp': reply.get('timestamp') or time.time()}
+
+    elapsed = time.monotonic() - start
+    if failed:
+        log.warning(
+            f"read_many: {sum(map(len, failed.values()))} signals of "
+            f"{len(failed)} devices not read in {elapsed:.3f}s"
+        )
+    return BatchReading(list(devices), values, failed, elapsed)
@@ -0,0 +1,324 @@
+"""
+Indexed view of a beamline configuration.
+
+The factory selects devices by walking ``epicsConfiguration.iocs`` and
+merging each IOC config with its device entries. BeamlineIndex does that
+walk once, keeps the resulting DeviceSpec records and builds hash indexes
+over them, so repeated lookups and queries on the same configuration run
+in constant or output-proportional time instead of rescanning the YAML.
+
+Example:
+    >>> index = BeamlineIndex(config, index_keys=['zone'])
+    >>> index.get('GUNFLG01').prefix
+    'SPARC:MOT:TML:GUNFLG01'
+    >>> [s.name for s in index.query(devgroup='mag', zone='beam1')]
+    ['QUAD01', 'QUAD02']
+    >>> devices = DeviceFactory().create_devices_from_config(index, devgroup='mot')
+"""
+
+import logging
+import threading
+from time import perf_counter
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from .config_loader import default_cache_dir, load_yaml
+from .device_filter import DeviceFilter
+from .config_view import ConfigView
+from .ioc_defaults import IocDefaults, ioc_defaults_of
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceSpec(NamedTuple):
+    """A device selected from the beamline configuration, not yet constructed."""
+    name: str
+    iocname: str
+    devgroup: str
+    devtype: Optional[str]
+    prefix: str
+    config: Mapping[str, Any]
+    multi: bool  # True if declared in the IOC 'devices' list
+
+
+def iter_device_specs(iocs: List[Dict], device_filter: Optional[DeviceFilter] = None,
+                      log: Optional[logging.Logger] = None,
+                      ioc_defaults: Optional[Dict] = None,
+                      profile=None) -> Iterator[DeviceSpec]:
+    """
+    Walk an IOC list and yield a DeviceSpec for every device that passes
+    the filter (all devices if no filter is given).
+
+    Each IOC is first merged over its iocDefaults template, if any.
+    Disabled IOCs and IOCs without a devgroup are skipped. Devices listed
+    under an IOC get their own entry deep-merged over the IOC config and
+    the 'iocname' key, as a ConfigView sharing the IOC mapping; an IOC
+    without a device list is a single device named after the IOC.
+
+    If a StartupProfile is given, merge and filter times are recorded in it.
+    """
+    log = log or logger
+    defaults = IocDefaults(ioc_defaults, log=log)
+    timed = profile is not None
+    for ioc_config in iocs:
+        ioc_name = ioc_config.get('name')
+        if not ioc_name:
+            continue
+
+        if timed:
+            start = perf_counter()
+        ioc_config = defaults.resolve_ioc(ioc_config)
+        if timed:
+            profile.add_ioc_merge(ioc_name, perf_counter() - start)
+
+        # Check if IOC is disabled
+        if ioc_config.get('disable', False):
+            log.debug(f"Skipping disabled IOC: {ioc_name}")
+            continue
+
+        # Get device group and type from IOC config
+        ioc_devgroup = ioc_config.get('devgroup')
+        ioc_devtype = ioc_config.get('devtype')
+
+        if not ioc_devgroup:
+            log.debug(f"IOC {ioc_name} has no devgroup, skipping")
+            continue
+
+        # Get IOC prefix for PV construction
+        ioc_prefix = ioc_config.get('iocprefix', '')
+
+        # Get devices list (for IOCs with multiple devices)
+        device_list = ioc_config.get('devices', [])
+
+        try:
+            if device_list:
+                for device_config in device_list:
+                    device_name = device_config.get('name')
+                    if not device_name:
+                        continue
+
+                    if timed:
+                        start = perf_counter()
+
+                    # Device config over the IOC config, sharing the IOC mapping
+                    merged_config = ConfigView(device_config, {'iocname': ioc_name},
+                                               ioc_config)
+
+                    if timed:
+                        merged = perf_counter()
+                        profile.add(ioc_name, device_name, 'merge', merged - start)
+
+                    # Apply filters
+                    passed = device_filter is None or device_filter.matches(device_name, merged_config)
+                    if timed:
+                        profile.add(ioc_name, device_name, 'filter', perf_counter() - merged)
+                    if not passed:
+                        log.debug(f"Device {device_name} filtered out")
+                        continue
+
+                    # Construct PV prefix
+                    if 'iocroot' in ioc_config:
+                        pv_prefix = f"{ioc_prefix}:{ioc_config['iocroot']}:{device_name}"
+                    else:
+                        pv_prefix = f"{ioc_prefix}:{device_name}"
+
+                    yield DeviceSpec(device_name, ioc_name, ioc_devgroup,
+                                     ioc_devtype, pv_prefix, merged_config,
+                                     True)
+            else:
+                # Single device IOC
+                if timed:
+                    start = perf_counter()
+                passed = device_filter is None or device_filter.matches(ioc_name, ioc_config)
+                if timed:
+                    profile.add(ioc_name, ioc_name, 'filter', perf_counter() - start)
+                if not passed:
+                    log.debug(f"Device {ioc_name} filtered out")
+                    continue
+
+                yield DeviceSpec(ioc_name, ioc_name, ioc_devgroup,
+                                 ioc_devtype, ioc_prefix, ioc_config, False)
+        except Exception as e:
+            log.error(
+                f"Failed to read device configuration of IOC {ioc_name}: {e}",
+                exc_info=True
+            )
+
+
+def _freeze(value):
+    """Hashable form of a filter value, used as query cache key."""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class BeamlineIndex:
+    """
+    Parsed beamline configuration with hash indexes on device metadata.
+
+    Indexes on the device name, 'iocname', 'devgroup' and 'devtype' are
+    built up front; any other configuration key (e.g. 'zone', 'location')
+    is indexed on first use or when listed in index_keys. The index is
+    read-only: build a new one when the configuration changes.
+
+    Args:
+        config: Beamline configuration dictionary (typically from values.yaml)
+        index_keys: Extra configuration keys to index immediately (optional)
+        log: Logger (optional)
+    """
+
+    BUILTIN_KEYS = ('name', 'iocname', 'devgroup', 'devtype')
+    MAX_CACHED_QUERIES = 1024
+
+    def __init__(self, config: Dict, index_keys: Iterable[str] = (),
+                 log: Optional[logging.Logger] = None):
+        self.logger = log or logger
+        self.config = config
+        iocs = (config or {}).get('epicsConfiguration', {}).get('iocs', []) or []
+        self.ioc_count = len(iocs)
+        self._specs: Tuple[DeviceSpec, ...] = tuple(iter_device_specs(
+            iocs, log=self.logger, ioc_defaults=ioc_defaults_of(config)))
+        self._by_ioc: Dict[str, List[int]] = {}
+        for pos, spec in enumerate(self._specs):
+            self._by_ioc.setdefault(spec.iocname, []).append(pos)
+        self._indexes: Dict[str, Dict[str, Tuple[int, ...]]] = {}
+        self._queries: Dict[tuple, Tuple[DeviceSpec, ...]] = {}
+        self._lock = threading.Lock()
+        for key in self.BUILTIN_KEYS + tuple(index_keys):
+            self._index(key)
+        self.logger.info(
+            f"Indexed {len(self._specs)} devices from {self.ioc_count} IOC configurations"
+        )
+
+    @classmethod
+    def from_file(cls, config_path: str, cache_dir: Optional[str] = None,
+                  **kwargs) -> 'BeamlineIndex':
+        """Load a beamline YAML file (through the config cache) and index it."""
+        if cache_dir is None:
+            cache_dir = default_cache_dir()
+        return cls(load_yaml(config_path, cache_dir=cache_dir), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def __iter__(self) -> Iterator[DeviceSpec]:
+        return iter(self._specs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index('name')
+
+    @property
+    def specs(self) -> Tuple[DeviceSpec, ...]:
+        """All devices, in configuration order."""
+        return self._specs
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _value(spec: DeviceSpec, key: str) -> str:
+        """Index key of a device for a config key; '' if missing or empty."""
+        value = spec.name if key == 'name' else spec.config.get(key)
+        if not value:
+            return ''
+        return value if isinstance(value, str) else str(value)
+
+    def _index(self, key: str) -> Dict[str, Tuple[int, ...]]:
+        index = self._indexes.get(key)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(key)
+                if index is None:
+                    buckets: Dict[str, List[int]] = {}
+                    for pos, spec in enumerate(self._specs):
+                        buckets.setdefault(self._value(spec, key), []).append(pos)
+                    index = {value: tuple(positions) for value, positions in buckets.items()}
+                    self._indexes[key] = index
+        return index
+
+    def values(self, key: str) -> List[str]:
+        """Distinct non-empty values of a configuration key."""
+        return [v for v in self._index(key) if v]
+
+    # ------------------------------------------------------------------
+    # Exact lookups
+    # ------------------------------------------------------------------
+
+    def _select(self, positions: Iterable[int]) -> List[DeviceSpec]:
+        return [self._specs[pos] for pos in positions]
+
+    def get(self, name: str) -> Optional[DeviceSpec]:
+        """First device with this name, or None."""
+        positions = self._index('name').get(name)
+        return self._specs[positions[0]] if positions else None
+
+    def lookup(self, key: str, value: Any) -> List[DeviceSpec]:
+        """Devices whose configuration value for key equals value exactly."""
+        value = value if isinstance(value, str) else str(value)
+        return self._select(self._index(key).get(value, ()))
+
+    def by_ioc(self, iocname: str) -> List[DeviceSpec]:
+        """Devices served by an IOC (including single device IOCs)."""
+        return self._select(self._by_ioc.get(iocname, ()))
+
+    def by_devgroup(self, devgroup: str) -> List[DeviceSpec]:
+        return self.lookup('devgroup', devgroup)
+
+    def by_devtype(self, devtype: str) -> List[DeviceSpec]:
+        return self.lookup('devtype', devtype)
+
+    # ------------------------------------------------------------------
+    # Filter queries
+    # ------------------------------------------------------------------
+
+    def query(self, name_pattern: Optional[str] = None,
+              devtype: Optional[str] = None,
+              devgroup: Optional[str] = None,
+              **custom_filters) -> List[DeviceSpec]:
+        """
+        Devices matching the DeviceFactory filters, in configuration order.
+
+        Takes the same arguments and applies the same matching rules as
+        DeviceFactory.create_devices_from_config. Each filter is evaluated
+        once per distinct indexed value rather than once per device, and
+        results are cached, so repeating a query is a dictionary lookup.
+        A where= query expression is evaluated on the indexes too: its
+        equality terms are hash lookups.
+        
+        Example:
+            >>> index.query(where='devgroup in (mag, mot) and not iocname =~ dante')
+        """
+        try:
+            cache_key = (name_pattern, devtype, devgroup,
+                         tuple(sorted((k, _freeze(v)) for k, v in custom_filters.items())))
+            cached = self._queries.get(cache_key)
+        except TypeError:
+            cache_key, cached = None, None
+        if cached is not None:
+            return list(cached)
+
+        device_filter = DeviceFilter(name_pattern, devtype, devgroup,
+                                     log=self.logger, **custom_filters)
+        positions = None
+        for key, match in device_filter.terms:
+            matched = set()
+            for value, bucket in self._index(key or 'name').items():
+                if match(value):
+                    matched.update(bucket)
+            positions = matched if positions is None else positions & matched
+            if not positions:
+                break
+        if device_filter.query is not None and positions != set():
+            matched = device_filter.query.positions(self._index, len(self._specs))
+            positions = matched if positions is None else positions & matched
+
+        if positions is None:
+            result = self._specs
+        else:
+            result = tuple(self._specs[pos] for pos in sorted(positions))
+
+        if cache_key is not None:
+            if len(self._queries) >= self.MAX_CACHED_QUERIES:
+                self._queries.clear()
+            self._queries[cache_key] = result
+        return list(result)
@@ -0,0 +1,235 @@
+"""
+Bounded, coalescing dispatcher for subscription callbacks.
+
+Ophyd runs subscription callbacks one after the other on its monitor
+dispatch thread. Device callbacks doing logging or state-machine work
+there delay every other monitor of the process when many devices update
+together. A CallbackDispatcher hands them to a small worker pool instead:
+
+- pending events are keyed per (signal, callback); a new event for a key
+  already waiting replaces it (coalesced), so a slow consumer only sees
+  the latest value;
+- callbacks of one device (a lane) never run concurrently and run in
+  arrival order, as they did on the ophyd thread;
+- at most ``max_pending`` keys wait; events for new keys beyond that are
+  dropped and counted.
+
+Example:
+    >>> dispatcher = default_dispatcher()
+    >>> signal.subscribe(dispatcher.wrap(self._on_change))
+    >>> dispatcher.stats()
+    DispatcherStats(pending=0, peak=12, submitted=5120, delivered=3302, coalesced=1818, ...)
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class DispatcherStats(NamedTuple):
+    """Counters of a CallbackDispatcher."""
+    pending: int        # events waiting (queue depth)
+    peak: int           # highest queue depth seen
+    running: int        # callbacks being run
+    submitted: int      # events received
+    delivered: int      # callbacks run
+    coalesced: int      # events replaced by a newer one before delivery
+    dropped: int        # events refused because the queue was full
+    errors: int         # callbacks that raised
+
+
+class _Event:
+    __slots__ = ('lane', 'callback', 'args', 'kwargs')
+
+    def __init__(self, lane, callback, args, kwargs):
+        self.lane = lane
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+
+
+class CallbackDispatcher:
+    """
+    Runs callbacks on a bounded worker pool, coalescing bursts per key.
+
+    Args:
+        max_workers: Worker threads (started on first use)
+        max_pending: Maximum number of keys waiting for delivery
+        name: Thread name prefix and metrics label
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 10000,
+                 name: str = 'callbacks'):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.name = name
+        self._cond = threading.Condition()
+        self._pending: 'OrderedDict[Hashable, _Event]' = OrderedDict()
+        self._running: Set[Hashable] = set()
+        self._threads: List[threading.Thread] = []
+        self._stopped = False
+        self._peak = 0
+        self._submitted = 0
+        self._delivered = 0
+        self._coalesced = 0
+        self._dropped = 0
+        self._errors = 0
+
+    # ------------------------------------------------------------------
+    # Submission
+    # ------------------------------------------------------------------
+
+    def submit(self, key: Hashable, callback: Callable, *args,
+               lane: Optional[Hashable] = None, **kwargs) -> bool:
+        """
+        Queue a callback, replacing the pending one of the same key.
+
+        Args:
+            key: Coalescing key
+            callback: Function to run
+            *args, **kwargs: Its arguments
+            lane: Callbacks of one lane run one at a time, in order
+                  (optional, defaults to the key)
+
+        Returns:
+            False if the event was dropped because the queue is full
+        """
+        event = _Event(key if lane is None else lane, callback, args, kwargs)
+        with self._cond:
+            self._submitted += 1
+            if self._stopped:
+                self._dropped += 1
+                return False
+            if key in self._pending:
+                self._pending[key] = event
+                self._coalesced += 1
+                return True
+            if len(self._pending) >= self.max_pending:
+                self._dropped += 1
+                if self._dropped == 1 or self._dropped % 1000 == 0:
+                    logger.warning(f"{self.name}: queue full ({self.max_pending}), "
+                                   f"{self._dropped} events dropped")
+                return False
+            self._pending[key] = event
+            self._peak = max(self._peak, len(self._pending))
+            if len(self._threads) < self.max_workers:
+                self._start_worker()
+            self._cond.notify()
+        return True
+
+    def wrap(self, callback: Callable, lane: Optional[Hashable] = None) -> Callable:
+        """
+        Subscription callback forwarding to ``callback`` through the pool.
+
+        Events are coalesced per emitting object (``obj`` keyword of ophyd
+        callbacks) and callback; the lane defaults to the object the
+        callback is bound to (the device).
+        """
+        if lane is None:
+            owner = getattr(callback, '__self__', None)
+            lane = id(owner if owner is not None else callback)
+        submit = self.submit
+
+        def dispatch(*args, **kwargs):
+            submit((id(kwargs.get('obj')), callback), callback, *args, lane=lane, **kwargs)
+
+        dispatch.__wrapped__ = callback
+        return dispatch
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _start_worker(self):
+        thread = threading.Thread(target=self._work, daemon=True,
+                                  name=f'{self.name}-{len(self._threads)}')
+        self._threads.append(thread)
+        thread.start()
+
+    def _next(self):
+        """Oldest pending event whose lane is idle (called with the lock held)."""
+        for key, event in self._pending.items():
+            if event.lane not in self._running:
+                del self._pending[key]
+                return event
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                event = self._next()
+                while event is None:
+                    if self._stopped and not self._pending:
+                        return
+                    self._cond.wait()
+                    event = self._next()
+                self._running.add(event.lane)
+            try:
+                event.callback(*event.args, **event.kwargs)
+            except Exception:
+                logger.exception(f"{self.name}: callback {event.callback!r} failed")
+                error = True
+            else:
+                error = False
+            with self._cond:
+                self._running.discard(event.lane)
+                self._delivered += 1
+                self._errors += error
+                # a lane freed may unblock its next event, and flush() waits
+                self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Control and metrics
+    # ------------------------------------------------------------------
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until no callback is pending or running; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._running,
+                                       timeout)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers once the pending callbacks have run."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def stats(self) -> DispatcherStats:
+        with self._cond:
+            return DispatcherStats(len(self._pending), self._peak, len(self._running),
+                                   self._submitted, self._delivered, self._coalesced,
+                                   self._dropped, self._errors)
+
+    def prometheus_lines(self, namespace: str = 'epik8s_dispatcher') -> List[str]:
+        """Stats in the Prometheus text format (see MetricsRegistry.add_collector)."""
+        stats = self.stats()._asdict()
+        label = f'{{dispatcher="{self.name}"}}'
+        lines = []
+        for field in DispatcherStats._fields:
+            kind = 'gauge' if field in ('pending', 'peak', 'running') else 'counter'
+            name = f'{namespace}_{field}' + ('_total' if kind == 'counter' else '')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name}{label} {stats[field]}')
+        return lines
+
+
+_default_dispatcher: Optional[CallbackDispatcher] = None
+_default_dispatcher_lock = threading.Lock()
+
+
+def default_dispatcher() -> CallbackDispatcher:
+    """The process-wide dispatcher used by the device subscriptions."""
+    global _default_dispatcher
+    with _default_dispatcher_lock:
+        if _default_dispatcher is None:
+            from .metrics import default_metrics
+            _default_dispatcher = CallbackDispatcher(name='device-callbacks')
+            default_metrics().add_collector(_default_dispatcher.prometheus_lines)
+        return _default_dispatcher
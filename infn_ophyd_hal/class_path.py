@@ -0,0 +1,31 @@
+"""
+Helpers for "module:Class" references.
+
+Classes are referred to by their import path wherever importing them
+up front would be wasteful (power supply registry) or where a class has
+to be stored outside the process.
+"""
+
+import importlib
+
+
+def class_path(cls: type) -> str:
+    """Return the "module:Qualname" reference of a class."""
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def import_class_path(path: str) -> type:
+    """
+    Import and return the object named by a "module:Qualname" reference.
+
+    Raises:
+        ValueError: If the reference is not of the form "module:name"
+        ImportError / AttributeError: If the module or name does not exist
+    """
+    module_name, sep, qualname = path.partition(':')
+    if not sep or not module_name or not qualname:
+        raise ValueError(f"Invalid class path '{path}', expected 'module:Class'")
+    obj = importlib.import_module(module_name)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+    return obj
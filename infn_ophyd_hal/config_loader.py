@@ -0,0 +1,108 @@
+"""
+Beamline YAML loading with an optional on-disk cache.
+
+Parsing uses the libyaml based ``CSafeLoader`` when PyYAML was built with
+it, and falls back to the pure-Python ``SafeLoader`` otherwise.
+
+When a cache directory is given (or set through the
+``INFN_OPHYD_HAL_CACHE_DIR`` environment variable) the parsed
+configuration is stored there as a pickle, keyed on the absolute file
+path. An entry is only used if the file modification time and the
+SHA-256 of its content both match, so edits invalidate it automatically;
+a warm start then reads and hashes the file but skips YAML parsing.
+
+The cache holds pickles: point it at a directory only the current user
+can write to.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_ENV = 'INFN_OPHYD_HAL_CACHE_DIR'
+CACHE_FORMAT = 1
+
+
+def default_cache_dir() -> Optional[str]:
+    """Cache directory from the environment, or None if caching is off."""
+    return os.environ.get(CACHE_DIR_ENV) or None
+
+
+def _cache_file(cache_dir: str, path: str) -> Path:
+    key = hashlib.sha1(path.encode('utf-8')).hexdigest()
+    return Path(cache_dir) / f"{key}.pickle"
+
+
+def _read_cache(cache_file: Path, header: tuple) -> Any:
+    """Return the cached config if its header matches, else None."""
+    try:
+        with open(cache_file, 'rb') as f:
+            if pickle.load(f) != header:
+                return None
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.debug(f"Ignoring unreadable config cache {cache_file}: {e}")
+        return None
+
+
+def _write_cache(cache_file: Path, header: tuple, config: Any):
+    """Atomically replace the cache entry; failures are only logged."""
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_file.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(config, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_file)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except Exception as e:
+        logger.warning(f"Could not write config cache {cache_file}: {e}")
+
+
+def load_yaml(config_path: str, cache_dir: Optional[str] = None) -> Any:
+    """
+    Parse a YAML file, using the parsed-config cache when enabled.
+
+    Args:
+        config_path: Path to the YAML file
+        cache_dir: Directory for cached parses; None disables the cache
+
+    Returns:
+        The parsed document
+    """
+    path = os.path.abspath(config_path)
+    with open(path, 'rb') as f:
+        data = f.read()
+        mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+
+    if not cache_dir:
+        return yaml.load(data, Loader=SafeLoader)
+
+    header = (CACHE_FORMAT, path, mtime_ns, hashlib.sha256(data).hexdigest())
+    cache_file = _cache_file(cache_dir, path)
+    config = _read_cache(cache_file, header)
+    if config is not None:
+        logger.debug(f"Loaded {path} from config cache {cache_file}")
+        return config
+
+    config = yaml.load(data, Loader=SafeLoader)
+    _write_cache(cache_file, header, config)
+    return config
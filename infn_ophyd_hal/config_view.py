@@ -0,0 +1,144 @@
+"""
+Copy-on-write chained configuration mappings.
+
+The configuration of a device is its own entry in the IOC ``devices``
+list, deep-merged over the IOC configuration, itself merged over its
+iocDefaults template. Building a merged dict for every device copies
+every IOC key once per device; a ConfigView instead chains the layers
+(device -> IOC -> defaults) and looks keys up through them, so all devices
+of an IOC share the IOC mapping.
+
+Lookups follow ``ioc_defaults.deep_merge``: the first layer holding a key
+wins, and nested mappings present in consecutive layers are merged (as a
+nested ConfigView). Writes go to a private copy of the first layer, made
+on the first write; the shared layers are never modified.
+
+Example:
+    >>> ioc = {'devgroup': 'mot', 'motor': {'dllm': -1000, 'dhlm': 1000}}
+    >>> view = ConfigView({'name': 'M1', 'motor': {'dllm': 0}}, ioc)
+    >>> view['motor']['dllm'], view['motor']['dhlm'], view['devgroup']
+    (0, 1000, 'mot')
+    >>> view['devgroup'] = 'vac'     # ioc is left unchanged
+"""
+
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Iterator
+
+
+class ConfigView(MutableMapping):
+    """
+    Mapping looking keys up through layers, highest priority first.
+
+    Args:
+        *layers: Mappings, the first one taking precedence
+    """
+
+    __slots__ = ('_layers', '_owned', '_shadowed', '_children')
+
+    def __init__(self, *layers: Mapping):
+        self._layers = list(layers) if layers else [{}]
+        self._owned = not layers
+        # Keys assigned or deleted here: lower layers no longer count
+        self._shadowed = None
+        # Nested views handed out, so that writes into them persist
+        self._children = None
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, key):
+        children = self._children
+        if children is not None:
+            child = children.get(key)
+            if child is not None:
+                return child
+        if self._shadowed is not None and key in self._shadowed:
+            layers = self._layers[:1]
+        else:
+            layers = self._layers
+        found = []
+        for layer in layers:
+            if key not in layer:
+                continue
+            value = layer[key]
+            if not isinstance(value, Mapping):
+                if found:
+                    break   # replaced by the mapping of a higher layer
+                return value
+            found.append(value)
+        if not found:
+            raise KeyError(key)
+        if self._children is None:
+            self._children = {}
+        return self._children.setdefault(key, ConfigView(*found))
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key) -> bool:
+        if self._shadowed is not None and key in self._shadowed:
+            return key in self._layers[0]
+        for layer in self._layers:
+            if key in layer:
+                return True
+        return False
+
+    def __iter__(self) -> Iterator:
+        # Keys in deep_merge order: lowest layer first, new keys appended
+        shadowed = self._shadowed or ()
+        layers = self._layers
+        seen = set()
+        for level in range(len(layers) - 1, -1, -1):
+            for key in layers[level]:
+                if key in seen or (level and key in shadowed):
+                    continue
+                seen.add(key)
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    # ------------------------------------------------------------------
+    # Copy on write
+    # ------------------------------------------------------------------
+
+    def _local(self) -> Dict:
+        if not self._owned:
+            self._layers[0] = dict(self._layers[0])
+            self._owned = True
+        return self._layers[0]
+
+    def _shadow(self, key):
+        if self._shadowed is None:
+            self._shadowed = set()
+        self._shadowed.add(key)
+        if self._children is not None:
+            self._children.pop(key, None)
+
+    def __setitem__(self, key, value):
+        self._local()[key] = value
+        self._shadow(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._local().pop(key, None)
+        self._shadow(key)
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict with the merged content (nested views converted too)."""
+        return {key: value.to_dict() if isinstance(value, ConfigView) else value
+                for key, value in self.items()}
+
+    copy = to_dict
+
+    def __repr__(self):
+        return f"ConfigView({self.to_dict()!r})"
@@ -0,0 +1,117 @@
+"""
+Bulk Channel Access connection handling.
+
+Devices created with ``defer_connect=True`` do not wait for their PVs in
+the constructor. ``wait_for_connection`` then waits for every signal of
+every device against one overall deadline: all CA searches run in
+parallel, so connecting a whole beamline takes about as long as the
+slowest IOC instead of the sum of all of them.
+"""
+
+import logging
+import time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionReport(NamedTuple):
+    """Outcome of a bulk connection wait."""
+    connected: List[str]          # device keys with every signal connected
+    failed: Dict[str, List[str]]  # device key -> PVs still disconnected
+    elapsed: float                # seconds spent waiting
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+def _is_built(device) -> bool:
+    # LazyDevice proxies that are not built yet connect on first use
+    return getattr(device, 'is_resolved', True) is not False
+
+
+def iter_signals(device) -> Iterator:
+    """Yield the leaf signals of an Ophyd device (nothing for other objects)."""
+    if not _is_built(device):
+        return
+    walk = getattr(device, 'walk_signals', None)
+    if walk is None:
+        return
+    for walk_item in walk():
+        yield walk_item.item
+
+
+def _pvname(signal) -> str:
+    return getattr(signal, 'pvname', None) or signal.name
+
+
+def wait_for_connection(devices: Dict[str, object], timeout: float = 5.0,
+                        poll_interval: float = 0.05,
+                        log: Optional[logging.Logger] = None,
+                        on_device_connected: Optional[Callable[[str], None]] = None
+                        ) -> ConnectionReport:
+    """
+    Wait until every signal of every device is connected or the deadline passes.
+
+    Devices whose signals all connected and that were built with
+    ``defer_connect=True`` then run the initial reads they skipped in
+    their constructor.
+
+    Args:
+        devices: Dictionary of device key to device
+        timeout: Overall deadline in seconds, for all devices together
+        poll_interval: Seconds between connection checks
+        log: Logger (optional)
+        on_device_connected: Called with the device key as soon as all
+                             its signals are seen connected (optional)
+
+    Returns:
+        ConnectionReport listing connected devices and, for the others,
+        the PVs that did not connect
+    """
+    log = log or logger
+    start = time.monotonic()
+    deadline = start + timeout
+
+    pending: Dict[str, List] = {}
+    for key, device in devices.items():
+        try:
+            pending[key] = list(iter_signals(device))
+        except Exception as e:
+            log.error(f"Cannot list signals of device {key}: {e}")
+            pending[key] = []
+
+    while True:
+        for key in list(pending):
+            signals = [s for s in pending[key] if not s.connected]
+            if signals:
+                pending[key] = signals
+            else:
+                del pending[key]
+                if on_device_connected is not None:
+                    on_device_connected(key)
+        if not pending or time.monotonic() >= deadline:
+            break
+        time.sleep(poll_interval)
+
+    connected = [key for key in devices if key not in pending]
+    for key in connected:
+        if not _is_built(devices[key]):
+            continue
+        finish = getattr(devices[key], '_finish_deferred_connect', None)
+        if finish is None:
+            continue
+        try:
+            finish()
+        except Exception as e:
+            log.error(f"Initial read of device {key} failed: {e}")
+
+    failed = {key: [_pvname(s) for s in signals] for key, signals in pending.items()}
+    elapsed = time.monotonic() - start
+    for key, pvs in failed.items():
+        log.warning(f"Device {key} not connected after {timeout}s: {', '.join(pvs)}")
+    log.info(
+        f"Connected {len(connected)}/{len(devices)} devices in {elapsed:.2f}s"
+    )
+    return ConnectionReport(connected, failed, elapsed)
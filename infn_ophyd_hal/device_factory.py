@@ -7,75 +7,147 @@ files (YAML format) and create instances of EPIK8S Ophyd devices based on
 the device group and type specified in the configuration.
 """
 
+import asyncio
 import logging
-import re
-import yaml
-from typing import Dict, Any, Optional, List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import lru_cache, partial
+from typing import AsyncIterator, Callable, Dict, Any, Mapping, Optional, List, Iterator, Tuple, Union
 from pathlib import Path
+from time import perf_counter
+
+from .beamline_index import BeamlineIndex, DeviceSpec, iter_device_specs
+from .class_path import class_path, import_class_path
+from .config_loader import default_cache_dir, load_yaml
+from .config_view import ConfigView
+from .connection import ConnectionReport, wait_for_connection
+from .device_filter import DeviceFilter
+from .device_plan import PlannedDevice
+from .device_registry import DeviceRegistry, default_registry
+from .ioc_defaults import ioc_defaults_of
+from .lazy_device import LazyDevice
+from .profiling import StartupProfile
+
+# Entry point group for device types of other packages, named 'devgroup.devtype':
+#   entry_points={'infn_ophyd_hal.devices': ['mot.mymotor = mypkg.motors:MyMotor']}
+DEVICE_ENTRY_POINT_GROUP = 'infn_ophyd_hal.devices'
+
+
+@lru_cache(maxsize=None)
+def device_entry_points() -> Tuple:
+    """Installed device type entry points (scanned once per process)."""
+    from importlib.metadata import entry_points
+    try:
+        return tuple(entry_points(group=DEVICE_ENTRY_POINT_GROUP))
+    except TypeError:  # Python < 3.10
+        return tuple(entry_points().get(DEVICE_ENTRY_POINT_GROUP, ()))
 
 
 class DeviceFactory:
     """Factory for creating EPIK8S Ophyd devices from configuration."""
     
-    def __init__(self):
-        """Initialize the device factory."""
+    # Default deadline in seconds of the bulk connection wait
+    CONNECTION_TIMEOUT = 5.0
+    
+    def __init__(self, cache_dir: Optional[str] = None, profile: bool = False,
+                 registry: Union[bool, DeviceRegistry, None] = None):
+        """
+        Initialize the device factory.
+        
+        Args:
+            cache_dir: Directory where parsed beamline configurations are
+                       cached between runs (optional, defaults to the
+                       INFN_OPHYD_HAL_CACHE_DIR environment variable;
+                       caching is off if neither is set)
+            profile: Record per-device start-up timings in
+                     startup_profile (optional). This changes how devices
+                     connect: create_devices_from_config and its async
+                     variant then always build with bulk_connect (unless
+                     lazy), so that the connect phase can be timed, and
+                     read every device once after connecting.
+            registry: Deduplicate devices through a DeviceRegistry
+                      (optional): True for the process-wide registry, or
+                      a DeviceRegistry instance. create_device() then
+                      returns the live instance already built for the same
+                      (class, prefix, config) instead of a new one.
+        """
         self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
         self._device_map = {}
+        self.last_connection_report: Optional[ConnectionReport] = None
+        self.startup_profile: Optional[StartupProfile] = StartupProfile() if profile else None
+        if registry is True:
+            registry = default_registry()
+        self.registry: Optional[DeviceRegistry] = \
+            registry if isinstance(registry, DeviceRegistry) else None
         self._register_device_types()
     
     def _register_device_types(self):
-        """Register all available EPIK8S device types."""
-        from .asyn_ophyd_motor import OphydAsynMotor, OphydMotorSim
-        from .tml_ophyd_motor import OphydTmlMotor
-        from .spp_ophyd_bpm import SppOphydBpm
-        from .ophyd_ps import OphydPS
-        from .ophyd_ps_sim import OphydPSSim
-        from .ophyd_ps_dantemag import OphydPSDante
-        from .unimag_ophyd_ps import OphydPSUnimag
-        from .io_basic import OphydDI, OphydDO, OphydAI, OphydAO, OphydRTD
-        from .vac_basic import OphydVPC, OphydVGC
-        from .sim_devices import (
-            OphydBpmSim, OphydDISim, OphydDOSim, OphydAISim, OphydAOSim,
-            OphydRTDSim, OphydVPCSim, OphydVGCSim,
-        )
+        """
+        Register all available EPIK8S device types.
+        
+        Classes are registered as "module:Class" references and imported on
+        first use (see _load_device_class), so a service that only creates
+        motors never imports the power supply or BPM modules. Device types
+        published by other packages under the DEVICE_ENTRY_POINT_GROUP entry
+        point group are added last and may override the built-in ones.
+        """
+        asyn_motor = 'infn_ophyd_hal.asyn_ophyd_motor:OphydAsynMotor'
+        tml_motor = 'infn_ophyd_hal.tml_ophyd_motor:OphydTmlMotor'
+        spp_bpm = 'infn_ophyd_hal.spp_ophyd_bpm:SppOphydBpm'
+        unimag_ps = 'infn_ophyd_hal.unimag_ophyd_ps:OphydPSUnimag'
 
         # Register motor devices — asyn motor is the default for mot group
-        self._device_map[('mot', 'asyn')] = OphydAsynMotor
-        self._device_map[('mot', 'generic')] = OphydAsynMotor
-        self._device_map[('mot', 'motor')] = OphydAsynMotor
-        self._device_map[('mot', 'tml')] = OphydTmlMotor
-        self._device_map[('mot', 'technosoft-asyn')] = OphydTmlMotor
-        self._device_map[('mot', 'sim')] = OphydMotorSim
+        self._device_map[('mot', 'asyn')] = asyn_motor
+        self._device_map[('mot', 'generic')] = asyn_motor
+        self._device_map[('mot', 'motor')] = asyn_motor
+        self._device_map[('mot', 'tml')] = tml_motor
+        self._device_map[('mot', 'technosoft-asyn')] = tml_motor
+        self._device_map[('mot', 'sim')] = 'infn_ophyd_hal.asyn_ophyd_motor:OphydMotorSim'
 
         # Register vacuum devices
-        self._device_map[('vac', 'ipcmini')] = OphydVPC
-        self._device_map[('vac', 'tpg300')] = OphydVGC
-        self._device_map[('vac', 'sim')] = OphydVPCSim
+        self._device_map[('vac', 'ipcmini')] = 'infn_ophyd_hal.vac_basic:OphydVPC'
+        self._device_map[('vac', 'tpg300')] = 'infn_ophyd_hal.vac_basic:OphydVGC'
+        self._device_map[('vac', 'sim')] = 'infn_ophyd_hal.sim_devices:OphydVPCSim'
 
         # Register BPM/diagnostic devices
-        self._device_map[('diag', 'bpm')] = SppOphydBpm
-        self._device_map[('diag', 'libera-spe')] = SppOphydBpm
-        self._device_map[('diag', 'libera-sppp')] = SppOphydBpm
-        self._device_map[('diag', 'sim')] = OphydBpmSim
+        self._device_map[('diag', 'bpm')] = spp_bpm
+        self._device_map[('diag', 'libera-spe')] = spp_bpm
+        self._device_map[('diag', 'libera-sppp')] = spp_bpm
+        self._device_map[('diag', 'sim')] = 'infn_ophyd_hal.sim_devices:OphydBpmSim'
 
         # Register power supply devices
-        self._device_map[('mag', 'sim')] = OphydPSSim
-        self._device_map[('mag', 'dante')] = OphydPSDante
-        self._device_map[('mag', 'unimag')] = OphydPSUnimag
-        self._device_map[('mag', 'generic')] = OphydPSUnimag
-        self._device_map[('mag', 'haz-ser')] = OphydPSUnimag
+        self._device_map[('mag', 'sim')] = 'infn_ophyd_hal.ophyd_ps_sim:OphydPSSim'
+        self._device_map[('mag', 'dante')] = 'infn_ophyd_hal.ophyd_ps_dantemag:OphydPSDante'
+        self._device_map[('mag', 'unimag')] = unimag_ps
+        self._device_map[('mag', 'generic')] = unimag_ps
+        self._device_map[('mag', 'haz-ser')] = unimag_ps
 
         # Register IO devices
-        self._device_map[('io', 'rtd')] = OphydRTD
-        self._device_map[('io', 'di')] = OphydDI
-        self._device_map[('io', 'do')] = OphydDO
-        self._device_map[('io', 'ai')] = OphydAI
-        self._device_map[('io', 'ao')] = OphydAO
-        self._device_map[('io', 'sim-rtd')] = OphydRTDSim
-        self._device_map[('io', 'sim-di')] = OphydDISim
-        self._device_map[('io', 'sim-do')] = OphydDOSim
-        self._device_map[('io', 'sim-ai')] = OphydAISim
-        self._device_map[('io', 'sim-ao')] = OphydAOSim
+        self._device_map[('io', 'rtd')] = 'infn_ophyd_hal.io_basic:OphydRTD'
+        self._device_map[('io', 'di')] = 'infn_ophyd_hal.io_basic:OphydDI'
+        self._device_map[('io', 'do')] = 'infn_ophyd_hal.io_basic:OphydDO'
+        self._device_map[('io', 'ai')] = 'infn_ophyd_hal.io_basic:OphydAI'
+        self._device_map[('io', 'ao')] = 'infn_ophyd_hal.io_basic:OphydAO'
+        self._device_map[('io', 'sim-rtd')] = 'infn_ophyd_hal.sim_devices:OphydRTDSim'
+        self._device_map[('io', 'sim-di')] = 'infn_ophyd_hal.sim_devices:OphydDISim'
+        self._device_map[('io', 'sim-do')] = 'infn_ophyd_hal.sim_devices:OphydDOSim'
+        self._device_map[('io', 'sim-ai')] = 'infn_ophyd_hal.sim_devices:OphydAISim'
+        self._device_map[('io', 'sim-ao')] = 'infn_ophyd_hal.sim_devices:OphydAOSim'
+
+        # Register device types of installed plugins
+        for entry_point in device_entry_points():
+            devgroup, sep, devtype = entry_point.name.partition('.')
+            if not sep or not devgroup or not devtype:
+                self.logger.warning(
+                    f"Ignoring device entry point '{entry_point.name}': "
+                    f"name must be 'devgroup.devtype'"
+                )
+                continue
+            self._device_map[(devgroup, devtype)] = entry_point
+            self.logger.debug(
+                f"Registered plugin device type {devgroup}/{devtype}: {entry_point.value}"
+            )
         
         self.logger.info(f"Registered {len(self._device_map)} device types")
     
@@ -86,14 +158,17 @@ class DeviceFactory:
         Args:
             devgroup: Device group (e.g., 'mot', 'diag', 'mag', 'io')
             devtype: Device type (e.g., 'tml', 'bpm', 'dante')
-            device_class: Ophyd device class to instantiate
+            device_class: Ophyd device class to instantiate, or its
+                          "module:Class" reference (imported on first use)
         """
         key = (devgroup, devtype)
         self._device_map[key] = device_class
         self.logger.info(f"Registered custom device type: {devgroup}/{devtype}")
     
     def create_device(self, devgroup: str, devtype: str, prefix: str, 
-                     name: str, config: Optional[Dict[str, Any]] = None) -> Optional[object]:
+                     name: str, config: Optional[Dict[str, Any]] = None,
+                     lazy: bool = False,
+                     defer_connect: bool = False) -> Optional[object]:
         """
         Create an Ophyd device instance.
         
@@ -103,26 +178,16 @@ class DeviceFactory:
             prefix: EPICS PV prefix
             name: Device name
             config: Additional configuration dictionary
+            lazy: Return a LazyDevice proxy that builds the device (and
+                  opens its CA channels) on first attribute access
+            defer_connect: Do not wait for the PVs in the constructor, for
+                           classes supporting it (epik8sDevice); see
+                           wait_for_connection()
             
         Returns:
-            Ophyd device instance or None if type not supported
+            Ophyd device instance (or LazyDevice proxy) or None if type not supported
         """
-        # Try device-specific devtype override first
-        device_specific_type = config.get('devtype') if config and isinstance(config, dict) else None
-        
-        device_class = None
-        if device_specific_type:
-            device_class = self._device_map.get((devgroup, device_specific_type))
-        
-        # Try exact devtype match if override not found
-        if not device_class:
-            key = (devgroup, devtype)
-            device_class = self._device_map.get(key)
-        
-        # Try with generic type if specific not found
-        if not device_class:
-            key = (devgroup, 'generic')
-            device_class = self._device_map.get(key)
+        device_class = self._resolve_device_class(devgroup, devtype, config)
         
         if not device_class:
             self.logger.warning(
@@ -131,21 +196,26 @@ class DeviceFactory:
             )
             return None
         
+        kwargs = self._device_kwargs(prefix, name, config)
+        if defer_connect and hasattr(device_class, '_defer_connect'):
+            kwargs['defer_connect'] = True
+        
+        if self.registry is not None:
+            return self.registry.get_or_create(
+                device_class, prefix, name, config,
+                partial(self._instantiate, device_class, kwargs, devgroup, devtype, lazy)
+            )
+        return self._instantiate(device_class, kwargs, devgroup, devtype, lazy)
+    
+    def _instantiate(self, device_class: type, kwargs: Dict[str, Any],
+                     devgroup: str, devtype: str, lazy: bool = False) -> Optional[object]:
+        """Instantiate device_class (or a LazyDevice proxy), None on failure."""
+        name = kwargs['name']
+        prefix = kwargs['prefix']
+        if lazy:
+            return LazyDevice(device_class, kwargs)
+        
         try:
-            # Prepare kwargs for device creation
-            kwargs = {
-                'prefix': prefix,
-                'name': name
-            }
-            
-            # Add config if provided
-            if config:
-                kwargs['config'] = config
-                
-                # Add POI (Points of Interest) for motors if available
-                if 'poi' in config or 'iocinit' in config:
-                    kwargs['poi'] = config.get('poi', config.get('iocinit', []))
-            
             # Create device instance
             device = device_class(**kwargs)
             
@@ -159,6 +229,68 @@ class DeviceFactory:
             )
             return None
     
+    def _resolve_device_class(self, devgroup: str, devtype: str,
+                              config: Optional[Dict[str, Any]] = None):
+        """Look up the device class for a devgroup/devtype pair, or None."""
+        # Try device-specific devtype override first
+        device_specific_type = config.get('devtype') if config and isinstance(config, Mapping) else None
+        
+        key = None
+        if device_specific_type and (devgroup, device_specific_type) in self._device_map:
+            key = (devgroup, device_specific_type)
+        
+        # Try exact devtype match if override not found
+        if key is None and (devgroup, devtype) in self._device_map:
+            key = (devgroup, devtype)
+        
+        # Try with generic type if specific not found
+        if key is None and (devgroup, 'generic') in self._device_map:
+            key = (devgroup, 'generic')
+        
+        return self._load_device_class(key) if key is not None else None
+    
+    def _load_device_class(self, key: Tuple[str, str]) -> Optional[type]:
+        """
+        Return the class registered under key, importing it on first use.
+        
+        Returns:
+            The device class, or None if it cannot be imported
+        """
+        device_class = self._device_map.get(key)
+        if device_class is None or isinstance(device_class, type):
+            return device_class
+        try:
+            if isinstance(device_class, str):
+                loaded = import_class_path(device_class)
+            else:
+                loaded = device_class.load()  # entry point
+        except Exception as e:
+            self.logger.error(
+                f"Cannot import device class for {key[0]}/{key[1]}: {e}"
+            )
+            return None
+        self._device_map[key] = loaded
+        return loaded
+    
+    @staticmethod
+    def _device_kwargs(prefix: str, name: str,
+                       config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Build the constructor keyword arguments for a device."""
+        kwargs = {
+            'prefix': prefix,
+            'name': name
+        }
+        
+        # Add config if provided
+        if config:
+            kwargs['config'] = config
+            
+            # Add POI (Points of Interest) for motors if available
+            if 'poi' in config or 'iocinit' in config:
+                kwargs['poi'] = config.get('poi', config.get('iocinit', []))
+        
+        return kwargs
+    
     def get_supported_types(self) -> List[tuple]:
         """
         Get list of supported (devgroup, devtype) combinations.
@@ -187,91 +319,21 @@ class DeviceFactory:
         
         Returns:
             True if device matches all specified filters, False otherwise
+        
+        Note:
+            This compiles the filters on every call; code selecting many
+            devices should build one DeviceFilter and reuse it.
         """
-        # Check name pattern
-        if name_pattern:
-            try:
-                if not re.search(name_pattern, device_name, re.IGNORECASE):
-                    return False
-            except re.error as e:
-                self.logger.warning(f"Invalid regex pattern '{name_pattern}': {e}")
-                return False
-        
-        # Check devtype
-        if devtype:
-            device_devtype = device_config.get('devtype', '')
-            try:
-                # Try as regex first
-                if not re.search(devtype, device_devtype, re.IGNORECASE):
-                    # Also try exact match (case-insensitive)
-                    if device_devtype.lower() != devtype.lower():
-                        return False
-            except re.error:
-                # If regex fails, do exact match
-                if device_devtype.lower() != devtype.lower():
-                    return False
-        
-        # Check devgroup
-        if devgroup:
-            device_devgroup = device_config.get('devgroup', '')
-            try:
-                # Try as regex first
-                if not re.search(devgroup, device_devgroup, re.IGNORECASE):
-                    # Also try exact match (case-insensitive)
-                    if device_devgroup.lower() != devgroup.lower():
-                        return False
-            except re.error:
-                # If regex fails, do exact match
-                if device_devgroup.lower() != devgroup.lower():
-                    return False
-        
-        # Check custom filters (e.g., zone, location, etc.)
-        for key, value in custom_filters.items():
-            if value is None:
-                continue
-            
-            config_value = device_config.get(key, '')
-            if not config_value:
-                return False
-            # Convert to string for comparison
-            if not isinstance(config_value, str):
-                config_value = str(config_value)
-            
-            # Check if value is a regex pattern (prefixed with 'regex:')
-            if isinstance(value, str) and value.startswith('regex:'):
-                pattern = value[6:]  # Remove 'regex:' prefix
-                try:
-                    if not re.search(pattern, config_value, re.IGNORECASE):
-                        return False
-                except re.error as e:
-                    self.logger.warning(f"Invalid regex pattern '{pattern}' for key '{key}': {e}")
-                    return False
-            else:
-                # Try regex match first
-                try:
-                    if isinstance(value, list):
-                        matched = False
-                        for v in value:
-                            if re.search(str(v), config_value, re.IGNORECASE):
-                                matched = True
-                                break
-                        if not matched:
-                            return False
-                    if not re.search(str(value), config_value, re.IGNORECASE):
-                        # Also try exact match (case-insensitive)
-                        if config_value.lower() != str(value).lower():
-                            return False
-                except re.error:
-                    # If regex fails, do exact match
-                    if config_value.lower() != str(value).lower():
-                        return False
-        
-        return True
+        return DeviceFilter(name_pattern, devtype, devgroup, log=self.logger,
+                            **custom_filters).matches(device_name, device_config)
     
     def load_beamline_config(self, config_path: str) -> Dict:
         """
         Load beamline configuration from YAML file.
         
+        Uses the libyaml parser when available and the parsed-config cache
+        when the factory has a cache_dir.
+        
         Args:
             config_path: Path to beamline YAML configuration file
             
@@ -279,32 +341,57 @@ class DeviceFactory:
             Configuration dictionary
         """
         try:
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
-                self.logger.info(f"Loaded beamline configuration from {config_path}")
-                return config
+            config = load_yaml(config_path, cache_dir=self.cache_dir)
+            self.logger.info(f"Loaded beamline configuration from {config_path}")
+            return config
         except Exception as e:
             self.logger.error(f"Failed to load configuration from {config_path}: {e}")
             raise
     
-    def create_devices_from_config(self, config: Dict,
+    def create_devices_from_config(self, config: Union[Dict, BeamlineIndex],
                                    name_pattern: Optional[str] = None,
                                    devtype: Optional[str] = None,
                                    devgroup: Optional[str] = None,
+                                   max_workers: Optional[int] = None,
+                                   max_per_ioc: Optional[int] = None,
+                                   lazy: bool = False,
+                                   bulk_connect: bool = False,
+                                   connection_timeout: Optional[float] = None,
                                    **custom_filters) -> Dict[str, object]:
         """
         Create Ophyd devices from beamline configuration with optional filtering.
         
         Args:
             config: Beamline configuration dictionary (typically from values.yaml)
+                    or a BeamlineIndex built from it
             name_pattern: Regex pattern to filter devices by name (optional)
             devtype: Filter by device type (exact match or regex) (optional)
             devgroup: Filter by device group (exact match or regex) (optional)
+            max_workers: Number of worker threads used to construct devices
+                         concurrently. None or 1 creates devices one after
+                         another (optional)
+            max_per_ioc: Maximum number of devices of the same IOC under
+                         construction at the same time, only used when
+                         max_workers > 1 (optional)
+            lazy: Return LazyDevice proxies that construct each device on
+                  first attribute access (optional)
+            bulk_connect: Construct devices without waiting for their PVs,
+                          then wait for all of them at once; the outcome
+                          is stored in last_connection_report (optional,
+                          ignored with lazy, always on when the factory
+                          was created with profile=True)
+            connection_timeout: Overall deadline in seconds for the bulk
+                                connection wait (optional, defaults to
+                                CONNECTION_TIMEOUT)
             **custom_filters: Additional filters (e.g., zone='beam1', location='hall')
-                             Prefix value with 'regex:' for regex matching
+                             Prefix value with 'regex:' for regex matching.
+                             where='<expression>' adds a boolean query
+                             expression (see device_query)
         
         Returns:
-            Dictionary mapping device names to Ophyd device instances
+            Dictionary mapping device names to Ophyd device instances.
+            The order and the name-conflict resolution do not depend on
+            max_workers.
             
         Examples:
             # Create only motors
@@ -317,17 +404,696 @@ class DeviceFactory:
             factory.create_devices_from_config(config, devgroup='mag', zone='beam1')
             
             # Create devices with names containing digits
-            factory.create_devices_from_config(config, name_pattern=r'\d+')
+            factory.create_devices_from_config(config, name_pattern=r'\\d+')
+            
+            # Magnets and motors of zone A, except those of Dante IOCs
+            factory.create_devices_from_config(
+                config, where='devgroup in (mag, mot) and zone =~ "^A" and not iocname =~ dante')
+
+            # Create everything with 16 threads, at most 2 per IOC
+            factory.create_devices_from_config(config, max_workers=16, max_per_ioc=2)
+            
+            # Connect to each device only when it is first used
+            factory.create_devices_from_config(config, lazy=True)
+            
+            # Connect all PVs in parallel, then check what failed
+            factory.create_devices_from_config(config, bulk_connect=True)
+            factory.last_connection_report.failed
         """
+        profile = self.startup_profile
+        start = perf_counter()
         devices = {}
+        specs = self._select_specs(config, name_pattern, devtype, devgroup,
+                                   **custom_filters)
+        if not specs:
+            return devices
+        
+        # Profiling times the connect phase, which needs the bulk wait
+        bulk_connect = (bulk_connect or profile is not None) and not lazy
+        build = partial(self._build_spec, defer_connect=True) if bulk_connect else None
+        built = self._build_specs(specs, max_workers, max_per_ioc, lazy, build)
+        
+        # Register in configuration order so that name conflicts are
+        # resolved the same way whatever the construction order was
+        for spec, ophyd_device in zip(specs, built):
+            if ophyd_device:
+                self._register_device(devices, spec, ophyd_device)
+        
+        self.logger.info(f"Created {len(devices)} Ophyd devices from configuration")
+        if bulk_connect:
+            report = self.wait_for_connection(devices, connection_timeout)
+            if profile is not None:
+                profile.time_first_get(devices, report.failed)
+        if profile is not None:
+            profile.wall_time += perf_counter() - start
+        return devices
+    
+    def iter_devices_from_config(self, config: Union[Dict, BeamlineIndex],
+                                 name_pattern: Optional[str] = None,
+                                 devtype: Optional[str] = None,
+                                 devgroup: Optional[str] = None,
+                                 max_workers: Optional[int] = None,
+                                 max_per_ioc: Optional[int] = None,
+                                 lazy: bool = False,
+                                 ordered: bool = False,
+                                 **custom_filters) -> Iterator[Tuple[str, object]]:
+        """
+        Create devices like create_devices_from_config, yielding each one
+        as soon as it is ready.
+        
+        Filters, options and keys are those of create_devices_from_config.
+        With max_workers > 1 devices are yielded in completion order; a
+        device whose key depends on an earlier device with the same name
+        waits for that one, so name conflicts resolve exactly as in
+        configuration order.
+        
+        Args:
+            config, name_pattern, devtype, devgroup, max_workers,
+            max_per_ioc, lazy, **custom_filters: As for
+                  create_devices_from_config
+            ordered: Yield in configuration order instead of completion
+                     order (optional)
+        
+        Yields:
+            (key, device) tuples
+        
+        Example:
+            for key, device in factory.iter_devices_from_config(config, max_workers=16):
+                gui.add_panel(key, device)
+        """
+        specs = self._select_specs(config, name_pattern, devtype, devgroup,
+                                   **custom_filters)
+        if not specs:
+            return
+        
+        if lazy or not (max_workers and max_workers > 1):
+            results = enumerate(self._build_specs(specs, lazy=lazy))
+        else:
+            results = self._build_concurrently(specs, max_workers, max_per_ioc)
+        
+        count = 0
+        for key, device in self._register_as_ready(specs, results, ordered):
+            count += 1
+            yield key, device
+        self.logger.info(f"Created {count} Ophyd devices from configuration")
+    
+    def _register_as_ready(self, specs: List[DeviceSpec],
+                           results: Iterator[Tuple[int, Optional[object]]],
+                           ordered: bool = False) -> Iterator[Tuple[str, object]]:
+        """
+        Register (index, device) results arriving in any order and yield
+        (key, device) pairs, with the keys configuration order would give.
+        """
+        register = self._key_assigner(specs, ordered)
+        for index, device in results:
+            yield from register(index, device)
+    
+    def _key_assigner(self, specs: List[DeviceSpec], ordered: bool = False
+                      ) -> Callable[[int, Optional[object]], List[Tuple[str, object]]]:
+        """
+        Return register(index, device), to be called once per spec in any
+        order; each call returns the (key, device) pairs that became final.
+        
+        The key of a device only depends on earlier devices that can claim
+        one of its candidate keys (its name, or '<iocname>_<name>'), so each
+        device waits for the previous claimant of each of those keys only.
+        With ordered, pairs are released in configuration order instead.
+        """
+        devices: Dict[str, object] = {}
+        ready: Dict[int, Optional[object]] = {}
+        
+        def register_one(index, device, released):
+            if device:
+                key = self._register_device(devices, specs[index], device)
+                if key is not None:
+                    released.append((key, device))
+        
+        if ordered:
+            next_index = 0
+            
+            def register_ordered(index, device):
+                nonlocal next_index
+                released = []
+                ready[index] = device
+                while next_index in ready:
+                    register_one(next_index, ready.pop(next_index), released)
+                    next_index += 1
+                return released
+            
+            return register_ordered
+        
+        waiting = [0] * len(specs)
+        dependents: List[List[int]] = [[] for _ in specs]
+        last_claimant: Dict[str, int] = {}
+        for index, spec in enumerate(specs):
+            candidates = [spec.name]
+            if spec.multi:
+                candidates.append(f"{spec.iocname}_{spec.name}")
+            previous = {last_claimant[k] for k in candidates if k in last_claimant}
+            waiting[index] = len(previous)
+            for earlier in previous:
+                dependents[earlier].append(index)
+            for k in candidates:
+                last_claimant[k] = index
+        
+        def register(index, device):
+            released = []
+            ready[index] = device
+            decidable = [index] if not waiting[index] else []
+            while decidable:
+                current = decidable.pop()
+                register_one(current, ready.pop(current), released)
+                for later in dependents[current]:
+                    waiting[later] -= 1
+                    if not waiting[later] and later in ready:
+                        decidable.append(later)
+            return released
+        
+        return register
+    
+    # ------------------------------------------------------------------
+    # asyncio API: blocking constructors and connection waits run in
+    # worker threads, so the event loop stays responsive
+    # ------------------------------------------------------------------
+    
+    async def create_device_async(self, devgroup: str, devtype: str, prefix: str,
+                                  name: str, config: Optional[Dict[str, Any]] = None,
+                                  lazy: bool = False,
+                                  defer_connect: bool = False,
+                                  timeout: Optional[float] = None) -> Optional[object]:
+        """
+        create_device() run in a worker thread.
+        
+        Args:
+            devgroup, devtype, prefix, name, config, lazy, defer_connect:
+                  As for create_device
+            timeout: Seconds to wait for the constructor (optional). On
+                     timeout None is returned; the constructor thread
+                     cannot be interrupted and its device is dropped.
+        
+        Returns:
+            Ophyd device instance (or LazyDevice proxy) or None
+        """
+        loop = asyncio.get_running_loop()
+        build = partial(self.create_device, devgroup, devtype, prefix, name,
+                        config, lazy, defer_connect)
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(None, build), timeout)
+        except asyncio.TimeoutError:
+            self.logger.error(f"Timed out after {timeout}s creating device {name}")
+            return None
+    
+    async def create_devices_from_config_async(self, config: Union[Dict, BeamlineIndex],
+                                               name_pattern: Optional[str] = None,
+                                               devtype: Optional[str] = None,
+                                               devgroup: Optional[str] = None,
+                                               max_workers: Optional[int] = None,
+                                               max_per_ioc: Optional[int] = None,
+                                               lazy: bool = False,
+                                               bulk_connect: bool = False,
+                                               connection_timeout: Optional[float] = None,
+                                               device_timeout: Optional[float] = None,
+                                               timeout: Optional[float] = None,
+                                               **custom_filters) -> Dict[str, object]:
+        """
+        create_devices_from_config() for asyncio applications.
+        
+        Configuration walk, constructors and the bulk connection wait run
+        in worker threads. Cancelling the calling task stops scheduling new
+        constructors.
+        
+        Args:
+            config, name_pattern, devtype, devgroup, max_per_ioc, lazy,
+            bulk_connect, connection_timeout, **custom_filters: As for
+                  create_devices_from_config
+            max_workers: Number of worker threads constructing devices
+                         (optional, None means one)
+            device_timeout: Seconds allowed per constructor; devices that
+                            take longer are logged and left out (optional)
+            timeout: Overall deadline in seconds (optional)
+        
+        Returns:
+            Dictionary mapping device names to Ophyd device instances, in
+            configuration order, as create_devices_from_config
+        
+        Raises:
+            asyncio.TimeoutError: If timeout expires
+        
+        Example:
+            devices = await factory.create_devices_from_config_async(
+                config, devgroup='mot', max_workers=16, timeout=60)
+        """
+        return await asyncio.wait_for(self._create_devices_async(
+            config, name_pattern, devtype, devgroup, max_workers, max_per_ioc,
+            lazy, bulk_connect, connection_timeout, device_timeout, custom_filters
+        ), timeout)
+    
+    async def _create_devices_async(self, config, name_pattern, devtype, devgroup,
+                                    max_workers, max_per_ioc, lazy, bulk_connect,
+                                    connection_timeout, device_timeout,
+                                    custom_filters) -> Dict[str, object]:
+        loop = asyncio.get_running_loop()
+        profile = self.startup_profile
+        start = perf_counter()
+        specs = await loop.run_in_executor(None, partial(
+            self._select_specs, config, name_pattern, devtype, devgroup, **custom_filters))
+        
+        # Profiling times the connect phase, which needs the bulk wait
+        bulk_connect = (bulk_connect or profile is not None) and not lazy
+        devices = {}
+        async for key, device in self._build_async(specs, max_workers, max_per_ioc, lazy,
+                                                   True, device_timeout, bulk_connect):
+            devices[key] = device
+        
+        self.logger.info(f"Created {len(devices)} Ophyd devices from configuration")
+        if bulk_connect and devices:
+            report = await loop.run_in_executor(
+                None, self.wait_for_connection, devices, connection_timeout)
+            if profile is not None:
+                await loop.run_in_executor(
+                    None, profile.time_first_get, devices, report.failed)
+        if profile is not None:
+            profile.wall_time += perf_counter() - start
+        return devices
+    
+    async def aiter_devices_from_config(self, config: Union[Dict, BeamlineIndex],
+                                        name_pattern: Optional[str] = None,
+                                        devtype: Optional[str] = None,
+                                        devgroup: Optional[str] = None,
+                                        max_workers: Optional[int] = None,
+                                        max_per_ioc: Optional[int] = None,
+                                        lazy: bool = False,
+                                        ordered: bool = False,
+                                        device_timeout: Optional[float] = None,
+                                        **custom_filters) -> AsyncIterator[Tuple[str, object]]:
+        """
+        iter_devices_from_config() as an async iterator.
         
+        Leaving the loop early, or cancelling the consuming task, stops
+        scheduling new constructors.
+        
+        Args:
+            config, name_pattern, devtype, devgroup, max_per_ioc, lazy,
+            ordered, **custom_filters: As for iter_devices_from_config
+            max_workers, device_timeout: As for
+                  create_devices_from_config_async
+        
+        Yields:
+            (key, device) tuples
+        
+        Example:
+            async for key, device in factory.aiter_devices_from_config(config, max_workers=16):
+                await gui.add_panel(key, device)
+        """
+        loop = asyncio.get_running_loop()
+        specs = await loop.run_in_executor(None, partial(
+            self._select_specs, config, name_pattern, devtype, devgroup, **custom_filters))
+        count = 0
+        async for item in self._build_async(specs, max_workers, max_per_ioc, lazy,
+                                            ordered, device_timeout):
+            count += 1
+            yield item
+        self.logger.info(f"Created {count} Ophyd devices from configuration")
+    
+    async def _build_async(self, specs: List[DeviceSpec],
+                           max_workers: Optional[int] = None,
+                           max_per_ioc: Optional[int] = None,
+                           lazy: bool = False,
+                           ordered: bool = False,
+                           device_timeout: Optional[float] = None,
+                           defer_connect: bool = False) -> AsyncIterator[Tuple[str, object]]:
+        """Build specs in worker threads, yielding (key, device) as keys become final."""
+        if not specs:
+            return
+        register = self._key_assigner(specs, ordered)
+        if lazy:
+            # Proxies are cheap to create, no need to leave the loop
+            for index, spec in enumerate(specs):
+                for item in register(index, self._build_spec(spec, lazy=True)):
+                    yield item
+            return
+        
+        loop = asyncio.get_running_loop()
+        workers = max(1, max_workers or 1)
+        executor = ThreadPoolExecutor(max_workers=workers,
+                                      thread_name_prefix='device-factory')
+        # Only as many constructors in flight as there are workers, so
+        # that none waits in the executor queue
+        in_flight = asyncio.Semaphore(workers)
+        ioc_limits: Dict[str, asyncio.Semaphore] = {}
+        
+        async def run(spec):
+            started = asyncio.Event()
+            
+            def construct():
+                loop.call_soon_threadsafe(started.set)
+                return self._build_spec(spec, False, defer_connect)
+            
+            future = loop.run_in_executor(executor, construct)
+            # device_timeout covers the constructor only: a worker may
+            # still be busy with a constructor that timed out before
+            try:
+                await started.wait()
+            except asyncio.CancelledError:
+                future.cancel()   # drop it if still queued
+                raise
+            try:
+                return await asyncio.wait_for(future, device_timeout)
+            except asyncio.TimeoutError:
+                self.logger.error(
+                    f"Timed out after {device_timeout}s creating device "
+                    f"{spec.name} of IOC {spec.iocname}"
+                )
+                return None
+        
+        async def build(index, spec):
+            if not max_per_ioc:
+                async with in_flight:
+                    return index, await run(spec)
+            # IOC slot first, so that devices of a busy IOC hold no worker
+            limit = ioc_limits.setdefault(spec.iocname, asyncio.Semaphore(max_per_ioc))
+            async with limit, in_flight:
+                return index, await run(spec)
+        
+        tasks = [asyncio.ensure_future(build(index, spec)) for index, spec in enumerate(specs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, device = await next_done
+                for item in register(index, device):
+                    yield item
+        finally:
+            # Cancelled tasks drop their constructors still queued in the executor
+            for task in tasks:
+                task.cancel()
+            executor.shutdown(wait=False)
+    
+    def reconcile(self, old_devices: Dict[str, object],
+                  new_config: Union[Dict, BeamlineIndex],
+                  name_pattern: Optional[str] = None,
+                  devtype: Optional[str] = None,
+                  devgroup: Optional[str] = None,
+                  max_workers: Optional[int] = None,
+                  max_per_ioc: Optional[int] = None,
+                  lazy: bool = False,
+                  **custom_filters) -> Dict[str, object]:
+        """
+        Update a device dictionary to a new beamline configuration.
+        
+        The new configuration is resolved into device plans (class, prefix
+        and merged config, under the same keys create_devices_from_config
+        would use) and compared with the existing devices:
+        
+        - same class, prefix and config: the device object is kept as is,
+          with its subscriptions and CA channels
+        - same class and prefix, different config: the device is kept and
+          reconfigured in place (its reconfigure() method if it has one,
+          otherwise its config is replaced)
+        - anything else: a new device is created
+        
+        Old devices that are not kept are destroyed.
+        
+        Args:
+            old_devices: Dictionary returned by a previous create_devices_*
+                         or reconcile call
+            new_config: New beamline configuration dictionary or BeamlineIndex
+            name_pattern, devtype, devgroup, max_workers, max_per_ioc,
+            lazy, **custom_filters: As for create_devices_from_config,
+                  applied to the new configuration
+        
+        Returns:
+            Dictionary mapping device names to devices for the new
+            configuration
+        
+        Example:
+            devices = factory.create_devices_from_file('values.yaml')
+            ...
+            devices = factory.reconcile(devices, factory.load_beamline_config('values.yaml'))
+        """
+        specs = self._select_specs(new_config, name_pattern, devtype, devgroup,
+                                   **custom_filters)
+        
+        keys = {}
+        kept = {}
+        reconfigured = []
+        to_build = []
+        for index, spec in enumerate(specs):
+            device_key = self._device_key(keys, spec)
+            if device_key is None:
+                continue
+            keys[device_key] = index
+            old = old_devices.get(device_key)
+            if old is None:
+                to_build.append(index)
+                continue
+            device_class = self._resolve_device_class(spec.devgroup, spec.devtype,
+                                                      spec.config)
+            if (device_class is None or self._device_class_of(old) is not device_class
+                    or getattr(old, 'prefix', None) != spec.prefix):
+                to_build.append(index)
+                continue
+            if getattr(old, '_config', None) != spec.config:
+                try:
+                    self._reconfigure_device(old, spec)
+                except Exception as e:
+                    self.logger.warning(
+                        f"Failed to reconfigure device {device_key}, recreating it: {e}"
+                    )
+                    to_build.append(index)
+                    continue
+                reconfigured.append(device_key)
+            kept[index] = old
+        
+        kept_ids = {id(device) for device in kept.values()}
+        removed = [key for key, device in old_devices.items()
+                   if device is not None and id(device) not in kept_ids]
+        for key in removed:
+            self._destroy_device(key, old_devices[key])
+        
+        built = dict(zip(to_build,
+                         self._build_specs([specs[i] for i in to_build],
+                                           max_workers, max_per_ioc, lazy)))
+        
+        devices = {}
+        for index, spec in enumerate(specs):
+            device = kept[index] if index in kept else built.get(index)
+            if device:
+                self._register_device(devices, spec, device)
+        
+        self.logger.info(
+            f"Reconciled devices: {len(kept) - len(reconfigured)} unchanged, "
+            f"{len(reconfigured)} reconfigured, {len(to_build)} created, "
+            f"{len(removed)} destroyed"
+        )
+        return devices
+    
+    def plan(self, config: Union[Dict, BeamlineIndex],
+             name_pattern: Optional[str] = None,
+             devtype: Optional[str] = None,
+             devgroup: Optional[str] = None,
+             **custom_filters) -> List[PlannedDevice]:
+        """
+        Resolve the devices a configuration would create, without creating them.
+        
+        Filtering, config merging, class lookup and name-conflict handling
+        are done as in create_devices_from_config. The result only holds
+        plain data and can be saved with save_plan() and built later,
+        possibly in another process, with build().
+        
+        Args:
+            config: Beamline configuration dictionary or BeamlineIndex
+            name_pattern, devtype, devgroup, **custom_filters: As for
+                  create_devices_from_config
+        
+        Returns:
+            List of PlannedDevice records in configuration order
+        """
+        specs = self._select_specs(config, name_pattern, devtype, devgroup,
+                                   **custom_filters)
+        plan = []
+        keys = set()
+        for spec in specs:
+            device_class = self._resolve_device_class(spec.devgroup, spec.devtype,
+                                                      spec.config)
+            if not device_class:
+                self.logger.warning(
+                    f"No device class registered for {spec.devgroup}/{spec.devtype}, "
+                    f"device {spec.name} will not be created"
+                )
+                continue
+            device_key = self._device_key(keys, spec)
+            if device_key is None:
+                self.logger.error(
+                    f"Renamed device key '{spec.iocname}_{spec.name}' also exists. "
+                    f"Skipping device creation for {spec.name} in IOC {spec.iocname}."
+                )
+                continue
+            keys.add(device_key)
+            # Plain merged dict: a ConfigView would pickle the IOC layers
+            config = spec.config
+            if isinstance(config, ConfigView):
+                config = config.to_dict()
+            kwargs = self._device_kwargs(spec.prefix, spec.name, config)
+            del kwargs['prefix'], kwargs['name']
+            plan.append(PlannedDevice(device_key, spec.name, class_path(device_class),
+                                      spec.prefix, kwargs, spec.iocname))
+        
+        self.logger.info(f"Planned {len(plan)} Ophyd devices from configuration")
+        return plan
+    
+    def build(self, plan: List[PlannedDevice],
+              max_workers: Optional[int] = None,
+              max_per_ioc: Optional[int] = None,
+              lazy: bool = False,
+              bulk_connect: bool = False,
+              connection_timeout: Optional[float] = None) -> Dict[str, object]:
+        """
+        Create the devices of a plan returned by plan() or load_plan().
+        
+        Args:
+            plan: List of PlannedDevice records
+            max_workers, max_per_ioc, lazy, bulk_connect, connection_timeout:
+                  As for create_devices_from_config
+        
+        Returns:
+            Dictionary mapping the planned keys to Ophyd device instances;
+            devices that fail to build are left out
+        """
+        classes = {class_path(cls): cls for cls in self._device_map.values()
+                   if isinstance(cls, type)}
+        bulk_connect = bulk_connect and not lazy
+        
+        def build_planned(item: PlannedDevice, lazy: bool = False):
+            try:
+                device_class = classes.get(item.class_path) or \
+                    import_class_path(item.class_path)
+            except Exception as e:
+                self.logger.error(
+                    f"Cannot import {item.class_path} for device {item.name}: {e}"
+                )
+                return None
+            kwargs = dict(item.kwargs, prefix=item.prefix, name=item.name)
+            if bulk_connect and hasattr(device_class, '_defer_connect'):
+                kwargs['defer_connect'] = True
+            
+            def instantiate():
+                if lazy:
+                    return LazyDevice(device_class, kwargs)
+                try:
+                    return device_class(**kwargs)
+                except Exception as e:
+                    self.logger.error(
+                        f"Failed to create device {item.name} ({item.class_path}): {e}",
+                        exc_info=True
+                    )
+                    return None
+            
+            if self.registry is not None:
+                return self.registry.get_or_create(
+                    device_class, item.prefix, item.name, item.kwargs.get('config'),
+                    instantiate
+                )
+            return instantiate()
+        
+        devices = {}
+        built = self._build_specs(plan, max_workers, max_per_ioc, lazy, build_planned)
+        for item, ophyd_device in zip(plan, built):
+            if ophyd_device:
+                devices[item.key] = ophyd_device
+                self.logger.info(
+                    f"Created device: {item.key} ({item.iocname} {item.class_path} "
+                    f"prefix={item.prefix})"
+                )
+        
+        self.logger.info(f"Created {len(devices)} Ophyd devices from plan")
+        if bulk_connect:
+            self.wait_for_connection(devices, connection_timeout)
+        return devices
+    
+    def wait_for_connection(self, devices: Dict[str, object],
+                            timeout: Optional[float] = None) -> ConnectionReport:
+        """
+        Wait for all signals of all devices against a single deadline.
+        
+        Devices built with bulk_connect run their deferred initial reads
+        once connected. Can be called again to retry devices that did not
+        connect.
+        
+        Args:
+            devices: Dictionary of devices, e.g. from create_devices_from_config
+            timeout: Overall deadline in seconds (optional, defaults to
+                     CONNECTION_TIMEOUT)
+        
+        Returns:
+            ConnectionReport, also stored in last_connection_report
+        """
+        if timeout is None:
+            timeout = self.CONNECTION_TIMEOUT
+        profile = self.startup_profile
+        if profile is None:
+            report = wait_for_connection(devices, timeout, log=self.logger)
+        else:
+            profile.connect_started()
+            report = wait_for_connection(devices, timeout, poll_interval=0.01,
+                                         log=self.logger,
+                                         on_device_connected=profile.connected)
+        self.last_connection_report = report
+        return report
+    
+    @staticmethod
+    def _device_class_of(device) -> type:
+        """Class of a device, without resolving LazyDevice proxies."""
+        if isinstance(device, LazyDevice):
+            return device.device_class
+        return type(device)
+    
+    def _reconfigure_device(self, device, spec: DeviceSpec):
+        """Apply a new configuration to an existing device in place."""
+        kwargs = self._device_kwargs(spec.prefix, spec.name, spec.config)
+        kwargs.pop('prefix')
+        kwargs.pop('name')
+        kwargs.setdefault('config', None)
+        if 'poi' not in kwargs and 'poi' in self._device_kwargs(
+                spec.prefix, spec.name, getattr(device, '_config', None)):
+            # The device was built with POIs that are gone now
+            kwargs['poi'] = []
+        reconfigure = getattr(type(device), 'reconfigure', None)
+        if callable(reconfigure):
+            device.reconfigure(**kwargs)
+            return
+        device._config = kwargs['config']
+        if 'poi' in kwargs and hasattr(device, 'poi'):
+            device.poi = kwargs['poi']
+    
+    def _destroy_device(self, key: str, device):
+        """Release an old device dropped by reconcile."""
+        if isinstance(device, LazyDevice) and not device.is_resolved:
+            return
+        destroy = getattr(device, 'destroy', None)
+        if not callable(destroy):
+            return
+        try:
+            destroy()
+        except Exception as e:
+            self.logger.warning(f"Failed to destroy device {key}: {e}")
+    
+    def _select_specs(self, config: Union[Dict, BeamlineIndex],
+                      name_pattern: Optional[str] = None,
+                      devtype: Optional[str] = None,
+                      devgroup: Optional[str] = None,
+                      **custom_filters) -> List[DeviceSpec]:
+        """Return the DeviceSpecs of the configuration that pass the filters."""
         # Get IOC configurations
-        epics_config = config.get('epicsConfiguration', {})
-        iocs = epics_config.get('iocs', [])
+        if isinstance(config, BeamlineIndex):
+            iocs = None
+            ioc_count = config.ioc_count
+        else:
+            epics_config = config.get('epicsConfiguration', {})
+            iocs = epics_config.get('iocs', [])
+            ioc_count = len(iocs)
         
-        if not iocs:
+        if not ioc_count:
             self.logger.warning("No IOCs found in configuration")
-            return devices
+            return []
         
         # Log filter information
         if name_pattern or devtype or devgroup or custom_filters:
@@ -342,126 +1108,166 @@ class DeviceFactory:
                 filter_info.append(f"{key}='{value}'")
             self.logger.info(f"Applying filters: {', '.join(filter_info)}")
         
-        self.logger.info(f"Processing {len(iocs)} IOC configurations...")
+        self.logger.info(f"Processing {ioc_count} IOC configurations...")
         
-        for ioc_config in iocs:
-            ioc_name = ioc_config.get('name')
-            if not ioc_name:
-                continue
-            
-            # Check if IOC is disabled
-            if ioc_config.get('disable', False):
-                self.logger.debug(f"Skipping disabled IOC: {ioc_name}")
-                continue
-            
-            # Get device group and type from IOC config
-            ioc_devgroup = ioc_config.get('devgroup')
-            ioc_devtype = ioc_config.get('devtype')
-            
-            if not ioc_devgroup:
-                self.logger.debug(f"IOC {ioc_name} has no devgroup, skipping")
-                continue
-            
-            # Get IOC prefix for PV construction
-            ioc_prefix = ioc_config.get('iocprefix', '')
-            
-            # Get devices list (for IOCs with multiple devices)
-            device_list = ioc_config.get('devices', [])
+        if iocs is None:
+            specs = config.query(name_pattern, devtype, devgroup, **custom_filters)
+        else:
+            specs = list(self._iter_device_specs(iocs, name_pattern, devtype,
+                                                 devgroup, ioc_defaults_of(config),
+                                                 **custom_filters))
+        if self.startup_profile is not None:
+            for spec in specs:
+                self.startup_profile.selected(spec)
+        return specs
+    
+    def _iter_device_specs(self, iocs: List[Dict],
+                           name_pattern: Optional[str] = None,
+                           devtype: Optional[str] = None,
+                           devgroup: Optional[str] = None,
+                           ioc_defaults: Optional[Dict] = None,
+                           **custom_filters) -> Iterator[DeviceSpec]:
+        """
+        Walk the IOC list and yield a DeviceSpec for every device that
+        passes the filters. No device is constructed here.
+        
+        ioc_defaults is the iocDefaults template mapping the IOC configs
+        are merged over.
+        """
+        device_filter = DeviceFilter(name_pattern, devtype, devgroup,
+                                     log=self.logger, **custom_filters)
+        return iter_device_specs(iocs, device_filter, log=self.logger,
+                                 ioc_defaults=ioc_defaults,
+                                 profile=self.startup_profile)
+    
+    def _build_spec(self, spec: DeviceSpec, lazy: bool = False,
+                    defer_connect: bool = False) -> Optional[object]:
+        """Construct the device described by a DeviceSpec."""
+        start = perf_counter()
+        device = self.create_device(
+            devgroup=spec.devgroup,
+            devtype=spec.devtype,
+            prefix=spec.prefix,
+            name=spec.name,
+            config=spec.config,
+            lazy=lazy,
+            defer_connect=defer_connect
+        )
+        if self.startup_profile is not None:
+            self.startup_profile.built(spec, device, perf_counter() - start)
+        return device
+    
+    def _build_specs(self, specs: List[DeviceSpec],
+                     max_workers: Optional[int] = None,
+                     max_per_ioc: Optional[int] = None,
+                     lazy: bool = False,
+                     build=None) -> Iterator[Optional[object]]:
+        """
+        Construct the devices of a spec list, returned in spec order.
+        
+        build(item, lazy=False) constructs one item and defaults to
+        _build_spec; items only need an iocname attribute otherwise.
+        """
+        build = build or self._build_spec
+        if lazy:
+            return (build(spec, lazy=True) for spec in specs)
+        if max_workers and max_workers > 1:
+            built = [None] * len(specs)
+            for index, device in self._build_concurrently(specs, max_workers,
+                                                          max_per_ioc, build):
+                built[index] = device
+            return iter(built)
+        return (build(spec) for spec in specs)
+    
+    def _build_concurrently(self, specs: List[DeviceSpec], max_workers: int,
+                            max_per_ioc: Optional[int] = None, build=None
+                            ) -> Iterator[Tuple[int, Optional[object]]]:
+        """
+        Construct devices on a thread pool, yielding (index, device) pairs
+        in completion order.
+        
+        Devices are queued per IOC and at most max_per_ioc of them are
+        submitted at the same time, so an unreachable IOC can only hold
+        that many workers while it times out; the other workers keep
+        building devices of the remaining IOCs.
+        """
+        queues: Dict[str, deque] = {}
+        for index, spec in enumerate(specs):
+            queues.setdefault(spec.iocname, deque()).append(index)
+        
+        per_ioc = max_per_ioc if max_per_ioc and max_per_ioc > 0 else len(specs)
+        running: Dict[str, int] = {ioc: 0 for ioc in queues}
+        # Round-robin over IOCs so that the first workers are spread out
+        ready = deque(queues)
+        pending = {}
+        build = build or self._build_spec
+        
+        with ThreadPoolExecutor(max_workers=max_workers,
+                                thread_name_prefix='device-factory') as pool:
+            def submit_ready():
+                while ready and len(pending) < max_workers:
+                    ioc = ready.popleft()
+                    index = queues[ioc].popleft()
+                    running[ioc] += 1
+                    future = pool.submit(build, specs[index])
+                    pending[future] = (index, ioc)
+                    if queues[ioc] and running[ioc] < per_ioc:
+                        ready.append(ioc)
             
-            try:
-                if device_list:
-                    # Create Ophyd instance for each device
-                    for device_config in device_list:
-                        device_name = device_config.get('name')
-                        if not device_name:
-                            continue
-                        
-                        # Merge IOC config with device config for filter checking
-                        merged_config = ioc_config.copy()
-                        merged_config['iocname'] = ioc_name
-                        merged_config.update(device_config)
-                        
-                        # Apply filters
-                        if not self._matches_filters(device_name, merged_config,
-                                                     name_pattern, devtype, devgroup,
-                                                     **custom_filters):
-                            self.logger.debug(f"Device {device_name} filtered out")
-                            continue
-                        
-                        # Construct PV prefix
-                        if 'iocroot' in ioc_config:
-                            pv_prefix = f"{ioc_prefix}:{ioc_config['iocroot']}:{device_name}"
-                        else:
-                            pv_prefix = f"{ioc_prefix}:{device_name}"
-                        
-                        # Create Ophyd device
-                        ophyd_device = self.create_device(
-                            devgroup=ioc_devgroup,
-                            devtype=ioc_devtype,
-                            prefix=pv_prefix,
-                            name=device_name,
-                            config=merged_config
-                        )
-                        
-                        if ophyd_device:
-                            device_key = device_name
-                            
-                            # Handle name conflicts
-                            if device_key in devices:
-                                device_key = f"{ioc_name}_{device_name}"
-                                self.logger.warning(
-                                    f"Device name '{device_name}' already exists, "
-                                    f"renaming to '{device_key}'"
-                                )
-                                
-                                if device_key in devices:
-                                    self.logger.error(
-                                        f"Renamed device key '{device_key}' also exists. "
-                                        f"Skipping device creation for {device_name} in IOC {ioc_name}."
-                                    )
-                                    continue
-                            
-                            devices[device_key] = ophyd_device
-                            self.logger.info(
-                                f"Created device: {device_key} "
-                                f"({ioc_name}/{ioc_devgroup}/{ioc_devtype} prefix={pv_prefix})"
-                            )
-                else:
-                    # Single device IOC
-                    # Apply filters
-                    if not self._matches_filters(ioc_name, ioc_config,
-                                                 name_pattern, devtype, devgroup,
-                                                 **custom_filters):
-                        self.logger.debug(f"Device {ioc_name} filtered out")
-                        continue
-                    
-                    pv_prefix = ioc_prefix
-                    
-                    # Create Ophyd device
-                    ophyd_device = self.create_device(
-                        devgroup=ioc_devgroup,
-                        devtype=ioc_devtype,
-                        prefix=pv_prefix,
-                        name=ioc_name,
-                        config=ioc_config
-                    )
-                    
-                    if ophyd_device:
-                        devices[ioc_name] = ophyd_device
-                        self.logger.info(
-                                f"Created device: {ioc_name} "
-                                f"({ioc_name}/{ioc_devgroup}/{ioc_devtype} prefix={pv_prefix})"
-                        )
-                       
-                        
-            except Exception as e:
-                self.logger.error(
-                    f"Failed to create devices for IOC {ioc_name}: {e}",
-                    exc_info=True
-                )
+            submit_ready()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, ioc = pending.pop(future)
+                    running[ioc] -= 1
+                    if queues[ioc] and running[ioc] == per_ioc - 1:
+                        ready.append(ioc)
+                    yield index, future.result()
+                submit_ready()
+    
+    def _register_device(self, devices: Dict[str, object], spec: DeviceSpec,
+                         ophyd_device) -> Optional[str]:
+        """
+        Add a device to the result dictionary applying the name-conflict rules.
         
-        self.logger.info(f"Created {len(devices)} Ophyd devices from configuration")
-        return devices
+        Devices coming from an IOC device list are renamed to
+        '<iocname>_<name>' when their name is already taken and skipped if
+        that is taken too. Single device IOCs are stored under the IOC name.
+        
+        Returns:
+            The key used, or None if the device was skipped
+        """
+        device_key = self._device_key(devices, spec)
+        
+        # Handle name conflicts
+        if device_key is None:
+            self.logger.error(
+                f"Renamed device key '{spec.iocname}_{spec.name}' also exists. "
+                f"Skipping device creation for {spec.name} in IOC {spec.iocname}."
+            )
+            return None
+        if device_key != spec.name:
+            self.logger.warning(
+                f"Device name '{spec.name}' already exists, "
+                f"renaming to '{device_key}'"
+            )
+        
+        devices[device_key] = ophyd_device
+        if self.startup_profile is not None:
+            self.startup_profile.registered(spec, device_key)
+        self.logger.info(
+            f"Created device: {device_key} "
+            f"({spec.iocname}/{spec.devgroup}/{spec.devtype} prefix={spec.prefix})"
+        )
+        return device_key
+    
+    @staticmethod
+    def _device_key(taken, spec: DeviceSpec) -> Optional[str]:
+        """Key a device gets given the keys already taken, or None if skipped."""
+        if not spec.multi or spec.name not in taken:
+            return spec.name
+        device_key = f"{spec.iocname}_{spec.name}"
+        return None if device_key in taken else device_key
     
     def create_devices_from_file(self, config_path: str,
                                  name_pattern: Optional[str] = None,
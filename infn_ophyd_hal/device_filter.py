@@ -0,0 +1,187 @@
+"""
+Compiled device filters for DeviceFactory.
+
+A DeviceFilter is built once per query from the factory filter arguments
+(name_pattern, devtype, devgroup and custom key/value filters). Regexes
+are compiled up front, literal patterns skip the regex engine and the
+outcome for each distinct config value is memoized, so selecting devices
+from a large configuration costs about one dict lookup per filter and
+device.
+
+Matching rules (unchanged from the original DeviceFactory filters):
+
+- ``name_pattern``: case-insensitive regex search on the device name.
+- ``devtype`` / ``devgroup`` / custom filters: case-insensitive regex
+  search, or case-insensitive equality if the pattern is not a valid
+  regex.
+- custom filters prefixed with ``regex:`` are regex only.
+- custom filter lists match if any element matches.
+- a custom filter on a key that is missing or empty in the device
+  configuration never matches; filters set to None are ignored.
+- ``where`` is not a configuration key but a query expression (see
+  device_query), ANDed with the other filters.
+"""
+
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .device_query import DeviceQuery, parse_query
+
+logger = logging.getLogger(__name__)
+
+_REGEX_SPECIAL = frozenset('.^$*+?{}[]\\|()')
+
+
+class _Pattern:
+    """One compiled filter value, matched against string config values."""
+
+    __slots__ = ('literal', 'regex', 'exact', 'valid')
+
+    def __init__(self, pattern: str, regex_only: bool = False,
+                 log: Optional[logging.Logger] = None, key: Optional[str] = None):
+        self.literal = None
+        self.regex = None
+        self.exact = pattern.lower()
+        self.valid = True
+        if not _REGEX_SPECIAL.intersection(pattern):
+            # A regex without special characters is a substring search
+            self.literal = self.exact
+            return
+        try:
+            self.regex = re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            if regex_only:
+                where = f" for key '{key}'" if key else ""
+                (log or logger).warning(f"Invalid regex pattern '{pattern}'{where}: {e}")
+                self.valid = False
+
+    def match(self, value: str, regex_only: bool = False) -> bool:
+        if self.literal is not None:
+            return self.literal in value.lower()
+        if not self.valid:
+            return False
+        if self.regex is not None and self.regex.search(value):
+            return True
+        return not regex_only and value.lower() == self.exact
+
+
+class _Term:
+    """Filter on one configuration key, with a per-value result memo."""
+
+    __slots__ = ('key', 'patterns', 'regex_only', 'required', '_memo')
+
+    def __init__(self, key: Optional[str], patterns: List[_Pattern],
+                 regex_only: bool, required: bool, memoize: bool = True):
+        self.key = key
+        self.patterns = patterns
+        self.regex_only = regex_only
+        self.required = required
+        # Names are unique, only configuration values repeat
+        self._memo: Optional[Dict[str, bool]] = {} if memoize else None
+
+    def match(self, value) -> bool:
+        if not value:
+            if self.required:
+                return False
+            value = ''
+        if not isinstance(value, str):
+            value = str(value)
+        memo = self._memo
+        if memo is None:
+            return self._match(value)
+        result = memo.get(value)
+        if result is None:
+            result = memo[value] = self._match(value)
+        return result
+
+    def _match(self, value: str) -> bool:
+        for pattern in self.patterns:
+            if pattern.match(value, self.regex_only):
+                return True
+        return False
+
+
+class DeviceFilter:
+    """
+    Predicate selecting devices by name and configuration.
+
+    Args:
+        name_pattern: Regex pattern to match device name (optional)
+        devtype: Device type to match (optional, exact match or regex)
+        devgroup: Device group to match (optional, exact match or regex)
+        log: Logger used to report invalid patterns (optional)
+        where: Query expression, text or DeviceQuery (optional)
+        **custom_filters: Additional key-value filters (e.g., zone='beam1').
+                          Prefix the value with 'regex:' for regex only
+                          matching, or pass a list to match any element.
+
+    Raises:
+        QuerySyntaxError: If where is not a valid query expression
+
+    Example:
+        >>> selected = DeviceFilter(devgroup='mag', zone='beam1')
+        >>> selected.matches('QUAD01', {'devgroup': 'mag', 'zone': 'beam1'})
+        True
+        >>> DeviceFilter(where='devgroup in (mag, mot) and not zone = A')
+    """
+
+    def __init__(self, name_pattern: Optional[str] = None,
+                 devtype: Optional[str] = None,
+                 devgroup: Optional[str] = None,
+                 log: Optional[logging.Logger] = None,
+                 where: Union[str, DeviceQuery, None] = None,
+                 **custom_filters):
+        self.log = log or logger
+        self._name: Optional[_Term] = None
+        self._terms: List[_Term] = []
+        self.query: Optional[DeviceQuery] = parse_query(where) if isinstance(where, str) else where
+
+        if name_pattern:
+            self._name = _Term(None, [self._compile(name_pattern, True)], True, False,
+                               memoize=False)
+        if devtype:
+            self._terms.append(_Term('devtype', [self._compile(devtype)], False, False))
+        if devgroup:
+            self._terms.append(_Term('devgroup', [self._compile(devgroup)], False, False))
+
+        for key, value in custom_filters.items():
+            if value is None:
+                continue
+            if isinstance(value, str) and value.startswith('regex:'):
+                term = _Term(key, [self._compile(value[6:], True, key)], True, True)
+            elif isinstance(value, (list, tuple, set)):
+                term = _Term(key, [self._compile(str(v)) for v in value], False, True)
+            else:
+                term = _Term(key, [self._compile(str(value))], False, True)
+            self._terms.append(term)
+
+    def _compile(self, pattern: str, regex_only: bool = False,
+                 key: Optional[str] = None) -> _Pattern:
+        return _Pattern(pattern, regex_only, self.log, key)
+
+    @property
+    def terms(self) -> List[Tuple[Optional[str], Callable[[Any], bool]]]:
+        """(config key, predicate) pairs; the key is None for the name filter."""
+        terms = [(term.key, term.match) for term in self._terms]
+        if self._name is not None:
+            terms.insert(0, (None, self._name.match))
+        return terms
+
+    @property
+    def is_empty(self) -> bool:
+        """True if the filter accepts every device."""
+        return self._name is None and not self._terms and self.query is None
+
+    def matches(self, device_name: str, device_config: Dict[str, Any]) -> bool:
+        """Return True if the device passes every filter."""
+        if self._name is not None and not self._name.match(device_name):
+            return False
+        for term in self._terms:
+            if not term.match(device_config.get(term.key)):
+                return False
+        if self.query is not None:
+            return self.query.matches(device_name, device_config)
+        return True
+
+    __call__ = matches
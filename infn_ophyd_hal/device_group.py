@@ -0,0 +1,200 @@
+"""
+Groups of homogeneous devices operated on as numpy arrays.
+
+Orbit and optics code works on arrays: all BPM positions, all quadrupole
+currents of a family. An epik8sDeviceGroup wraps N devices of one class;
+``read()`` returns one array per signal, read with a single ``read_many``
+batch, and ``set(values)`` writes an array of setpoints with parallel
+puts. Per-element metadata (names, prefixes, IOCs, limits, timestamps of
+the last read) is kept in arrays on the group, aligned with the devices.
+
+Example:
+    >>> bpms = epik8sDeviceGroup(factory.create_devices_from_config(config, devtype='libera-sppp'))
+    >>> orbit = bpms.read()
+    >>> orbit['x'] - reference_x
+    >>> quads = epik8sDeviceGroup(qf_family)
+    >>> quads.set(quads.read()['current_rb'] * 1.01)
+"""
+
+import logging
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .batch_read import read_many
+
+logger = logging.getLogger(__name__)
+
+
+def _limits(device) -> Tuple[float, float]:
+    """Setpoint limits of a device (power supply currents, motor soft limits)."""
+    for low, high in (('min_current', 'max_current'), ('_low_limit', '_high_limit')):
+        if hasattr(device, low) and hasattr(device, high):
+            return float(getattr(device, low)), float(getattr(device, high))
+    return float('-inf'), float('inf')
+
+
+class epik8sDeviceGroup:
+    """
+    N devices of the same class, read and set as numpy arrays.
+
+    Args:
+        devices: Dictionary of device key to device (as returned by the
+                 factory), or an iterable of devices keyed by their name
+        name: Group name (optional)
+        signals: Signals returned by read() (optional, defaults to the
+                 class ``_readback_signals``)
+        setpoint: Signal written by set() (optional, defaults to the last
+                  of the class ``_setpoint_signals``, e.g. ``current``)
+        timeout: Default read/put timeout in seconds
+
+    Raises:
+        ValueError: If there are no devices or they are not all of one class
+
+    Attributes:
+        keys, names, prefixes, iocnames: numpy arrays, one entry per device
+        low_limits, high_limits: setpoint limits (float arrays, +-inf if none)
+        timestamps: signal -> timestamps of the last read() (NaN if not read)
+        valid: signal -> True where the last read() succeeded
+    """
+
+    def __init__(self, devices: Union[Mapping, Iterable], name: Optional[str] = None,
+                 signals: Optional[Sequence[str]] = None, setpoint: Optional[str] = None,
+                 timeout: float = 2.0):
+        import numpy as np
+
+        if not isinstance(devices, Mapping):
+            devices = {getattr(device, 'name', None) or str(pos): device
+                       for pos, device in enumerate(devices)}
+        if not devices:
+            raise ValueError("A device group needs at least one device")
+        # __class__, not type(): a LazyDevice proxy reports its device class
+        classes = {device.__class__ for device in devices.values()}
+        if len(classes) > 1:
+            raise ValueError(
+                f"Device group must be homogeneous, got {sorted(c.__name__ for c in classes)}")
+        self.device_class = classes.pop()
+        self._devices: Dict[str, Any] = dict(devices)
+        self.name = name or self.device_class.__name__
+        self.signals: List[str] = list(
+            signals if signals is not None
+            else getattr(self.device_class, '_readback_signals', ()) or ())
+        setpoints = getattr(self.device_class, '_setpoint_signals', ()) or ()
+        self.setpoint = setpoint or (setpoints[-1] if setpoints else None)
+        self.timeout = timeout
+
+        members = list(self._devices.values())
+        self.keys = np.asarray(list(self._devices), dtype=str)
+        self.names = np.asarray([getattr(d, 'name', '') or '' for d in members], dtype=str)
+        self.prefixes = np.asarray([getattr(d, 'prefix', '') or '' for d in members], dtype=str)
+        self.iocnames = np.asarray([getattr(d, '_iocname', '') or '' for d in members], dtype=str)
+        limits = np.asarray([_limits(d) for d in members], dtype=float).reshape(-1, 2)
+        self.low_limits = limits[:, 0].copy()
+        self.high_limits = limits[:, 1].copy()
+        self.timestamps: Dict[str, Any] = {}
+        self.valid: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __iter__(self):
+        return iter(self._devices.values())
+
+    def __getitem__(self, key: str):
+        return self._devices[key]
+
+    def __repr__(self):
+        return f"epik8sDeviceGroup({self.name!r}, {len(self)} x {self.device_class.__name__})"
+
+    @property
+    def devices(self) -> Dict[str, Any]:
+        """Device key -> device, in group order."""
+        return dict(self._devices)
+
+    def read(self, signals: Optional[Sequence[str]] = None,
+             timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Read signals of every device with one batch of CA requests.
+
+        Args:
+            signals: Signals to read (optional, defaults to ``self.signals``)
+            timeout: Overall deadline in seconds (optional)
+
+        Returns:
+            Dictionary of signal to float array in device order; elements
+            not read are NaN (see ``valid``)
+        """
+        import numpy as np
+
+        signals = list(signals if signals is not None else self.signals)
+        reading = read_many(self._devices, signals,
+                            timeout=self.timeout if timeout is None else timeout)
+        arrays = {}
+        for signal in signals:
+            values, timestamps = reading.array(signal)
+            arrays[signal] = values
+            self.timestamps[signal] = timestamps
+            self.valid[signal] = ~np.isnan(timestamps)
+        return arrays
+
+    def get(self, signal: Optional[str] = None, timeout: Optional[float] = None):
+        """Array of one signal (default: the first of ``self.signals``)."""
+        signal = signal or (self.signals[0] if self.signals else None)
+        if signal is None:
+            raise ValueError(f"{self.name}: no signal to read")
+        return self.read([signal], timeout)[signal]
+
+    def set(self, values, timeout: Optional[float] = None,
+            signal: Optional[str] = None):
+        """
+        Write one value per device with parallel puts.
+
+        Elements that are NaN are left unchanged; elements outside
+        ``low_limits``/``high_limits`` are not written (logged).
+
+        Args:
+            values: Array-like of N values, or a scalar for all devices
+            timeout: Completion timeout in seconds (optional)
+            signal: Signal to write (optional, defaults to ``self.setpoint``)
+
+        Returns:
+            Boolean array, True where the put completed
+
+        Raises:
+            ValueError: If values does not have one element per device
+        """
+        import numpy as np
+
+        signal = signal or self.setpoint
+        if signal is None:
+            raise ValueError(f"{self.name}: no setpoint to write")
+        timeout = self.timeout if timeout is None else timeout
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 0:
+            values = np.full(len(self), values)
+        if values.shape != (len(self),):
+            raise ValueError(f"{self.name}: expected {len(self)} values, got shape {values.shape}")
+
+        done = np.zeros(len(self), dtype=bool)
+        wanted = ~np.isnan(values)
+        outside = wanted & ((values < self.low_limits) | (values > self.high_limits))
+        for pos in np.flatnonzero(outside):
+            logger.error(f"{self.names[pos]}: {signal}={values[pos]} outside "
+                         f"[{self.low_limits[pos]}, {self.high_limits[pos]}]")
+        devices = list(self._devices.values())
+        pending = []
+        for pos in np.flatnonzero(wanted & ~outside).tolist():
+            try:
+                pending.append((pos, getattr(devices[pos], signal).set(
+                    values[pos].item(), timeout=timeout)))
+            except Exception as e:
+                logger.error(f"{self.names[pos]}: setting {signal} failed: {e}")
+        deadline = time.monotonic() + timeout
+        for pos, status in pending:
+            try:
+                status.wait(max(deadline - time.monotonic(), 1e-3))
+            except Exception as e:
+                logger.error(f"{self.names[pos]}: setting {signal} failed: {e}")
+                continue
+            done[pos] = True
+        return done
@@ -0,0 +1,73 @@
+"""
+Resolved device plans.
+
+A plan is the list of devices ``DeviceFactory.plan()`` would create from a
+beamline configuration: for each one the result key, the class as a
+"module:Class" reference, the PV prefix and the constructor keyword
+arguments, with the configuration already filtered and merged into a
+plain dict. Building a plan needs no YAML parsing and no Channel Access,
+so it also serves as a dry run.
+
+Plans can be stored with ``save_plan`` and read back with ``load_plan``
+(pickle, protocol 5 on Python 3.8+), e.g. to ship a plan precomputed at
+deploy time with a container image and skip config processing on start.
+Only load plan files from trusted locations.
+
+Example:
+    >>> plan = factory.plan(config, devgroup='mot')
+    >>> save_plan(plan, 'motors.plan')
+    >>> devices = factory.build(load_plan('motors.plan'))
+"""
+
+import os
+import pickle
+import tempfile
+from typing import Any, Dict, List, NamedTuple
+
+PLAN_MAGIC = 'infn_ophyd_hal-plan'
+PLAN_FORMAT = 1
+
+
+class PlannedDevice(NamedTuple):
+    """One device of a plan."""
+    key: str         # key in the dictionary returned by build()
+    name: str
+    class_path: str  # "module:Class"
+    prefix: str
+    kwargs: Dict[str, Any]  # constructor kwargs besides prefix and name
+    iocname: str
+
+
+def save_plan(plan: List[PlannedDevice], path: str):
+    """
+    Write a plan to a file, atomically replacing it.
+
+    Args:
+        plan: Plan returned by DeviceFactory.plan()
+        path: Destination file
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((PLAN_MAGIC, PLAN_FORMAT), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump([tuple(item) for item in plan], f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_plan(path: str) -> List[PlannedDevice]:
+    """
+    Read a plan written by save_plan().
+
+    Raises:
+        ValueError: If the file is not a plan of a supported format
+    """
+    with open(path, 'rb') as f:
+        header = pickle.load(f)
+        if header != (PLAN_MAGIC, PLAN_FORMAT):
+            raise ValueError(f"{path} is not a device plan of format {PLAN_FORMAT}")
+        return [PlannedDevice(*item) for item in pickle.load(f)]
@@ -0,0 +1,364 @@
+"""
+Boolean query expressions selecting devices.
+
+The factory keyword filters are ANDed together only; a query expression
+combines conditions freely and is passed as ``where``::
+
+    factory.create_devices_from_config(
+        config, where='devgroup in (mag, mot) and zone =~ "^A" and not iocname =~ dante')
+
+Grammar (keywords are case-insensitive)::
+
+    expr       := term ('or' term)*
+    term       := factor ('and' factor)*
+    factor     := 'not' factor | '(' expr ')' | comparison
+    comparison := key '=' value | key '!=' value
+                | key '=~' value | key '!~' value
+                | key ['not'] 'in' '(' value (',' value)* ')'
+
+``key`` is ``name`` (the device name) or any key of the merged device
+configuration (``iocname``, ``devgroup``, ``devtype``, ``zone``...). Values
+are bare words or quoted strings. ``=``/``in`` compare exactly (as
+BeamlineIndex.lookup does), ``=~`` is a case-insensitive regex search.
+A key missing from the configuration compares as the empty string.
+
+An expression is parsed once into a predicate tree. Evaluated on a
+BeamlineIndex, equality terms are index lookups, regex terms run once per
+distinct value, and the boolean operators work on position sets.
+"""
+
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Set, Tuple
+
+# Bucket lookup of a BeamlineIndex: config key -> {value: positions}
+Buckets = Callable[[str], Mapping[str, Tuple[int, ...]]]
+
+_KEYWORDS = ('and', 'or', 'not', 'in')
+_OPERATORS = ('=~', '!~', '!=', '==', '=')
+_WORD_END = frozenset(' \t\r\n()=,!~"\'')
+# Distinct values remembered per regex term (parsed trees are cached)
+_MEMO_SIZE = 1024
+
+
+class QuerySyntaxError(ValueError):
+    """Raised for an expression that cannot be parsed."""
+
+    def __init__(self, message: str, expression: str, pos: int):
+        super().__init__(f"{message} at position {pos} in query: {expression}")
+        self.expression = expression
+        self.pos = pos
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str, int]]:
+    """Split an expression into (kind, text, position) tokens."""
+    tokens = []
+    pos = 0
+    length = len(expression)
+    while pos < length:
+        char = expression[pos]
+        if char.isspace():
+            pos += 1
+        elif char in '(),':
+            tokens.append((char, char, pos))
+            pos += 1
+        elif char in '"\'':
+            start = pos
+            pos += 1
+            text = []
+            while pos < length and expression[pos] != char:
+                if expression[pos] == '\\' and pos + 1 < length \
+                        and expression[pos + 1] in (char, '\\'):
+                    pos += 1
+                text.append(expression[pos])
+                pos += 1
+            if pos >= length:
+                raise QuerySyntaxError("Unterminated string", expression, start)
+            tokens.append(('str', ''.join(text), start))
+            pos += 1
+        else:
+            for op in _OPERATORS:
+                if expression.startswith(op, pos):
+                    tokens.append(('op', op, pos))
+                    pos += len(op)
+                    break
+            else:
+                start = pos
+                while pos < length and expression[pos] not in _WORD_END:
+                    pos += 1
+                if pos == start:
+                    raise QuerySyntaxError(f"Unexpected '{char}'", expression, pos)
+                word = expression[start:pos]
+                kind = word.lower() if word.lower() in _KEYWORDS else 'word'
+                tokens.append((kind, word, start))
+    tokens.append(('end', '', length))
+    return tokens
+
+
+# ----------------------------------------------------------------------
+# Predicate tree
+# ----------------------------------------------------------------------
+
+class _Node(ABC):
+    __slots__ = ()
+
+    @abstractmethod
+    def match(self, value_of: Callable[[str], str]) -> bool:
+        """Whether the device whose values value_of returns matches."""
+
+    @abstractmethod
+    def positions(self, buckets: Buckets, universe: FrozenSet[int]) -> Set[int]:
+        """Positions of the matching devices of an index."""
+
+
+class _Equals(_Node):
+    __slots__ = ('key', 'values')
+
+    def __init__(self, key: str, values: Iterable[str]):
+        self.key = key
+        self.values = frozenset(values)
+
+    def match(self, value_of):
+        return value_of(self.key) in self.values
+
+    def positions(self, buckets, universe):
+        index = buckets(self.key)
+        matched = set()
+        for value in self.values:
+            matched.update(index.get(value, ()))
+        return matched
+
+    def __repr__(self):
+        return f"{self.key} in {sorted(self.values)}"
+
+
+class _Search(_Node):
+    __slots__ = ('key', 'regex', '_memo')
+
+    def __init__(self, key: str, regex):
+        self.key = key
+        self.regex = regex
+        # Configuration values repeat a lot, test each one once
+        self._memo: Dict[str, bool] = {}
+
+    def _test(self, value: str) -> bool:
+        memo = self._memo
+        result = memo.get(value)
+        if result is None:
+            if len(memo) >= _MEMO_SIZE:
+                memo.clear()
+            result = memo[value] = self.regex.search(value) is not None
+        return result
+
+    def match(self, value_of):
+        return self._test(value_of(self.key))
+
+    def positions(self, buckets, universe):
+        matched = set()
+        for value, bucket in buckets(self.key).items():
+            if self._test(value):
+                matched.update(bucket)
+        return matched
+
+    def __repr__(self):
+        return f"{self.key} =~ {self.regex.pattern!r}"
+
+
+class _Not(_Node):
+    __slots__ = ('child',)
+
+    def __init__(self, child: _Node):
+        self.child = child
+
+    def match(self, value_of):
+        return not self.child.match(value_of)
+
+    def positions(self, buckets, universe):
+        return set(universe - self.child.positions(buckets, universe))
+
+    def __repr__(self):
+        return f"not ({self.child!r})"
+
+
+class _And(_Node):
+    __slots__ = ('children',)
+
+    def __init__(self, children: List[_Node]):
+        # Index lookups first: they are cheapest and usually most selective
+        self.children = sorted(children, key=lambda c: not isinstance(c, _Equals))
+
+    def match(self, value_of):
+        return all(child.match(value_of) for child in self.children)
+
+    def positions(self, buckets, universe):
+        result = None
+        for child in self.children:
+            matched = child.positions(buckets, universe)
+            result = matched if result is None else result & matched
+            if not result:
+                break
+        return result
+
+    def __repr__(self):
+        return ' and '.join(f"({c!r})" for c in self.children)
+
+
+class _Or(_Node):
+    __slots__ = ('children',)
+
+    def __init__(self, children: List[_Node]):
+        self.children = children
+
+    def match(self, value_of):
+        return any(child.match(value_of) for child in self.children)
+
+    def positions(self, buckets, universe):
+        result = set()
+        for child in self.children:
+            result |= child.positions(buckets, universe)
+        return result
+
+    def __repr__(self):
+        return ' or '.join(f"({c!r})" for c in self.children)
+
+
+class _Parser:
+    """Recursive descent parser producing the predicate tree."""
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+
+    def error(self, message: str):
+        raise QuerySyntaxError(message, self.expression, self.tokens[self.pos][2])
+
+    def peek(self) -> str:
+        return self.tokens[self.pos][0]
+
+    def take(self, *kinds: str) -> Tuple[str, str, int]:
+        token = self.tokens[self.pos]
+        if token[0] not in kinds:
+            found = token[1] or 'end of query'
+            self.error(f"Expected {' or '.join(kinds)}, found '{found}'")
+        self.pos += 1
+        return token
+
+    def parse(self) -> _Node:
+        node = self.expr()
+        if self.peek() != 'end':
+            self.error(f"Unexpected '{self.tokens[self.pos][1]}'")
+        return node
+
+    def expr(self) -> _Node:
+        children = [self.term()]
+        while self.peek() == 'or':
+            self.pos += 1
+            children.append(self.term())
+        return children[0] if len(children) == 1 else _Or(children)
+
+    def term(self) -> _Node:
+        children = [self.factor()]
+        while self.peek() == 'and':
+            self.pos += 1
+            children.append(self.factor())
+        return children[0] if len(children) == 1 else _And(children)
+
+    def factor(self) -> _Node:
+        kind = self.peek()
+        if kind == 'not':
+            self.pos += 1
+            return _Not(self.factor())
+        if kind == '(':
+            self.pos += 1
+            node = self.expr()
+            self.take(')')
+            return node
+        return self.comparison()
+
+    def comparison(self) -> _Node:
+        key = self.take('word', 'str')[1]
+        negate = False
+        if self.peek() == 'not':
+            self.pos += 1
+            negate = True
+            if self.peek() != 'in':
+                self.error("Expected 'in' after 'not'")
+        kind, op, pos = self.take('op', 'in')
+        if kind == 'in':
+            self.take('(')
+            values = [self.take('word', 'str')[1]]
+            while self.peek() == ',':
+                self.pos += 1
+                values.append(self.take('word', 'str')[1])
+            self.take(')')
+            node = _Equals(key, values)
+            return _Not(node) if negate else node
+
+        value = self.take('word', 'str')[1]
+        if op in ('=~', '!~'):
+            try:
+                node = _Search(key, re.compile(value, re.IGNORECASE))
+            except re.error as e:
+                raise QuerySyntaxError(f"Invalid regex '{value}' ({e})",
+                                       self.expression, pos) from None
+        else:
+            node = _Equals(key, (value,))
+        return _Not(node) if op in ('!=', '!~') else node
+
+
+def _normalize(value: Any) -> str:
+    """Comparable form of a configuration value, as BeamlineIndex indexes it."""
+    if not value:
+        return ''
+    return value if isinstance(value, str) else str(value)
+
+
+class DeviceQuery:
+    """
+    A parsed query expression.
+
+    Args:
+        expression: Query text (see the module documentation)
+
+    Raises:
+        QuerySyntaxError: If the expression is malformed
+
+    Example:
+        >>> query = DeviceQuery('devgroup in (mag, mot) and not iocname =~ dante')
+        >>> query.matches('QUAD01', {'devgroup': 'mag', 'iocname': 'unimag-1'})
+        True
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self._root = _Parser(expression).parse()
+
+    def __repr__(self):
+        return f"DeviceQuery({self.expression!r})"
+
+    def matches(self, device_name: str, device_config: Mapping[str, Any]) -> bool:
+        """Return True if the device satisfies the expression."""
+        def value_of(key):
+            return device_name if key == 'name' else _normalize(device_config.get(key))
+        return self._root.match(value_of)
+
+    __call__ = matches
+
+    def positions(self, buckets: Buckets, count: int) -> Set[int]:
+        """
+        Positions of the matching devices of an index.
+
+        Args:
+            buckets: Returns, for a config key, the mapping from each
+                     value to the positions of the devices having it
+            count: Number of devices in the index
+        """
+        return self._root.positions(buckets, frozenset(range(count)))
+
+
+@lru_cache(maxsize=256)
+def parse_query(expression: str) -> DeviceQuery:
+    """Parse an expression, reusing the tree of an identical earlier one."""
+    return DeviceQuery(expression)
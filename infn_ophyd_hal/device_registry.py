@@ -0,0 +1,168 @@
+"""
+Process-wide registry of live devices.
+
+A DeviceFactory given a registry returns the existing instance when asked
+again for the same (class, prefix, config), instead of building a second
+Ophyd object with its own CA channels and monitors. The registry only
+holds weak references: a device disappears from it once the application
+drops its last reference.
+
+Live devices can be looked up by name, iocname, devgroup and devtype:
+
+    >>> factory = DeviceFactory(registry=True)      # shared process registry
+    >>> m1 = factory.create_device('mot', 'sim', 'SIM:M1', 'm1')
+    >>> factory.create_device('mot', 'sim', 'SIM:M1', 'm1') is m1
+    True
+    >>> default_registry().find(devgroup='mot')
+"""
+
+import threading
+import weakref
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Set
+
+INDEX_KEYS = ('name', 'iocname', 'devgroup', 'devtype')
+
+# Keys of the merged device config left out of the registry key: the IOC
+# device list describes the siblings, not the device, and freezing it for
+# every device would make building an IOC quadratic in its size
+SIBLING_KEYS = frozenset(('devices',))
+
+
+def freeze(value: Any) -> Hashable:
+    """Hashable, order-independent form of a configuration value."""
+    if isinstance(value, Mapping):
+        return frozenset((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(freeze(v) for v in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+class DeviceRegistry:
+    """
+    Weakly referenced devices keyed by (class, prefix, config).
+
+    Thread safe; concurrent requests for the same key build the device once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices: 'weakref.WeakValueDictionary[tuple, object]' = weakref.WeakValueDictionary()
+        self._building: Dict[tuple, threading.Lock] = {}
+        self._indexes: Dict[str, Dict[str, Set[tuple]]] = {key: {} for key in INDEX_KEYS}
+
+    @staticmethod
+    def key(device_class: type, prefix: str, config: Optional[Dict[str, Any]] = None) -> tuple:
+        """
+        Registry key of a device.
+
+        The config part holds the device entry merged over its IOC (which
+        carries the IOC identity, iocname and iocprefix), without the IOC
+        device list.
+        """
+        items = frozenset((k, freeze(v)) for k, v in (config or {}).items()
+                          if k not in SIBLING_KEYS)
+        return (device_class, prefix, items)
+
+    def get(self, key: tuple) -> Optional[object]:
+        """Live device registered under key, or None."""
+        return self._devices.get(key)
+
+    def get_or_create(self, device_class: type, prefix: str, name: str,
+                      config: Optional[Dict[str, Any]],
+                      create: Callable[[], Optional[object]]) -> Optional[object]:
+        """
+        Return the live device for (device_class, prefix, config), calling
+        create() to build and register it if there is none.
+
+        Returns:
+            The device, or None if create() returned None
+        """
+        key = self.key(device_class, prefix, config)
+        device = self._devices.get(key)
+        if device is not None:
+            return device
+        with self._lock:
+            building = self._building.setdefault(key, threading.Lock())
+        try:
+            with building:
+                device = self._devices.get(key)
+                if device is None:
+                    device = create()
+                    if device is not None:
+                        self._add(key, device, name, config)
+                return device
+        finally:
+            with self._lock:
+                self._building.pop(key, None)
+
+    def _add(self, key: tuple, device, name: str, config: Optional[Dict[str, Any]]):
+        values = {'name': name}
+        for index_key in INDEX_KEYS[1:]:
+            values[index_key] = (config or {}).get(index_key)
+        with self._lock:
+            self._devices[key] = device
+            for index_key, value in values.items():
+                if value:
+                    self._indexes[index_key].setdefault(str(value), set()).add(key)
+        weakref.finalize(device, self._remove, key, values)
+
+    def _remove(self, key: tuple, values: Dict[str, Any]):
+        with self._lock:
+            for index_key, value in values.items():
+                keys = self._indexes[index_key].get(str(value)) if value else None
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._indexes[index_key][str(value)]
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __iter__(self) -> Iterator[object]:
+        return iter(list(self._devices.values()))
+
+    def find(self, **criteria: str) -> List[object]:
+        """
+        Live devices matching all criteria (exact match).
+
+        Args:
+            **criteria: Any of name, iocname, devgroup, devtype
+
+        Example:
+            >>> registry.find(iocname='tml-ch1', devtype='tml')
+        """
+        unknown = set(criteria) - set(INDEX_KEYS)
+        if unknown:
+            raise ValueError(f"Cannot look up devices by {', '.join(sorted(unknown))}")
+        with self._lock:
+            if not criteria:
+                keys = set(self._devices.keys())
+            else:
+                keys = None
+                for index_key, value in criteria.items():
+                    matched = self._indexes[index_key].get(str(value), set())
+                    keys = set(matched) if keys is None else keys & matched
+            devices = [self._devices.get(key) for key in keys]
+        return [device for device in devices if device is not None]
+
+    def clear(self):
+        """Forget every device (the devices themselves are left alone)."""
+        with self._lock:
+            self._devices.clear()
+            for index in self._indexes.values():
+                index.clear()
+
+
+_default_registry = DeviceRegistry()
+
+
+def default_registry() -> DeviceRegistry:
+    """The registry shared by every DeviceFactory created with registry=True."""
+    return _default_registry
@@ -6,8 +6,14 @@ device classes should inherit from. It standardizes the initialization
 of ophyd Device objects with common arguments.
 """
 
+from collections.abc import Mapping
 from ophyd import Device
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Sequence
+
+from .batch_read import BatchReading, read_many
+from .callback_dispatcher import default_dispatcher
+from .metrics import default_metrics
+from .monitor_cache import cache_settings, enable_monitor_cache
 
 
 class epik8sDevice(Device):
@@ -30,9 +36,34 @@ class epik8sDevice(Device):
         Attributes that define the device configuration
     parent : Device or None, optional
         The parent device instance if this is a sub-device
+    defer_connect : bool, optional
+        Skip the initial PV reads done by the constructor; they run in
+        ``_on_connected()`` once the channels are connected, see
+        ``infn_ophyd_hal.connection.wait_for_connection``
+    config : mapping, optional
+        Beamline configuration of the device. ``cache: monitor`` (or
+        ``cache: {mode: monitor, max_age: seconds}``) serves the
+        ``_readback_signals`` from CA monitors, see
+        ``infn_ophyd_hal.monitor_cache``; ``metrics: true`` instruments
+        the signals in ``infn_ophyd_hal.metrics.default_metrics()``
     **kwargs : dict
         Additional keyword arguments passed to the Device constructor
     """
+    _defer_connect = False
+    # Metadata read from the config whenever _config is assigned
+    _device_config = None
+    _iocname = None
+    _devtype = None
+    _devgroup = None
+    # Readback signals served from CA monitors with ``cache: monitor``
+    _readback_signals = ()
+    # Writable setpoints saved by save_restore, in restore order
+    _setpoint_signals = ()
+    # Dispatcher running the device subscription callbacks (None: the default one)
+    _callback_dispatcher = None
+    _dispatched_subs = None
+    _monitor_cache = None
+
     def __init__(
         self,
         prefix: str,
@@ -45,6 +76,7 @@ class epik8sDevice(Device):
     ):
         self._config = kwargs.get('config', None)
         kwargs.pop('config', None)
+        self._defer_connect = kwargs.pop('defer_connect', False)
         """Initialize the EPIK8S device with standard ophyd Device arguments."""
         super().__init__(
             prefix,
@@ -54,22 +86,154 @@ class epik8sDevice(Device):
             parent=parent,
             **kwargs
         )
+        self._apply_cache_settings()
+        self._apply_metrics_settings()
+
+    def _subscribe(self, signal, callback, state=None, **kwargs) -> int:
+        """
+        Subscribe a device callback run by the callback dispatcher.
+
+        The callback runs on the dispatcher worker pool instead of the
+        ophyd monitor thread; bursts of updates of a signal are coalesced,
+        and events are dropped when the dispatcher queue is full. Device
+        state derived from the value therefore belongs in ``state``: it
+        is run on the monitor thread for every update, before the
+        callback is queued, and must be cheap (no I/O, no logging).
+        Returns the subscription id of the callback.
+        """
+        if self._dispatched_subs is None:
+            self._dispatched_subs = []
+        if state is not None:
+            self._dispatched_subs.append((signal, signal.subscribe(state, **kwargs)))
+        dispatcher = self._callback_dispatcher or default_dispatcher()
+        cid = signal.subscribe(dispatcher.wrap(callback), **kwargs)
+        self._dispatched_subs.append((signal, cid))
+        return cid
+
+    def _unsubscribe_all(self):
+        """Remove the subscriptions made with _subscribe()."""
+        for signal, cid in self._dispatched_subs or ():
+            signal.unsubscribe(cid)
+        self._dispatched_subs = None
+
+    def _apply_metrics_settings(self):
+        """Instrument the signals when the config asks for metrics."""
+        if isinstance(self._config, Mapping) and self._config.get('metrics'):
+            default_metrics().instrument(self)
+
+    def _apply_cache_settings(self):
+        """Enable, update or remove the monitor cache from the config."""
+        mode, max_age = cache_settings(self._config)
+        cache = self._monitor_cache
+        if mode is None:
+            if cache:
+                for readback in cache.values():
+                    readback.remove()
+                self._monitor_cache = None
+            return
+        if cache:
+            for readback in cache.values():
+                readback.max_age = max_age
+            return
+        if self._readback_signals:
+            self._monitor_cache = enable_monitor_cache(self, self._readback_signals, max_age)
+
+    @property
+    def monitor_cached(self) -> bool:
+        """True if the readback signals are served from CA monitors."""
+        return bool(self._monitor_cache)
+
+    def _on_connected(self):
+        """
+        Initial reads of a device built with ``defer_connect=True``.
+
+        Subclasses reading PVs in their constructor put those reads here
+        and call this from the constructor unless connection is deferred.
+        """
+
+    def _finish_deferred_connect(self):
+        """Run the deferred initial reads once, after the bulk connection wait."""
+        if self._defer_connect:
+            self._defer_connect = False
+            self._on_connected()
+
+    def reconfigure(self, config: Optional[Any] = None, **kwargs):
+        """
+        Apply a new beamline configuration without reconnecting.
+
+        Called by ``DeviceFactory.reconcile`` when only the configuration
+        of the device changed. Subclasses deriving state from the config
+        in their constructor should override this and call super().
+
+        Parameters
+        ----------
+        config : mapping, optional
+            The new device configuration
+        **kwargs : dict
+            Other constructor arguments derived from the config (``poi``)
+        """
+        self._config = config
+        self._apply_cache_settings()
+        self._apply_metrics_settings()
+        if 'poi' in kwargs and hasattr(self, 'poi'):
+            self.poi = kwargs['poi']
+
+    @staticmethod
+    def read_many(devices, signals: Optional[Sequence[str]] = None,
+                  timeout: float = 2.0) -> BatchReading:
+        """
+        Read signals of many devices with one batch of CA requests.
+
+        All gets are issued before any reply is awaited, against a single
+        deadline; disconnected signals fail immediately.
+
+        Parameters
+        ----------
+        devices : dict or iterable
+            Device key to device, or devices keyed by their name
+        signals : list of str, optional
+            Attributes read on every device (default: each device's
+            ``read_attrs``)
+        timeout : float, optional
+            Overall deadline in seconds
+
+        Returns
+        -------
+        BatchReading
+            Values with timestamps per device and signal, the signals that
+            failed, and ``array(signal)`` for numpy output
+
+        Examples
+        --------
+        >>> reading = epik8sDevice.read_many(bpms, ['x', 'y'], timeout=0.5)
+        >>> x, t = reading.array('x')
+        """
+        return read_many(devices, signals, timeout)
+
+    @property
+    def _config(self) -> Optional[Any]:
+        return self._device_config
+
+    @_config.setter
+    def _config(self, config: Optional[Any]):
+        self._device_config = config
+        if isinstance(config, Mapping):
+            self._iocname = config.get('iocname', None)
+            self._devtype = config.get('devtype', None)
+            self._devgroup = config.get('devgroup', None)
+        else:
+            self._iocname = self._devtype = self._devgroup = None
+
     def get_config(self) -> Optional[Any]:
         """Return the device configuration if available."""
         return self._config
     def iocname(self) -> Optional[str]:
         """Return the IOC name from configuration if available."""
-        if self._config and isinstance(self._config, dict):
-            return self._config.get('iocname', None)
-        return None
+        return self._iocname
     def devtype(self) -> Optional[str]:
         """Return the device type from configuration if available."""
-        if self._config and isinstance(self._config, dict):
-            return self._config.get('devtype', None)
-        return None
+        return self._devtype
     def devgroup(self) -> Optional[str]:
         """Return the device group from configuration if available."""
-        if self._config and isinstance(self._config, dict):
-            return self._config.get('devgroup', None)
-        return None
+        return self._devgroup
     
@@ -6,12 +6,14 @@ import logging
 class OphydDI(epik8sDevice):
     """Digital Input: read-only boolean/value at ':DI'."""
     user_readback = Cpt(EpicsSignalRO, ':DI_RB')
+    _readback_signals = ('user_readback',)
 
     def __init__(self, prefix, read_attrs=None, configuration_attrs=None, name=None, parent=None, **kwargs):
         if read_attrs is None:
             read_attrs = ['user_readback']
         super().__init__(prefix, read_attrs=read_attrs, configuration_attrs=configuration_attrs, name=name, parent=parent, **kwargs)
-        self.get()
+        if not self._defer_connect:
+            self.get()
     def get(self):
         """Get current digital input value."""
         return self.user_readback.get()
@@ -20,12 +22,14 @@ class OphydDI(epik8sDevice):
 class OphydDO(epik8sDevice):
     """Digital Output: writable boolean/value at ':DO_SP'."""
     user_setpoint = Cpt(EpicsSignal, ':DO_SP')
+    _setpoint_signals = ('user_setpoint',)
 
     def __init__(self, prefix, read_attrs=None, configuration_attrs=None, name=None, parent=None, **kwargs):
         if read_attrs is None:
             read_attrs = ['user_setpoint']
         super().__init__(prefix, read_attrs=read_attrs, configuration_attrs=configuration_attrs, name=name, parent=parent, **kwargs)
-        self.get()
+        if not self._defer_connect:
+            self.get()
 
 
     def get(self):
@@ -41,12 +45,14 @@ class OphydDO(epik8sDevice):
 class OphydAI(epik8sDevice):
     """Analog Input: read-only float at ':AI_RB'."""
     user_readback = Cpt(EpicsSignalRO, ':AI_RB')
+    _readback_signals = ('user_readback',)
 
     def __init__(self, prefix, read_attrs=None, configuration_attrs=None, name=None, parent=None, **kwargs):
         if read_attrs is None:
             read_attrs = ['user_readback']
         super().__init__(prefix, read_attrs=read_attrs, configuration_attrs=configuration_attrs, name=name, parent=parent, **kwargs)
-        self.get()
+        if not self._defer_connect:
+            self.get()
 
 
     def get(self):
@@ -57,12 +63,14 @@ class OphydAI(epik8sDevice):
 class OphydAO(epik8sDevice):
     """Analog Output: writable float at ':AO_SP'."""
     user_setpoint = Cpt(EpicsSignal, ':AO_SP')
+    _setpoint_signals = ('user_setpoint',)
 
     def __init__(self, prefix, read_attrs=None, configuration_attrs=None, name=None, parent=None, **kwargs):
         if read_attrs is None:
             read_attrs = ['user_setpoint']
         super().__init__(prefix, read_attrs=read_attrs, configuration_attrs=configuration_attrs, name=name, parent=parent, **kwargs)
-        self.get()
+        if not self._defer_connect:
+            self.get()
 
 
     def get(self):
@@ -86,12 +94,14 @@ class OphydRTD(epik8sDevice):
     """
 
     user_readback = Cpt(EpicsSignalRO, ':TEMP_RB')
+    _readback_signals = ('user_readback',)
 
     def __init__(self, prefix, read_attrs=None, configuration_attrs=None, name=None, parent=None, **kwargs):
         if read_attrs is None:
             read_attrs = ['user_readback']
         super().__init__(prefix, read_attrs=read_attrs, configuration_attrs=configuration_attrs, name=name, parent=parent, **kwargs)
-        self.get()
+        if not self._defer_connect:
+            self.get()
 
 
     def get(self):
@@ -0,0 +1,138 @@
+"""
+iocDefaults template inheritance.
+
+A beamline configuration may define default IOC settings per template::
+
+    epicsConfiguration:
+      iocDefaults:
+        tml-base:
+          devgroup: mot
+          devtype: tml
+          motor: {dllm: -1000, dhlm: 1000}
+        tml-long:
+          template: tml-base       # templates can inherit from each other
+          motor: {dhlm: 5000}
+      iocs:
+        - name: tml-ch1
+          template: tml-long       # IOC picks its defaults by template name
+          iocprefix: "SPARC:MOT:TML"
+          devices:
+            - name: GUNFLG01
+              motor: {dllm: 0}
+
+Each device configuration is the deep merge iocDefaults -> IOC -> device:
+nested mappings are merged key by key, any other value (lists included)
+is replaced by the more specific level. A top-level ``iocDefaults`` key is
+accepted too when ``epicsConfiguration`` has none.
+
+Templates are resolved once per walk and memoized, so the merge work
+grows with the number of templates and IOCs, not with the device count.
+IOC and device configurations are ConfigView chains over the shared
+template settings rather than merged copies.
+"""
+
+import logging
+from typing import Any, Dict, Mapping, Optional
+
+from .config_view import ConfigView
+
+logger = logging.getLogger(__name__)
+
+
+def deep_merge(base: Mapping, override: Mapping) -> Dict[str, Any]:
+    """
+    Return a new dict with override merged into base.
+
+    Nested mappings present on both sides are merged recursively; other
+    values from override replace those of base. Neither input is modified,
+    sub-trees that are not merged are shared with the inputs.
+    """
+    merged = dict(base)
+    for key, value in override.items():
+        current = merged.get(key)
+        if isinstance(value, Mapping) and isinstance(current, Mapping):
+            merged[key] = deep_merge(current, value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def ioc_defaults_of(config: Optional[Mapping]) -> Dict[str, Any]:
+    """Return the iocDefaults mapping of a beamline configuration (may be empty)."""
+    if not config:
+        return {}
+    epics_config = config.get('epicsConfiguration') or {}
+    defaults = epics_config.get('iocDefaults')
+    if defaults is None:
+        defaults = config.get('iocDefaults')
+    return defaults if isinstance(defaults, Mapping) else {}
+
+
+class IocDefaults:
+    """
+    Resolves IOC configurations against the iocDefaults templates.
+
+    Args:
+        templates: The iocDefaults mapping, template name -> settings
+        log: Logger (optional)
+    """
+
+    def __init__(self, templates: Optional[Mapping] = None,
+                 log: Optional[logging.Logger] = None):
+        self.templates = templates or {}
+        self.logger = log or logger
+        self._resolved: Dict[str, Dict[str, Any]] = {}
+
+    def template(self, name: str) -> Dict[str, Any]:
+        """
+        Fully inherited settings of a template ({} if it is not defined).
+
+        A template naming itself, or a missing parent, ends the chain;
+        a longer cycle is reported and broken where it closes.
+        """
+        resolved = self._resolved.get(name)
+        if resolved is not None:
+            return resolved
+
+        # Walk up to the first template already resolved (or the root)
+        chain = []
+        current = name
+        while current is not None and current not in self._resolved:
+            if current in chain:
+                self.logger.error(
+                    f"iocDefaults template cycle: {' -> '.join(chain + [current])}"
+                )
+                break
+            settings = self.templates.get(current)
+            if not isinstance(settings, Mapping):
+                if settings is not None or current == name:
+                    self.logger.warning(f"Unknown iocDefaults template '{current}'")
+                self._resolved[current] = {}
+                break
+            chain.append(current)
+            parent = settings.get('template')
+            current = parent if parent != current else None
+
+        # Merge from the root down, memoizing every level
+        for template_name in reversed(chain):
+            settings = self.templates[template_name]
+            parent = settings.get('template')
+            base = self._resolved.get(parent, {}) if parent not in (None, template_name) else {}
+            self._resolved[template_name] = deep_merge(base, settings)
+        return self._resolved[name]
+
+    def resolve_ioc(self, ioc_config: Mapping) -> Mapping:
+        """
+        IOC configuration merged over its template defaults.
+
+        Returned unchanged (same object) if the IOC has no template or the
+        template has no defaults, otherwise as a ConfigView over the
+        (shared) template settings.
+        """
+        name = ioc_config.get('template')
+        if not name or not self.templates or name not in self.templates:
+            return ioc_config
+        defaults = self.template(name)
+        if not defaults:
+            return ioc_config
+        return ConfigView(ioc_config, defaults)
@@ -0,0 +1,162 @@
+"""
+Lazy device proxy returned by DeviceFactory in lazy mode.
+
+A LazyDevice keeps everything needed to build a device (class, prefix,
+name, config) and only instantiates the real Ophyd device - opening its
+Channel Access channels - the first time one of its attributes is used.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyDevice:
+    """Proxy that constructs the wrapped device on first attribute access.
+
+    ``name``, ``prefix`` and the configuration accessors (``get_config()``,
+    ``iocname()``, ``devtype()``, ``devgroup()``) are answered by the proxy
+    itself and never trigger construction. ``isinstance`` checks against
+    the device class also work without building the device.
+
+    Parameters
+    ----------
+    device_class : type
+        Class to instantiate.
+    kwargs : dict
+        Keyword arguments for the constructor; must contain ``prefix`` and
+        ``name``.
+    """
+
+    __slots__ = ('_device_class', '_kwargs', '_device', '_lock', '__weakref__')
+
+    def __init__(self, device_class: type, kwargs: Dict[str, Any]):
+        object.__setattr__(self, '_device_class', device_class)
+        object.__setattr__(self, '_kwargs', kwargs)
+        object.__setattr__(self, '_device', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    # ------------------------------------------------------------------
+    # Proxy API
+    # ------------------------------------------------------------------
+
+    @property
+    def device_class(self) -> type:
+        return self._device_class
+
+    @property
+    def is_resolved(self) -> bool:
+        """True once the real device has been constructed."""
+        return self._device is not None
+
+    def resolve(self):
+        """Construct the real device if needed and return it.
+
+        Construction errors are logged and re-raised; the next access
+        will try again.
+        """
+        device = self._device
+        if device is not None:
+            return device
+        with self._lock:
+            if self._device is None:
+                try:
+                    device = self._device_class(**self._kwargs)
+                except Exception as e:
+                    logger.error(
+                        f"Failed to create device {self.name} "
+                        f"({self._device_class.__name__}): {e}"
+                    )
+                    raise
+                logger.debug(
+                    f"Created {self._device_class.__name__} for {self.name} "
+                    f"with prefix {self.prefix} on first access"
+                )
+                object.__setattr__(self, '_device', device)
+            return self._device
+
+    def reconfigure(self, **kwargs):
+        """Replace constructor arguments (e.g. ``config``, ``poi``).
+
+        The new values are used if the device is built later; a device
+        that is already built is reconfigured through its own
+        ``reconfigure()`` method, or gets its ``_config`` replaced.
+        """
+        self._kwargs.update(kwargs)
+        device = self._device
+        if device is None:
+            return
+        if callable(getattr(type(device), 'reconfigure', None)):
+            device.reconfigure(**kwargs)
+            return
+        if 'config' in kwargs:
+            device._config = kwargs['config']
+        if 'poi' in kwargs and hasattr(device, 'poi'):
+            device.poi = kwargs['poi']
+
+    # ------------------------------------------------------------------
+    # Metadata available without construction
+    # ------------------------------------------------------------------
+
+    @property
+    def name(self) -> Optional[str]:
+        if self._device is not None:
+            return self._device.name
+        return self._kwargs.get('name')
+
+    @property
+    def prefix(self) -> str:
+        if self._device is not None:
+            return self._device.prefix
+        return self._kwargs.get('prefix')
+
+    @property
+    def _config(self) -> Optional[Dict[str, Any]]:
+        return self._kwargs.get('config')
+
+    def get_config(self) -> Optional[Dict[str, Any]]:
+        """Return the device configuration if available."""
+        return self._config
+
+    def iocname(self) -> Optional[str]:
+        """Return the IOC name from configuration if available."""
+        return self._config.get('iocname') if self._config else None
+
+    def devtype(self) -> Optional[str]:
+        """Return the device type from configuration if available."""
+        return self._config.get('devtype') if self._config else None
+
+    def devgroup(self) -> Optional[str]:
+        """Return the device group from configuration if available."""
+        return self._config.get('devgroup') if self._config else None
+
+    @property
+    def __class__(self):
+        # Lets isinstance(proxy, DeviceClass) succeed without building
+        return self._device_class
+
+    # ------------------------------------------------------------------
+    # Forwarding
+    # ------------------------------------------------------------------
+
+    def __getattr__(self, attr):
+        return getattr(self.resolve(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.resolve(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self.resolve(), attr)
+
+    def __dir__(self):
+        names = set(dir(self._device_class))
+        if self._device is not None:
+            names.update(dir(self._device))
+        return sorted(names)
+
+    def __repr__(self):
+        state = 'resolved' if self._device is not None else 'not connected'
+        return (f"<LazyDevice {self._device_class.__name__} "
+                f"name={self.name!r} prefix={self.prefix!r} ({state})>")
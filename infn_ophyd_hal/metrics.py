@@ -0,0 +1,429 @@
+"""
+Per-signal hot-path metrics with Prometheus text output.
+
+An instrumented device counts, for each of its signals, the ``get()`` and
+``put()`` calls, the subscription callbacks run (monitor events), the
+timeouts and the disconnections, and records get/put latency histograms.
+``render_prometheus()`` formats them in the Prometheus text exposition
+format; an exporter publishes them (HTTP ``/metrics`` endpoint or a file
+for the node-exporter textfile collector).
+
+Devices are instrumented explicitly, or by ``metrics: true`` in their
+configuration (registered in ``default_metrics()``)::
+
+    >>> metrics = default_metrics()
+    >>> metrics.instrument(devices)                 # factory dict or device
+    >>> PrometheusHttpExporter(metrics, port=9400).start()
+
+The counters are plain slot attributes updated without a lock: each
+signal's counters, histogram buckets and the bound methods updating them
+are allocated once, when it is instrumented, and an update is a few
+attribute increments. A signal's series are dropped from the output once
+the signal is garbage collected. Under heavy
+thread contention an increment may occasionally be lost, which is
+acceptable for load accounting.
+"""
+
+import logging
+import os
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (counts per bucket, not cumulative)."""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class SignalMetrics:
+    """Counters of one instrumented signal."""
+
+    __slots__ = ('labels', 'gets', 'puts', 'callbacks', 'timeouts', 'disconnects',
+                 'get_seconds', 'put_seconds', 'connected')
+
+    def __init__(self, labels: Tuple[Tuple[str, str], ...]):
+        self.labels = labels
+        self.gets = 0
+        self.puts = 0
+        self.callbacks = 0
+        self.timeouts = 0
+        self.disconnects = 0
+        self.get_seconds = Histogram()
+        self.put_seconds = Histogram()
+        self.connected = False
+
+
+def _instrument_signal(signal, stats: SignalMetrics):
+    """Wrap get/put/_run_subs of a signal instance to update stats."""
+    get = signal.get
+    put = signal.put
+    run_subs = signal._run_subs
+    clock = time.perf_counter
+    sub_value = getattr(signal, 'SUB_VALUE', 'value')
+    sub_meta = getattr(signal, 'SUB_META', 'meta')
+    # Bound once here, not looked up and bound again on every call
+    observe_get = stats.get_seconds.observe
+    observe_put = stats.put_seconds.observe
+
+    def timed_get(*args, **kwargs):
+        stats.gets += 1
+        start = clock()
+        try:
+            return get(*args, **kwargs)
+        except TimeoutError:
+            stats.timeouts += 1
+            raise
+        finally:
+            observe_get(clock() - start)
+
+    def timed_put(*args, **kwargs):
+        stats.puts += 1
+        start = clock()
+        try:
+            return put(*args, **kwargs)
+        except TimeoutError:
+            stats.timeouts += 1
+            raise
+        finally:
+            observe_put(clock() - start)
+
+    def counted_run_subs(*args, sub_type, **kwargs):
+        if sub_type == sub_value:
+            stats.callbacks += 1
+        elif sub_type == sub_meta:
+            connected = bool(kwargs.get('connected'))
+            if stats.connected and not connected:
+                stats.disconnects += 1
+            stats.connected = connected
+        return run_subs(*args, sub_type=sub_type, **kwargs)
+
+    signal.get = timed_get
+    signal.put = timed_put
+    signal._run_subs = counted_run_subs
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+
+
+class MetricsRegistry:
+    """
+    Metrics of the instrumented signals.
+
+    Thread safe for instrumenting; the counters themselves are unlocked.
+    """
+
+    # (metric suffix, SignalMetrics attribute, help)
+    COUNTERS = (
+        ('gets_total', 'gets', 'get() calls'),
+        ('puts_total', 'puts', 'put() calls'),
+        ('callbacks_total', 'callbacks', 'Value subscription events (CA monitor updates)'),
+        ('timeouts_total', 'timeouts', 'get()/put() calls that timed out'),
+        ('disconnects_total', 'disconnects', 'Disconnections of the channel'),
+    )
+    HISTOGRAMS = (
+        ('get_seconds', 'get_seconds', 'get() latency'),
+        ('put_seconds', 'put_seconds', 'put() latency'),
+    )
+
+    def __init__(self, namespace: str = 'epik8s_signal'):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        # Metrics of the live signals, by id(stats); a signal's entry is
+        # removed when it is garbage collected
+        self._signals: Dict[int, SignalMetrics] = {}
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def __len__(self) -> int:
+        return len(self._signals)
+
+    def instrument(self, devices: Union[Mapping, Iterable, Any],
+                   signals: Optional[Iterable[str]] = None) -> int:
+        """
+        Instrument the signals of one or more devices.
+
+        Args:
+            devices: A device, a dictionary of key to device (as returned
+                     by the factory) or an iterable of devices
+            signals: Signal attribute names (optional, defaults to every
+                     instantiated signal of each device)
+
+        Returns:
+            Number of signals newly instrumented (already instrumented
+            ones are skipped)
+        """
+        if isinstance(devices, Mapping):
+            devices = devices.values()
+        elif hasattr(devices, 'walk_signals') or not isinstance(devices, Iterable):
+            devices = (devices,)
+        added = 0
+        for device in devices:
+            added += self._instrument_device(device, signals)
+        return added
+
+    def _instrument_device(self, device, signals: Optional[Iterable[str]]) -> int:
+        if signals is not None:
+            items = [(attr, getattr(device, attr, None)) for attr in signals]
+        elif hasattr(device, 'walk_signals'):
+            items = [(item.dotted_name, item.item)
+                     for item in device.walk_signals(include_lazy=False)]
+        else:
+            logger.debug(f"{getattr(device, 'name', device)}: no signals to instrument")
+            return 0
+        iocname = getattr(device, '_iocname', None) or ''
+        device_name = getattr(device, 'name', None) or ''
+        added = 0
+        for attr, signal in items:
+            if signal is None or not hasattr(signal, '_run_subs'):
+                continue
+            with self._lock:
+                if getattr(signal, '_metrics', None) is not None:
+                    continue
+                stats = SignalMetrics((
+                    ('device', device_name),
+                    ('signal', attr),
+                    ('iocname', iocname),
+                    ('pv', getattr(signal, 'pvname', None) or ''),
+                ))
+                self._signals[id(stats)] = stats
+                signal._metrics = stats
+            weakref.finalize(signal, self._forget, id(stats))
+            stats.connected = bool(getattr(signal, 'connected', False))
+            _instrument_signal(signal, stats)
+            added += 1
+        return added
+
+    def _forget(self, key: int):
+        with self._lock:
+            self._signals.pop(key, None)
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """Add a function returning extra Prometheus text lines to render()."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def stats(self, signal) -> Optional[SignalMetrics]:
+        """Metrics of an instrumented signal (None if not instrumented)."""
+        return getattr(signal, '_metrics', None)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            signals = list(self._signals.values())
+            collectors = list(self._collectors)
+        labels = [_format_labels(stats.labels) for stats in signals]
+        lines = []
+        for suffix, attr, help_text in self.COUNTERS:
+            name = f'{self.namespace}_{suffix}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for stats, label in zip(signals, labels):
+                lines.append(f'{name}{{{label}}} {getattr(stats, attr)}')
+        bounds = [repr(bound) for bound in LATENCY_BUCKETS] + ['+Inf']
+        for suffix, attr, help_text in self.HISTOGRAMS:
+            name = f'{self.namespace}_{suffix}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for stats, label in zip(signals, labels):
+                histogram = getattr(stats, attr)
+                if not histogram.count:
+                    continue
+                cumulative = 0
+                for bound, count in zip(bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label}}} {histogram.sum!r}')
+                lines.append(f'{name}_count{{{label}}} {histogram.count}')
+        for collector in collectors:
+            lines.extend(collector())
+        lines.append('')
+        return '\n'.join(lines)
+
+
+_default_metrics: Optional[MetricsRegistry] = None
+_default_metrics_lock = threading.Lock()
+
+
+def default_metrics() -> MetricsRegistry:
+    """The process-wide MetricsRegistry (devices with ``metrics: true``)."""
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = MetricsRegistry()
+        return _default_metrics
+
+
+def render_prometheus(registry: Optional[MetricsRegistry] = None) -> str:
+    """Prometheus text of a registry (default: the process registry)."""
+    return (registry or default_metrics()).render()
+
+
+# ----------------------------------------------------------------------
+# Exporters
+# ----------------------------------------------------------------------
+
+class MetricsExporter(ABC):
+    """
+    Base class of the exporters publishing a MetricsRegistry.
+
+    Subclasses implement ``start()`` and ``stop()`` and publish
+    ``self.collect()``.
+
+    Args:
+        registry: Registry to export (optional, defaults to default_metrics())
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry if registry is not None else default_metrics()
+
+    def collect(self) -> str:
+        return self.registry.render()
+
+    @abstractmethod
+    def start(self) -> 'MetricsExporter':
+        """Start publishing; returns self."""
+
+    @abstractmethod
+    def stop(self):
+        """Stop publishing."""
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class PrometheusHttpExporter(MetricsExporter):
+    """
+    Serves the metrics on ``http://addr:port/metrics`` from a daemon thread.
+
+    Args:
+        registry: Registry to export (optional)
+        port: TCP port (0 picks a free one, see ``port`` after start())
+        addr: Address to bind (default: all interfaces)
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None,
+                 port: int = 9400, addr: str = ''):
+        super().__init__(registry)
+        self.port = port
+        self.addr = addr
+        self._server = None
+        self._thread = None
+
+    def start(self) -> 'PrometheusHttpExporter':
+        if self._server is not None:
+            return self
+        import http.server
+        exporter = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = exporter.collect().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self._server = http.server.ThreadingHTTPServer((self.addr, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='metrics-exporter', daemon=True)
+        self._thread.start()
+        logger.info(f"Serving metrics on port {self.port}")
+        return self
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = self._thread = None
+
+
+class PrometheusTextfileExporter(MetricsExporter):
+    """
+    Rewrites a ``.prom`` file every ``interval`` seconds, for the
+    node-exporter textfile collector.
+
+    Args:
+        path: File to write (replaced atomically)
+        registry: Registry to export (optional)
+        interval: Seconds between writes
+    """
+
+    def __init__(self, path: str, registry: Optional[MetricsRegistry] = None,
+                 interval: float = 15.0):
+        super().__init__(registry)
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        """Write the metrics now."""
+        tmp = f'{self.path}.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                f.write(self.collect())
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.error(f"Cannot write metrics to {self.path}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def start(self) -> 'PrometheusTextfileExporter':
+        if self._thread is None:
+            self._stop.clear()
+            self.write()
+            self._thread = threading.Thread(target=self._run, name='metrics-textfile',
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.write()
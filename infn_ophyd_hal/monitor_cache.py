@@ -0,0 +1,151 @@
+"""
+Monitor-backed readback cache.
+
+By default every ``get()`` of a readback signal is a CA round trip. With
+``cache: monitor`` in the device configuration the readback signals
+listed in the class ``_readback_signals`` subscribe to a CA monitor, and
+``get()`` returns the last value the IOC pushed, with its timestamp,
+without going to the network.
+
+``max_age`` bounds how stale a cached value may be: when the last monitor
+update (or real read) is older than ``max_age`` seconds, ``get()`` makes a
+real CA get instead. Monitors only fire on change, so a value that is
+steady for longer than ``max_age`` costs one read per ``max_age``.
+
+Configuration::
+
+    cache: monitor
+
+    cache:
+      mode: monitor
+      max_age: 2.0      # seconds (optional)
+
+An explicit ``get(use_monitor=...)`` is always honoured.
+"""
+
+import logging
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MONITOR = 'monitor'
+CACHE_MODES = ('none', MONITOR)
+
+
+def cache_settings(config: Optional[Any],
+                   log: Optional[logging.Logger] = None) -> Tuple[Optional[str], Optional[float]]:
+    """
+    Cache mode and max_age from a device configuration.
+
+    Args:
+        config: Device configuration (optional)
+        log: Logger (optional)
+
+    Returns:
+        (mode, max_age); mode is None when no cache is configured or the
+        setting is invalid (logged)
+    """
+    log = log or logger
+    setting = config.get('cache') if isinstance(config, Mapping) else None
+    if not setting:
+        return None, None
+    max_age = None
+    if isinstance(setting, Mapping):
+        mode = setting.get('mode', MONITOR)
+        max_age = setting.get('max_age')
+    else:
+        mode = setting
+    mode = str(mode).lower()
+    if mode not in CACHE_MODES:
+        log.error(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+        return None, None
+    if max_age is not None:
+        try:
+            max_age = float(max_age)
+        except (TypeError, ValueError):
+            log.error(f"Invalid cache max_age '{max_age}', expected seconds")
+            return None, None
+        if max_age <= 0:
+            max_age = None
+    return (MONITOR if mode == MONITOR else None), max_age
+
+
+class MonitoredReadback:
+    """
+    Serves ``get()`` of one EPICS signal from its CA monitor.
+
+    Installed as the ``get`` of the signal instance, wrapping the get
+    found there; ``remove()`` puts that one back.
+
+    Args:
+        signal: EpicsSignal or EpicsSignalRO
+        max_age: Seconds after which a real get is made (optional)
+    """
+
+    __slots__ = ('signal', 'max_age', 'updated', '_get', '_previous',
+                 '_auto_monitor', '_cid')
+
+    def __init__(self, signal, max_age: Optional[float] = None):
+        self.signal = signal
+        self.max_age = max_age
+        # time.monotonic() of the last monitor update or real read
+        self.updated = None
+        self._previous = vars(signal).get('get')
+        self._get = signal.get
+        # Restored by remove(): the signal may have been monitored already
+        self._auto_monitor = getattr(signal, '_auto_monitor', False)
+        signal._auto_monitor = True
+        self._cid = signal.subscribe(self._on_update, run=False)
+        signal.get = self.get
+
+    def _on_update(self, **kwargs):
+        self.updated = time.monotonic()
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the cached value was refreshed (None if never)."""
+        updated = self.updated
+        return None if updated is None else time.monotonic() - updated
+
+    def get(self, **kwargs):
+        if kwargs.get('use_monitor') is None and self.max_age is not None:
+            age = self.age
+            if age is None or age > self.max_age:
+                kwargs['use_monitor'] = False
+                value = self._get(**kwargs)
+                # pyepics keeps the value read, the cache is fresh again
+                self.updated = time.monotonic()
+                return value
+        return self._get(**kwargs)
+
+    def remove(self):
+        """Go back to a CA round trip per get()."""
+        signal = self.signal
+        if vars(signal).get('get') == self.get:
+            if self._previous is None:
+                del signal.get
+            else:
+                signal.get = self._previous
+        else:
+            # Wrapped again since: stay in the chain as a pass-through
+            self.max_age = None
+        signal.unsubscribe(self._cid)
+        signal._auto_monitor = self._auto_monitor
+
+
+def enable_monitor_cache(device, attrs: Iterable[str],
+                         max_age: Optional[float] = None) -> Dict[str, MonitoredReadback]:
+    """
+    Serve the given readback signals of a device from CA monitors.
+
+    Args:
+        device: Device holding the signals
+        attrs: Signal attribute names
+        max_age: Seconds after which a real get is made (optional)
+
+    Returns:
+        Dictionary of attribute name to MonitoredReadback
+    """
+    return {attr: MonitoredReadback(getattr(device, attr), max_age) for attr in attrs}
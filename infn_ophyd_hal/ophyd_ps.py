@@ -1,7 +1,12 @@
 from enum import Enum
 from abc import ABC, abstractmethod
+import logging
 import time
 
+from .class_path import import_class_path
+
+logger = logging.getLogger(__name__)
+
 # Enum for power supply states
 class ophyd_ps_state(str, Enum):
     OFF = "OFF"
@@ -93,15 +98,24 @@ class PowerSupplyState(ABC):
         pass
     
 class PowerSupplyFactory:
-    _registry = {}
+    # Constructors may be given as "module:Class" strings, imported on
+    # first use so that registering a type costs nothing
+    _registry = {
+        "sim": "infn_ophyd_hal.ophyd_ps_sim:OphydPSSim",
+        "dante": "infn_ophyd_hal.ophyd_ps_dantemag:OphydPSDante",
+        "unimag": "infn_ophyd_hal.unimag_ophyd_ps:OphydPSUnimag",
+    }
 
     @classmethod
     def register_type(cls, supply_type, constructor):
-        print(f"* registered type {supply_type}")
+        logger.debug(f"registered power supply type {supply_type}")
         cls._registry[supply_type] = constructor
 
     @classmethod
     def create(cls, supply_type, name, *args, **kwargs):
         if supply_type not in cls._registry:
             raise ValueError(f"Unknown PowerSupply type: {supply_type}")
-        return cls._registry[supply_type](name, *args, **kwargs)
\ No newline at end of file
+        constructor = cls._registry[supply_type]
+        if isinstance(constructor, str):
+            constructor = cls._registry[supply_type] = import_class_path(constructor)
+        return constructor(name, *args, **kwargs)
\ No newline at end of file
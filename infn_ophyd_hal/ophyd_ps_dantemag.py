@@ -1,7 +1,7 @@
 import time
 import random
 from threading import Thread
-from infn_ophyd_hal import OphydPS, ophyd_ps_state, PowerSupplyState
+from .ophyd_ps import OphydPS, ophyd_ps_state, PowerSupplyState
 from ophyd import Component as Cpt, EpicsSignal, EpicsSignalRO
 from .epik8s_device import epik8sDevice
 
@@ -147,6 +147,9 @@ class OphydPSDante(OphydPS, epik8sDevice):
     current = Cpt(EpicsSignal, ':current')
     polarity= Cpt(EpicsSignal, ':polarity')
     mode = Cpt(EpicsSignal, ':mode')
+    _readback_signals = ('current_rb', 'polarity_rb', 'mode_rb')
+    # Mode and polarity are restored before the current
+    _setpoint_signals = ('mode', 'polarity', 'current')
 
     def __init__(self, name, prefix, max=10, min=-10, bipolar=None, verbose=0, zero_error=1.5, sim_cycle=1, th_stdby=0.5, th_current=0.01, **kwargs):
         """
@@ -186,10 +189,25 @@ class OphydPSDante(OphydPS, epik8sDevice):
 
         self._state_instance=OnInit()
         self.transition_to(OnInit)
-
-        self.current_rb.subscribe(self._on_current_change)
-        self.polarity_rb.subscribe(self._on_pol_change)
-        self.mode_rb.subscribe(self._on_mode_change)
+        # External changes seen by the _store_* hooks, reported when dispatched
+        self._bipolar_found = False
+        self._external_polarity = False
+        self._previous_polarity_set = None
+        self._external_state = False
+        self._previous_state_set = None
+
+        # State is stored on the monitor thread, notifications, logging and
+        # state machine transitions are dispatched
+        self._subscribe(self.current_rb, self._on_current_change,
+                        state=self._store_current)
+        self._subscribe(self.polarity_rb, self._on_pol_change,
+                        state=self._store_polarity)
+        self._subscribe(self.mode_rb, self._on_mode_change,
+                        state=self._store_mode)
+        if not self._defer_connect:
+            self._on_connected()
+
+    def _on_connected(self):
         ## access all variable to check if they exist
         self._current = self.current_rb.get()
         self._polarity= self.polarity_rb.get()
@@ -200,16 +218,17 @@ class OphydPSDante(OphydPS, epik8sDevice):
         self._mode = self.mode_rb.get()
         self._setpoint= self.current_rb.get()
 
-        print(f"* creating Dante Mag {name} as {prefix} min={min},max={max} state: {self._state}")
+        print(f"* creating Dante Mag {self.name} as {self.prefix} min={self.min_current},max={self.max_current} state: {self._state}")
 
         self.run()
         
-    def _on_current_change(self, pvname=None, value=None, **kwargs):
-        
+    def _store_current(self, value=None, **kwargs):
         if not(self._bipolar) and (self._polarity != None) and (self._polarity<2 and self._polarity > -2):
             self._current = value*self._polarity
         else:
             self._current = value
+
+    def _on_current_change(self, pvname=None, value=None, **kwargs):
         if self._verbose > 1:
          print(f"{self.name} current changed {value} setpoint: {self._setpoint}")
         self.on_current_change(self._current,self)
@@ -239,41 +258,53 @@ class OphydPSDante(OphydPS, epik8sDevice):
             return ophyd_ps_state.INTERLOCK
         return ophyd_ps_state.ERROR
         
-    def _on_pol_change(self, pvname=None, value=None, **kwargs):
+    def _store_polarity(self, value=None, **kwargs):
         self._polarity = value
-        pr=f"{self.name}[{self._state_instance.state} {self._setstate} {self.last_state_set}]"
-
         if self._polarity == 3 and self._bipolar == False:
             self._bipolar = True
+            self._bipolar_found = True
+        if self._polarity != self.last_polarity_set:
+            self._external_polarity = True
+            self._previous_polarity_set = self.last_polarity_set
+            if self._current is not None and self._polarity is not None:
+                self._setpoint = self._current*self._polarity
+            self.last_polarity_set = self._polarity
+
+    def _on_pol_change(self, pvname=None, value=None, **kwargs):
+        if self._bipolar_found:
+            self._bipolar_found = False
             print(f"{self.name} is bipolar")
+        if self._external_polarity:
+            self._external_polarity = False
+            print(f"{self.name} external change last polarity {self._previous_polarity_set}")
+        pr=f"{self.name}[{self._state_instance.state} {self._setstate} {self.last_state_set}]"
         if self._verbose:
             print(f"{pr}  polarity changed {value} set state {self._setstate}")
-        if self._polarity != self.last_polarity_set:
-            print(f"{self.name} external change last polarity {self.last_polarity_set}")
-            self._setpoint = self._current*self._polarity
-            self.last_polarity_set = self._polarity
-            
-            
-    def _on_mode_change(self, pvname=None, value=None, **kwargs):
-        
+
+    def _store_mode(self, value=None, **kwargs):
         self._state=self.decodeStatus(value)
         self._mode = value
-        pr=f"{self.name}[{self._state_instance.state} {self._setstate} {self.last_state_set}]"
-
-        if self._verbose:
-            print(f"{pr} mode changed {value} -> {self._state} setstate {self._setstate}")
         if self._state != self.last_state_set and self._state_instance.state!="waitStandby":  
-            print(f"{self.name} external change last state {self.last_state_set}")
+            self._external_state = True
+            self._previous_state_set = self.last_state_set
             self._setstate = self._state
             self.last_state_set = self._state
 
-        self.on_state_change(self._state,self)
+    def _on_mode_change(self, pvname=None, value=None, **kwargs):
+        if self._external_state:
+            self._external_state = False
+            print(f"{self.name} external change last state {self._previous_state_set}")
+        # Coalesced updates: follow the last stored state
         if(self._state==ophyd_ps_state.ON):
             self.transition_to(OnState)
         elif (self._state==ophyd_ps_state.OFF) or (self._state==ophyd_ps_state.STANDBY):
             self.transition_to(StandbyState)
         else:
             self.transition_to(ErrorState)
+        pr=f"{self.name}[{self._state_instance.state} {self._setstate} {self.last_state_set}]"
+        if self._verbose:
+            print(f"{pr} mode changed {value} -> {self._state} setstate {self._setstate}")
+        self.on_state_change(self._state,self)
 
 
     def get_features(self) -> dict:
@@ -344,6 +375,11 @@ class OphydPSDante(OphydPS, epik8sDevice):
         if self._run_thread is not None:
             self._run_thread.join()
 
+    def destroy(self):
+        """Stop the control loop and release the CA channels."""
+        self.stop()
+        super().destroy()
+
     def _run_device(self):
         print(f"* controlling dante ps {self.name}")
 
@@ -1,7 +1,7 @@
 import time
 import random
 from threading import Thread
-from infn_ophyd_hal import OphydPS,ophyd_ps_state
+from .ophyd_ps import OphydPS, ophyd_ps_state
 
 
     
@@ -0,0 +1,265 @@
+"""
+Start-up profiling for DeviceFactory.
+
+With ``DeviceFactory(profile=True)`` the factory records, for every device
+it creates, the time spent in each start-up phase:
+
+- ``merge``: merging the IOC (and iocDefaults) config with the device entry
+- ``filter``: evaluating the filters on the merged config
+- ``construct``: running the device class constructor
+- ``connect``: waiting for the CA channels, measured from the end of
+  construction (devices are built with ``defer_connect`` and connected
+  in bulk while profiling)
+- ``first_get``: the first ``get()`` on the connected device
+
+``StartupProfile.summary()`` formats the slowest devices and per-IOC
+totals as a table; ``report()`` returns the same data, plus a latency
+histogram, as a JSON-serialisable dict.
+
+Example:
+    >>> factory = DeviceFactory(profile=True)
+    >>> devices = factory.create_devices_from_file('values.yaml')
+    >>> print(factory.startup_profile.summary())
+    >>> json.dump(factory.startup_profile.report(), open('startup.json', 'w'))
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+PHASES = ('merge', 'filter', 'construct', 'connect', 'first_get')
+
+# Upper bounds (ms) of the latency histogram buckets
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class _DeviceRecord:
+    __slots__ = ('iocname', 'name', 'key', 'devgroup', 'devtype', 'device_class',
+                 'selected', 'connected', 'error', 'phases')
+
+    def __init__(self, iocname: str, name: str):
+        self.iocname = iocname
+        self.name = name
+        self.key = None
+        self.devgroup = None
+        self.devtype = None
+        self.device_class = None
+        self.selected = False
+        self.connected = None
+        self.error = None
+        self.phases: Dict[str, float] = {}
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = {
+            'key': self.key,
+            'name': self.name,
+            'iocname': self.iocname,
+            'devgroup': self.devgroup,
+            'devtype': self.devtype,
+            'class': self.device_class,
+            'connected': self.connected,
+            'error': self.error,
+        }
+        for phase in PHASES:
+            data[phase] = self.phases.get(phase)
+        data['total'] = self.total
+        return data
+
+
+class StartupProfile:
+    """Per-device start-up timings collected by a profiling DeviceFactory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: Dict[Tuple[str, str], _DeviceRecord] = {}
+        self._ioc_merge: Dict[str, float] = {}
+        self._keys: Dict[str, _DeviceRecord] = {}
+        self._connect_start: Optional[float] = None
+        self.wall_time = 0.0
+
+    def clear(self):
+        """Forget all timings, e.g. before profiling another configuration."""
+        with self._lock:
+            self._records.clear()
+            self._ioc_merge.clear()
+            self._keys.clear()
+            self._connect_start = None
+            self.wall_time = 0.0
+
+    # ------------------------------------------------------------------
+    # Recording (called by the factory)
+    # ------------------------------------------------------------------
+
+    def _record(self, iocname: str, name: str) -> _DeviceRecord:
+        record = self._records.get((iocname, name))
+        if record is None:
+            with self._lock:
+                record = self._records.setdefault((iocname, name),
+                                                  _DeviceRecord(iocname, name))
+        return record
+
+    def add(self, iocname: str, name: str, phase: str, seconds: float):
+        """Add time spent by a device in a phase."""
+        phases = self._record(iocname, name).phases
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+    def add_ioc_merge(self, iocname: str, seconds: float):
+        """Time spent resolving an IOC config over its iocDefaults template."""
+        self._ioc_merge[iocname] = self._ioc_merge.get(iocname, 0.0) + seconds
+
+    def selected(self, spec):
+        """Mark a device spec as passing the filters."""
+        record = self._record(spec.iocname, spec.name)
+        record.selected = True
+        record.devgroup = spec.devgroup
+        record.devtype = spec.devtype
+
+    def built(self, spec, device, seconds: float):
+        """Record the construction of a device (device is None on failure)."""
+        record = self._record(spec.iocname, spec.name)
+        record.phases['construct'] = seconds
+        if device is None:
+            record.error = 'construction failed'
+        else:
+            cls = getattr(device, 'device_class', None) or type(device)
+            record.device_class = cls.__name__
+
+    def registered(self, spec, key: str):
+        """Record the key a device was stored under."""
+        record = self._record(spec.iocname, spec.name)
+        record.key = key
+        self._keys[key] = record
+
+    def connect_started(self):
+        """Called when the bulk connection wait starts."""
+        self._connect_start = time.perf_counter()
+
+    def connected(self, key: str):
+        """Called by the bulk connection wait when all PVs of a device are up."""
+        record = self._keys.get(key)
+        if record is not None and self._connect_start is not None:
+            # From the start of the wait: the PVs of every device are
+            # searched together, not from the end of each constructor
+            record.phases['connect'] = time.perf_counter() - self._connect_start
+            record.connected = True
+
+    def time_first_get(self, devices: Dict[str, object], failed=()):
+        """Time the first get() of every connected device."""
+        for key, device in devices.items():
+            record = self._keys.get(key)
+            if record is None:
+                continue
+            if key in failed:
+                record.connected = False
+                continue
+            if getattr(device, 'is_resolved', True) is False:
+                continue
+            get = getattr(device, 'get', None)
+            if not callable(get):
+                continue
+            start = time.perf_counter()
+            try:
+                get()
+            except Exception as e:
+                record.error = f"first get failed: {e}"
+            record.phases['first_get'] = time.perf_counter() - start
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def devices(self) -> List[Dict[str, Any]]:
+        """Timings of the selected devices, in configuration order."""
+        return [r.as_dict() for r in self._records.values() if r.selected]
+
+    def report(self, slowest: int = 20) -> Dict[str, Any]:
+        """
+        Machine-readable report.
+
+        Args:
+            slowest: Number of devices listed under 'slowest'
+
+        Returns:
+            Dict with 'wall_time', per-phase 'phases' totals, 'devices',
+            'slowest', per-IOC totals under 'iocs' and a latency
+            'histogram' (device total time, bucket upper bounds in ms).
+            Times are in seconds.
+        """
+        records = [r for r in self._records.values() if r.selected]
+        phases = {phase: 0.0 for phase in PHASES}
+        iocs: Dict[str, Dict[str, Any]] = {}
+        for record in self._records.values():
+            ioc = iocs.setdefault(record.iocname, dict(
+                {'devices': 0, 'failed': 0}, **{phase: 0.0 for phase in PHASES}))
+            for phase, seconds in record.phases.items():
+                ioc[phase] += seconds
+                phases[phase] += seconds
+            if record.selected:
+                ioc['devices'] += 1
+                if record.error or record.connected is False:
+                    ioc['failed'] += 1
+        for iocname, seconds in self._ioc_merge.items():
+            if iocname in iocs:
+                iocs[iocname]['merge'] += seconds
+                phases['merge'] += seconds
+        for ioc in iocs.values():
+            ioc['total'] = sum(ioc[phase] for phase in PHASES)
+
+        histogram = [{'le_ms': bound, 'count': 0} for bound in HISTOGRAM_BUCKETS_MS]
+        histogram.append({'le_ms': None, 'count': 0})
+        for record in records:
+            total_ms = record.total * 1e3
+            for bucket in histogram:
+                if bucket['le_ms'] is None or total_ms <= bucket['le_ms']:
+                    bucket['count'] += 1
+                    break
+
+        ranked = sorted(records, key=lambda r: r.total, reverse=True)
+        return {
+            'wall_time': self.wall_time,
+            'phases': phases,
+            'devices': [r.as_dict() for r in records],
+            'slowest': [r.as_dict() for r in ranked[:slowest]],
+            'iocs': dict(sorted(iocs.items(), key=lambda item: item[1]['total'],
+                                reverse=True)),
+            'histogram': histogram,
+        }
+
+    def summary(self, slowest: int = 10) -> str:
+        """Human-readable table of the slowest devices and IOCs (times in ms)."""
+        report = self.report(slowest)
+        header = ''.join(f"{phase:>11}" for phase in PHASES) + f"{'total':>11}"
+
+        def row(label, values):
+            cells = ''.join(
+                f"{values[phase] * 1e3:>11.1f}" if values.get(phase) is not None
+                else f"{'-':>11}" for phase in PHASES)
+            return f"{label:<32}{cells}{values['total'] * 1e3:>11.1f}"
+
+        lines = [
+            f"Start-up profile: {len(report['devices'])} devices, "
+            f"wall time {report['wall_time']:.3f}s",
+            '',
+            f"{'slowest devices':<32}{header}",
+        ]
+        for device in report['slowest']:
+            label = device['key'] or device['name']
+            if device['error'] or device['connected'] is False:
+                label += ' !'
+            lines.append(row(label[:32], device))
+        lines += ['', f"{'IOC (devices)':<32}{header}"]
+        for iocname, ioc in list(report['iocs'].items())[:slowest]:
+            lines.append(row(f"{iocname} ({ioc['devices']})"[:32], ioc))
+        lines += ['', f"{'all phases':<32}{header}"]
+        lines.append(row('', dict(report['phases'], total=sum(report['phases'].values()))))
+        lines += ['', 'device latency histogram (ms):']
+        for bucket in report['histogram']:
+            if bucket['count']:
+                bound = (f"<= {bucket['le_ms']}" if bucket['le_ms']
+                         else f"> {HISTOGRAM_BUCKETS_MS[-1]}")
+                lines.append(f"  {bound:>9}  {bucket['count']}")
+        return '\n'.join(lines)
@@ -0,0 +1,353 @@
+"""
+Machine snapshot and restore of device setpoints.
+
+Every device class lists its writable setpoints in ``_setpoint_signals``
+(``user_setpoint`` of motors and analog/digital outputs, ``state`` and
+``current`` of power supplies, ``thsp`` of BPMs...). A snapshot reads them
+on all devices of a factory dict with one ``read_many`` batch, and is
+stored as columns (numpy arrays) in a compressed ``.npz`` file.
+
+Restore writes the values back in phases: the n-th setpoint of every
+device is written in phase n, all puts of a phase in parallel, and a
+phase starts once the previous one completed. The order of
+``_setpoint_signals`` therefore expresses the ordering constraints, e.g.
+a power supply state is set before its current. By default only the
+setpoints differing from the live machine are written.
+
+Example:
+    >>> snapshot = take_snapshot(devices)
+    >>> snapshot.save('machine-2024-06-10.npz')
+    >>> diff = diff_snapshot(Snapshot.load('machine-2024-06-10.npz'), devices)
+    >>> for key, signal, saved, live in diff.rows():
+    ...     print(key, signal, saved, live)
+    >>> report = restore_snapshot(snapshot, devices)
+"""
+
+import logging
+import numbers
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .batch_read import read_many
+
+logger = logging.getLogger(__name__)
+
+# Value kinds of the snapshot rows
+FLOAT, INT, TEXT = 'f', 'i', 's'
+
+
+def setpoint_signals(device) -> Sequence[str]:
+    """Writable setpoints of a device, in restore order."""
+    return getattr(device, '_setpoint_signals', None) or ()
+
+
+def _kind(value: Any) -> Optional[str]:
+    if isinstance(value, (bool, numbers.Integral)):
+        return INT
+    if isinstance(value, numbers.Real):
+        return FLOAT
+    if isinstance(value, str):
+        return TEXT
+    return None
+
+
+class Snapshot:
+    """
+    Setpoints of many devices, one row per (device key, signal).
+
+    Columns are numpy arrays of equal length: ``keys``, ``signals``,
+    ``values`` (float64, NaN for text), ``texts`` (text values, '' for
+    numbers), ``kinds`` ('f', 'i' or 's') and ``timestamps``.
+
+    Args:
+        keys, signals, values, texts, kinds, timestamps: Column sequences
+        taken_at: Time of the snapshot (seconds since the epoch)
+        failed: Device key -> setpoints that could not be read
+    """
+
+    COLUMNS = ('keys', 'signals', 'values', 'texts', 'kinds', 'timestamps')
+
+    def __init__(self, keys: Sequence[str], signals: Sequence[str], values: Sequence[float],
+                 texts: Sequence[str], kinds: Sequence[str], timestamps: Sequence[float],
+                 taken_at: Optional[float] = None,
+                 failed: Optional[Dict[str, List[str]]] = None):
+        import numpy as np
+        self.keys = np.asarray(keys, dtype=str)
+        self.signals = np.asarray(signals, dtype=str)
+        self.values = np.asarray(values, dtype=float)
+        self.texts = np.asarray(texts, dtype=str)
+        self.kinds = np.asarray(kinds, dtype='U1')
+        self.timestamps = np.asarray(timestamps, dtype=float)
+        self.taken_at = time.time() if taken_at is None else taken_at
+        self.failed = failed or {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __repr__(self):
+        return (f"Snapshot({len(self)} setpoints of {len(set(self.keys.tolist()))} devices, "
+                f"{sum(map(len, self.failed.values()))} failed)")
+
+    def value_at(self, row: int) -> Any:
+        """Value of a row, as it was read (int, float or str)."""
+        kind = self.kinds[row]
+        if kind == TEXT:
+            return str(self.texts[row])
+        if kind == INT:
+            return int(self.values[row])
+        return float(self.values[row])
+
+    def rows(self) -> Iterator[Tuple[str, str, Any]]:
+        """(key, signal, value) of every row."""
+        for row in range(len(self)):
+            yield str(self.keys[row]), str(self.signals[row]), self.value_at(row)
+
+    def value(self, key: str, signal: str, default: Any = None) -> Any:
+        """Saved value of one device setpoint (default if not in the snapshot)."""
+        import numpy as np
+        rows = np.flatnonzero((self.keys == key) & (self.signals == signal))
+        return self.value_at(rows[0]) if len(rows) else default
+
+    def select(self, keys: Iterable[str]) -> 'Snapshot':
+        """Snapshot restricted to some device keys."""
+        import numpy as np
+        keys = set(keys)
+        mask = np.isin(self.keys, list(keys))
+        return Snapshot(*(getattr(self, column)[mask] for column in self.COLUMNS),
+                        taken_at=self.taken_at,
+                        failed={k: v for k, v in self.failed.items() if k in keys})
+
+    def save(self, path: str):
+        """Write the snapshot to a compressed numpy ``.npz`` file."""
+        import numpy as np
+        failed = [(key, signal) for key, signals in self.failed.items() for signal in signals]
+        np.savez_compressed(
+            path,
+            taken_at=np.float64(self.taken_at),
+            failed_keys=np.asarray([key for key, _ in failed], dtype=str),
+            failed_signals=np.asarray([signal for _, signal in failed], dtype=str),
+            **{column: getattr(self, column) for column in self.COLUMNS},
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'Snapshot':
+        """Read a snapshot written by save()."""
+        import numpy as np
+        with np.load(path, allow_pickle=False) as data:
+            failed: Dict[str, List[str]] = {}
+            for key, signal in zip(data['failed_keys'].tolist(), data['failed_signals'].tolist()):
+                failed.setdefault(key, []).append(signal)
+            return cls(*(data[column] for column in cls.COLUMNS),
+                       taken_at=float(data['taken_at']), failed=failed)
+
+
+def _as_dict(devices) -> Dict[str, Any]:
+    if isinstance(devices, Mapping):
+        return dict(devices)
+    return {getattr(device, 'name', None) or str(pos): device
+            for pos, device in enumerate(devices)}
+
+
+def take_snapshot(devices, timeout: float = 2.0,
+                  signals: Optional[Callable[[Any], Sequence[str]]] = None,
+                  log: Optional[logging.Logger] = None) -> Snapshot:
+    """
+    Read the setpoints of many devices in one batch.
+
+    Args:
+        devices: Dictionary of device key to device (as returned by the
+                 factory), or an iterable of devices keyed by their name
+        timeout: Overall read deadline in seconds
+        signals: Function returning the setpoints to read for a device
+                 (optional, defaults to its ``_setpoint_signals``)
+        log: Logger (optional)
+
+    Returns:
+        Snapshot; setpoints not read, or not scalar, are listed in
+        ``failed``. Devices without setpoints are left out.
+    """
+    log = log or logger
+    devices = _as_dict(devices)
+    signals = signals or setpoint_signals
+    reading = read_many({key: device for key, device in devices.items() if signals(device)},
+                        signals, timeout=timeout, log=log)
+    failed = {key: list(attrs) for key, attrs in reading.failed.items()}
+    columns: Tuple[List, ...] = ([], [], [], [], [], [])
+    for key in reading.keys:
+        for signal, read in reading.values[key].items():
+            value = read['value']
+            kind = _kind(value)
+            if kind is None:
+                log.debug(f"{key}.{signal}: non scalar setpoint {value!r} not saved")
+                failed.setdefault(key, []).append(signal)
+                continue
+            for column, item in zip(columns, (
+                    key, signal,
+                    float('nan') if kind == TEXT else value,
+                    value if kind == TEXT else '',
+                    kind, read['timestamp'])):
+                column.append(item)
+    return Snapshot(*columns, failed=failed)
+
+
+class SnapshotDiff:
+    """
+    Comparison of a snapshot with the live machine, aligned with the
+    snapshot rows.
+
+    Attributes:
+        snapshot: The saved Snapshot
+        live: Snapshot of the live values
+        found: Boolean array, True where the live value was read
+        changed: Boolean array, True where the live value differs (or
+                 could not be read)
+        delta: live - saved for numeric rows (NaN otherwise)
+    """
+
+    def __init__(self, snapshot: Snapshot, live: Snapshot, rtol: float = 1e-9, atol: float = 0.0):
+        import numpy as np
+        self.snapshot = snapshot
+        self.live = live
+        index = {(key, signal): row for row, (key, signal) in
+                 enumerate(zip(live.keys.tolist(), live.signals.tolist()))}
+        positions = np.fromiter(
+            (index.get(pair, -1) for pair in zip(snapshot.keys.tolist(), snapshot.signals.tolist())),
+            dtype=np.int64, count=len(snapshot))
+        self.found = positions >= 0
+        self._positions = np.where(self.found, positions, 0)
+        live_values = np.full(len(snapshot), np.nan)
+        live_texts = np.full(len(snapshot), '', dtype=live.texts.dtype if len(live) else str)
+        if len(live):
+            live_values[self.found] = live.values[positions[self.found]]
+            live_texts[self.found] = live.texts[positions[self.found]]
+        text = snapshot.kinds == TEXT
+        same = np.where(text, snapshot.texts == live_texts,
+                        np.isclose(snapshot.values, live_values, rtol=rtol, atol=atol, equal_nan=True))
+        self.changed = ~(same & self.found)
+        self.delta = np.where(text, np.nan, live_values - snapshot.values)
+
+    def __len__(self) -> int:
+        return int(self.changed.sum())
+
+    def rows(self) -> Iterator[Tuple[str, str, Any, Any]]:
+        """(key, signal, saved value, live value or None) of the changed rows."""
+        import numpy as np
+        snapshot = self.snapshot
+        for row in np.flatnonzero(self.changed):
+            live = self.live.value_at(self._positions[row]) if self.found[row] else None
+            yield str(snapshot.keys[row]), str(snapshot.signals[row]), snapshot.value_at(row), live
+
+
+def diff_snapshot(snapshot: Snapshot, devices, timeout: float = 2.0,
+                  rtol: float = 1e-9, atol: float = 0.0,
+                  log: Optional[logging.Logger] = None) -> SnapshotDiff:
+    """
+    Compare a snapshot with the live machine.
+
+    Args:
+        snapshot: Saved snapshot
+        devices: Dictionary of device key to device, or iterable of devices
+        timeout: Overall read deadline in seconds
+        rtol, atol: Tolerances of numeric comparisons (numpy.isclose)
+        log: Logger (optional)
+
+    Returns:
+        SnapshotDiff; ``len(diff)`` is the number of setpoints differing
+    """
+    devices = _as_dict(devices)
+    wanted: Dict[str, List[str]] = {}
+    for key, signal in zip(snapshot.keys.tolist(), snapshot.signals.tolist()):
+        wanted.setdefault(key, []).append(signal)
+    by_device = {id(devices[key]): attrs for key, attrs in wanted.items() if key in devices}
+    live = take_snapshot({key: devices[key] for key in wanted if key in devices}, timeout,
+                         signals=lambda device: by_device.get(id(device), ()), log=log)
+    return SnapshotDiff(snapshot, live, rtol=rtol, atol=atol)
+
+
+class RestoreReport(NamedTuple):
+    """Outcome of restore_snapshot()."""
+    written: Dict[str, List[str]]   # key -> setpoints written
+    failed: Dict[str, List[str]]    # key -> setpoints not written (missing, error, timeout)
+    unchanged: int                  # setpoints already at the saved value
+    elapsed: float                  # seconds spent restoring
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+def restore_snapshot(snapshot: Snapshot, devices, timeout: float = 10.0,
+                     only_changed: bool = True, keys: Optional[Iterable[str]] = None,
+                     rtol: float = 1e-9, atol: float = 0.0,
+                     log: Optional[logging.Logger] = None) -> RestoreReport:
+    """
+    Write saved setpoints back to the devices.
+
+    Setpoints are written in phases following each device's
+    ``_setpoint_signals`` order; the puts of a phase run in parallel
+    (``signal.set()``) and the next phase waits for them to complete.
+
+    Args:
+        snapshot: Snapshot to restore
+        devices: Dictionary of device key to device, or iterable of devices
+        timeout: Completion timeout of each phase in seconds
+        only_changed: Write only the setpoints differing from the live
+                      values (one extra batched read)
+        keys: Restore only these devices (optional)
+        rtol, atol: Tolerances deciding that a numeric setpoint changed
+        log: Logger (optional)
+
+    Returns:
+        RestoreReport
+    """
+    import numpy as np
+
+    log = log or logger
+    start = time.monotonic()
+    devices = _as_dict(devices)
+    if keys is not None:
+        snapshot = snapshot.select(keys)
+    rows = np.arange(len(snapshot))
+    if only_changed:
+        diff = diff_snapshot(snapshot, devices, rtol=rtol, atol=atol, log=log)
+        rows = np.flatnonzero(diff.changed)
+    unchanged = len(snapshot) - len(rows)
+
+    written: Dict[str, List[str]] = {}
+    failed: Dict[str, List[str]] = {}
+    phases: Dict[int, List[Tuple[str, str, Any, Any]]] = {}
+    for row in rows.tolist():
+        key = str(snapshot.keys[row])
+        signal = str(snapshot.signals[row])
+        device = devices.get(key)
+        target = getattr(device, signal, None) if device is not None else None
+        if target is None or not callable(getattr(target, 'set', None)):
+            log.error(f"Cannot restore {key}.{signal}: no such setpoint")
+            failed.setdefault(key, []).append(signal)
+            continue
+        order = setpoint_signals(device)
+        phase = order.index(signal) if signal in order else len(order)
+        phases.setdefault(phase, []).append((key, signal, target, snapshot.value_at(row)))
+
+    for phase in sorted(phases):
+        pending = []
+        for key, signal, target, value in phases[phase]:
+            try:
+                pending.append((key, signal, target.set(value, timeout=timeout)))
+            except Exception as e:
+                log.error(f"Restoring {key}.{signal}={value!r} failed: {e}")
+                failed.setdefault(key, []).append(signal)
+        for key, signal, status in pending:
+            try:
+                status.wait(timeout)
+            except Exception as e:
+                log.error(f"Restoring {key}.{signal} failed: {e}")
+                failed.setdefault(key, []).append(signal)
+                continue
+            written.setdefault(key, []).append(signal)
+
+    elapsed = time.monotonic() - start
+    log.info(f"Restored {sum(map(len, written.values()))} setpoints "
+             f"({unchanged} unchanged, {sum(map(len, failed.values()))} failed) in {elapsed:.2f}s")
+    return RestoreReport(written, failed, unchanged, elapsed)
@@ -18,6 +18,9 @@ class SppOphydBpm(epik8sDevice):
     thsp= Cpt(EpicsSignal, ':ENV:ENV_ADCSP_THRESHOLD_SP')
     cnt= Cpt(EpicsSignalRO, ':SA:SA_COUNTER_MONITOR')
     resetCmd=Cpt(EpicsSignal,':ENV:ENV_RESET_COUNTER_CMD')
+    _readback_signals = ('x', 'y', 'sum')
+    _setpoint_signals = ('thsp',)
+
     def __init__(self, prefix, read_attrs=None, configuration_attrs=None,
                  name=None, parent=None,poi=None, **kwargs):
         
@@ -1,8 +1,9 @@
 from ophyd import Component as Cpt, EpicsSignal, EpicsSignalRO, PositionerBase
-from ophyd.status import MoveStatus, Status
+from ophyd.status import MoveStatus, Status, SubscriptionStatus
 from .epik8s_device import epik8sDevice
 
-import logging, time
+import logging, threading, time
+from typing import NamedTuple
 logger = logging.getLogger(__name__)
 # Constants for motor commands and states
 MAX_RETRIES=3
@@ -25,6 +26,49 @@ CMD_NONE = 0
 RUN = 1
 STOP = 2
 POS_TOLERANCE = 10
+ACK_TOLERANCE = 1e-3    # readback of a written setpoint or command
+# MSTA bits (motor record status word)
+MSTA_DIR = 1 << 0x0
+MSTA_LSP = 1 << 0x2
+MSTA_ERROR = 1 << 0x9
+MSTA_MOVING = 1 << 0xA    # MSTA.BA, the motor_moving signal
+MSTA_LSN = 1 << 0xD
+MSTA_HOMED = 1 << 0xE
+
+# Default handshake deadlines (s), overridable in config.motor
+ACK_TIMEOUT = 2.0
+START_TIMEOUT = 5.0
+SETTLE_TIME = 0.5       # still readback ending a move the MSTA never reported
+
+
+class MotorStatus(NamedTuple):
+    '''Decoded MSTA word of a TML motor, built once per MSTA update.'''
+    msta: int
+    error: bool
+    homed: bool
+    lsn: bool
+    lsp: bool
+    dir: int
+    moving: bool
+
+    @classmethod
+    def from_msta(cls, msta):
+        msta = int(msta or 0)
+        return cls(msta, bool(msta & MSTA_ERROR), bool(msta & MSTA_HOMED),
+                   bool(msta & MSTA_LSN), bool(msta & MSTA_LSP),
+                   msta & MSTA_DIR, bool(msta & MSTA_MOVING))
+
+    @property
+    def limit(self):
+        '''1 on the positive limit, -1 on the negative, -1000 on both, else 0.'''
+        if self.lsn and self.lsp:
+            return -1000
+        if self.lsn:
+            return -1
+        if self.lsp:
+            return 1
+        return 0
+
 
 class OphydTmlMotor(epik8sDevice, PositionerBase):
     
@@ -50,6 +94,9 @@ class OphydTmlMotor(epik8sDevice, PositionerBase):
     high_limit_switch = Cpt(EpicsSignalRO, ':MSTA.B2')
     low_limit_switch = Cpt(EpicsSignalRO, ':MSTA.BD')
     homed            =  Cpt(EpicsSignalRO, ':MSTA.BE')
+
+    _readback_signals = ('user_readback',)
+    _setpoint_signals = ('user_setpoint',)
     
     
     def __init__(self, prefix, read_attrs=None, configuration_attrs=None,
@@ -63,22 +110,49 @@ class OphydTmlMotor(epik8sDevice, PositionerBase):
                          name=name, parent=parent, **kwargs)
         self.poi = poi
         self.user_readback.name = self.name
+        # Set before subscribing: the callbacks may run right away
+        self.mot_stat_value = None
+        self.mot_msta_value = None
+        self._msta_status = None
+        self.current_position = None
         # self.mot_stat.subscribe(self._on_mot_stat_change)
-        self.user_readback.subscribe(self._on_user_readback_change)
-        self.mot_msta.subscribe(self._on_mot_msta_change)
+        # State is stored on the monitor thread, logging is dispatched
+        self._subscribe(self.user_readback, self._on_user_readback_change,
+                        state=self._store_position)
+        self._subscribe(self.mot_msta, self._on_mot_msta_change,
+                        state=self._store_msta)
 
-        # Soft limits from config
-        cfg = kwargs.get('config', {}) or {}
-        motor_cfg = cfg.get('motor', {}) or {}
-        self._low_limit = motor_cfg.get('dllm', float('-inf'))
-        self._high_limit = motor_cfg.get('dhlm', float('inf'))
+        # Soft limits and handshake deadlines from config
+        self._set_soft_limits(kwargs.get('config'))
+        self._set_deadlines(kwargs.get('config'))
 
         # Initial connection check
-        self.mot_stat_value = self.mot_stat.get()
-        self.mot_msta_value = self.mot_msta.get()
+        if not self._defer_connect:
+            self._on_connected()
         #logging.debug(f"{name} State:\n{self.decode()}")
         # self.enable()
         
+    def _on_connected(self):
+        self.mot_stat_value = self.mot_stat.get()
+        self._set_msta(self.mot_msta.get())
+
+    def _set_soft_limits(self, config):
+        cfg = config or {}
+        motor_cfg = cfg.get('motor', {}) or {}
+        self._low_limit = motor_cfg.get('dllm', float('-inf'))
+        self._high_limit = motor_cfg.get('dhlm', float('inf'))
+
+    def _set_deadlines(self, config):
+        motor_cfg = (config or {}).get('motor', {}) or {}
+        self.ack_timeout = float(motor_cfg.get('ack_timeout', ACK_TIMEOUT))
+        self.start_timeout = float(motor_cfg.get('start_timeout', START_TIMEOUT))
+        self.settle_time = float(motor_cfg.get('settle_time', SETTLE_TIME))
+
+    def reconfigure(self, config=None, **kwargs):
+        super().reconfigure(config, **kwargs)
+        self._set_soft_limits(config)
+        self._set_deadlines(config)
+
     def stage(self):
         logging.info(f"{self.name} State:\n{self.decode()}")
 
@@ -93,9 +167,7 @@ class OphydTmlMotor(epik8sDevice, PositionerBase):
     def __del__(self):
         '''Destructor to handle any necessary cleanup.'''
         logger.debug(f"Cleaning up {self.name}")
-        # self.mot_stat.unsubscribe(self._on_mot_stat_change)
-        self.user_readback.unsubscribe(self._on_user_readback_change)
-        self.mot_msta.unsubscribe(self._on_mot_msta_change)
+        self._unsubscribe_all()
         
         self.unstage()
         # Add any other necessary cleanup here
@@ -140,42 +212,52 @@ class OphydTmlMotor(epik8sDevice, PositionerBase):
                     
 
 
+    def msta_status(self):
+        '''Decoded MSTA status, from the MSTA monitor.
+
+        Returns
+        -------
+        status : MotorStatus
+            Read from the last MSTA update; the PV is only read if no
+            update has been received yet
+        '''
+        status = self._msta_status
+        if status is None:
+            status = self._set_msta(self.mot_msta.get())
+        return status
+
     def decode(self):
+        msta = self.msta_status()
         status = ""
-        if self.iserror():
+        if msta.error:
             status += "- ERROR\n"
-        if self.ishomed():
+        if msta.homed:
             status += "- homed\n"
-        if self.limit() == 1:
+        limit = msta.limit
+        if limit == 1:
             status += "- lsp\n"
-        if self.limit() == -1:
+        if limit == -1:
             status += "- lsn\n"
-        if self.limit() == -1000:
+        if limit == -1000:
             status += "- lsp+lsn ERROR\n"
-        status += "- dir " + str(self.dir()) + "\n"
-        pos = self.user_readback.get()
+        status += "- dir " + str(msta.dir) + "\n"
+        pos = self.current_position
+        if pos is None:
+            pos = self.user_readback.get()
         status += "- pos " + str(pos) + "\n"
         return status
 
     def iserror(self):
-        return (self.mot_msta.get() & (1 << 0x9)) != 0
+        return self.msta_status().error
 
     def ishomed(self):
-        return (self.mot_msta.get() & (1 << 0xE)) != 0
+        return self.msta_status().homed
 
     def limit(self):
-        lsn = self.mot_msta.get() & (1 << 0xD)
-        lsp = self.mot_msta.get() & (1 << 2)
-        if lsn:
-            return -1
-        if lsp:
-            return 1
-        if lsn and lsp:
-            return -1000
-        return 0
+        return self.msta_status().limit
     
     def dir(self):
-        return self.mot_msta.get() & 0x1
+        return self.msta_status().dir
     
     @property
     def moving(self):
@@ -185,7 +267,8 @@ class OphydTmlMotor(epik8sDevice, PositionerBase):
         -------
         moving : bool
         '''
-        return (self.mot_msta.get() & (1 << 0xA)) != 0
+        return self.msta_status().moving
+
     def home(self, direction, wait=True,timeout=120, **kwargs):
         
         
@@ -193,8 +276,7 @@ class OphydTmlMotor(epik8sDevice, PositionerBase):
             try:
                 logger.info(f"home")
 
-                self.mot_act_sp.put(CMD_HOME)
-                time.sleep(1)
+                self._command(CMD_HOME)
                 self.mot_actx_sp.put(RUN)
                 stat = self.wait_homed(timeout)
                 return stat
@@ -312,6 +394,28 @@ class OphydTmlMotor(epik8sDevice, PositionerBase):
         self.user_setpoint.put(pos)
   
     def set(self, position,wait=True,timeout=120):
+        '''Move to an absolute position.
+
+        Each step of the command handshake waits for the controller
+        readback instead of a fixed delay: the setpoint is acknowledged on
+        ``mot_val_rb``, the command on ``mot_act_rb``, and the move has
+        started when the MSTA moving bit rises (or the readback is already
+        at the target). Deadlines are ``ack_timeout`` and ``start_timeout``
+        (``config.motor.ack_timeout`` / ``start_timeout``).
+
+        Returns
+        -------
+        status : Status
+            Done when the MSTA moving bit falls or, for a move too short
+            for MSTA to report, when the readback settled
+
+        Raises
+        ------
+        TimeoutError
+            When the controller does not acknowledge a write in time
+        RuntimeError
+            When the motor does not start moving within start_timeout
+        '''
         if isinstance(position, str):
             position = self.poi2pos(position)
         if (position == self.position):
@@ -319,31 +423,116 @@ class OphydTmlMotor(epik8sDevice, PositionerBase):
 
             return MoveStatus(self,position)
 
-        self.user_setpoint.put(position)
-        time.sleep(0.5)
-
-        self.mot_act_sp.put(CMD_ABS_POS)
-        time.sleep(0.5)
+        self._put_acked(self.user_setpoint, self.mot_val_rb, position, "setpoint")
+        self._command(CMD_ABS_POS)
 
+        started, done = self._move_statuses(position, timeout)
         self.mot_actx_sp.put(RUN)
         logger.info(f"set {position}")
-        time.sleep(5)
-        if(self.motor_moving.get()):
-            self.wait_move(timeout=240)
-            return self.wait_done(wait,position,timeout)
-        else:
+        try:
+            started.wait()
+        except TimeoutError:
+            error = RuntimeError(f"{self.name} motor not moving after {self.start_timeout}s")
+            done.set_exception(error)
             self.user_setpoint.put(0)
             self.mot_act_sp.put(CMD_NONE)
+            raise error
 
+        if wait:
+            done.wait()
+        return done
 
-            raise Exception(f" motor not moving")
+    def _put_acked(self, setpoint, readback, value, what):
+        '''Write a value and wait until the readback reports it (ack_timeout).
 
-        # Set state to waitend or any other state needed
+        CA posts no update when a value does not change, so a readback
+        already at the value is accepted if it is fresh: not older than
+        the last update of the setpoint, i.e. it acknowledged the previous
+        write. A stale readback has to be updated after this write.
+        '''
+        since = setpoint.timestamp or 0
+
+        def acked(value=None, timestamp=None, _want=value, **kwargs):
+            return (value is not None and abs(value - _want) <= ACK_TOLERANCE
+                    and (timestamp or 0) >= since)
+
+        status = SubscriptionStatus(readback, acked, run=True, timeout=self.ack_timeout)
+        setpoint.put(value)
+        try:
+            status.wait()
+        except TimeoutError:
+            raise TimeoutError(
+                f"{self.name} {what} {value} not acknowledged on {readback.attr_name} "
+                f"within {self.ack_timeout}s") from None
+
+    def _command(self, command):
+        '''Write a motion command and wait for its acknowledge on mot_act_rb.'''
+        self._put_acked(self.mot_act_sp, self.mot_act_rb, command, "command")
+
+    def _move_statuses(self, position, timeout):
+        '''Statuses of a move to position: (started, done).
+
+        started is done when the MSTA moving bit rises, or a readback
+        update is within POS_TOLERANCE of position (start_timeout).
+
+        done is done when the moving bit falls after it rose. A move of a
+        few steps can end before MSTA reports it moving: until the bit is
+        seen, the move also ends when the readback is within
+        POS_TOLERANCE of position and has not changed for settle_time.
+        '''
+        started = Status(self, timeout=self.start_timeout)
+        done = Status(self, timeout=timeout)
+        lock = threading.Lock()
+        seen = {'moving': False, 'timer': None}
+        subscriptions = []
+
+        def finish(status):
+            if not status.done:
+                try:
+                    status.set_finished()
+                except Exception:
+                    pass  # finished concurrently by another callback
+
+        def settle(arrived):
+            '''(Re)start the settle timer, or stop it if not arrived.'''
+            with lock:
+                timer = seen['timer']
+                if timer is not None:
+                    timer.cancel()
+                seen['timer'] = None
+                if not arrived or seen['moving'] or done.done:
+                    return
+                timer = seen['timer'] = threading.Timer(self.settle_time, finish, (done,))
+                timer.daemon = True
+                timer.start()
+
+        def on_msta(value=0, **kwargs):
+            if value & MSTA_MOVING:
+                seen['moving'] = True
+                settle(False)
+                finish(started)
+            elif seen['moving']:
+                finish(done)
+
+        def on_readback(value=None, **kwargs):
+            arrived = value is not None and abs(value - position) <= POS_TOLERANCE
+            if arrived:
+                finish(started)
+            settle(arrived)
+
+        def cleanup(status):
+            settle(False)
+            for signal, cid in subscriptions:
+                signal.unsubscribe(cid)
+
+        subscriptions.append((self.mot_msta, self.mot_msta.subscribe(on_msta, run=False)))
+        subscriptions.append((self.user_readback,
+                              self.user_readback.subscribe(on_readback, run=False)))
+        done.add_callback(cleanup)
+        return started, done
 
     def jogf(self,wait=True):
-        self.mot_act_sp.put(CMD_JOGF)
-        time.sleep(0.5)
-
+        self._command(CMD_JOGF)
         self.mot_actx_sp.put(RUN)
         # Set state to waitend or any other state needed
         logger.info(f"jogf")
@@ -351,8 +540,7 @@ class OphydTmlMotor(epik8sDevice, PositionerBase):
         return self.wait_done(wait)
 
     def jogr(self,wait=True):
-        self.mot_act_sp.put(CMD_JOGR)
-        time.sleep(0.5)
+        self._command(CMD_JOGR)
         logger.info(f"jogr")
 
         self.mot_actx_sp.put(RUN)
@@ -375,9 +563,8 @@ class OphydTmlMotor(epik8sDevice, PositionerBase):
         return ""
     
     def set_rel(self, position, wait=True):
-        self.user_setpoint.put(position)
-        self.mot_act_sp.put(CMD_REL_POS)
-        time.sleep(0.5)
+        self._put_acked(self.user_setpoint, self.mot_val_rb, position, "setpoint")
+        self._command(CMD_REL_POS)
         logger.info(f"set rel {position}")
 
         self.mot_actx_sp.put(RUN)
@@ -388,18 +575,29 @@ class OphydTmlMotor(epik8sDevice, PositionerBase):
         logger.debug(f"[{self.name}] Mot stat changed: {value}")
         self._update()
 
-    def _on_mot_msta_change(self, pvname=None, value=None, **kwargs):
+    def _set_msta(self, value):
+        status = MotorStatus.from_msta(value)
         self.mot_msta_value = value
+        self._msta_status = status
+        return status
+
+    def _store_msta(self, value=None, **kwargs):
+        self._set_msta(value)
+
+    def _store_position(self, value=None, **kwargs):
+        self.current_position = value
+
+    def _on_mot_msta_change(self, pvname=None, value=None, **kwargs):
         logger.debug(f"[{self.name}] Mot msta changed: {value}")
         self._update()
 
     def _on_user_readback_change(self, pvname=None, value=None, **kwargs):
-        self.current_position = value
         logger.debug(f"[{self.name}] Mot pos changed: {value}")
         self._update()
     
     def _update(self):
-        logger.debug(f"State:\n{self.decode()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"State:\n{self.decode()}")
         return
     
     def get_pos(self,poi=False):
@@ -3,7 +3,7 @@ from typing import Union
 from ophyd import Component as Cpt, EpicsSignal, EpicsSignalRO
 from .epik8s_device import epik8sDevice
 
-from infn_ophyd_hal import OphydPS, ophyd_ps_state
+from .ophyd_ps import OphydPS, ophyd_ps_state
 
 
 class OphydPSUnimag(OphydPS, epik8sDevice):
@@ -24,6 +24,9 @@ class OphydPSUnimag(OphydPS, epik8sDevice):
     current = Cpt(EpicsSignal, ":CURRENT_SP")       # float setpoint
     state_rb = Cpt(EpicsSignalRO, ":STATE_RB")      # string/enum readback
     state = Cpt(EpicsSignal, ":STATE_SP")           # string/enum setpoint
+    _readback_signals = ("current_rb", "state_rb")
+    # State is restored before the current
+    _setpoint_signals = ("state", "current")
 
     def __init__(
         self,
@@ -53,11 +56,15 @@ class OphydPSUnimag(OphydPS, epik8sDevice):
         self._setpoint = None
         self._state: ophyd_ps_state = ophyd_ps_state.UKNOWN
 
-        # Subscriptions to keep cache in sync
-        # self.current_rb.subscribe(self._on_current_change_rb)
-        # self.state_rb.subscribe(self._on_state_change_rb)
+        # Subscriptions to keep cache in sync (monitors only with cache: monitor)
+        self._monitor_subscribed = False
+        self._update_subscriptions()
 
         # Prime initial values (if connected)
+        if not self._defer_connect:
+            self._on_connected()
+
+    def _on_connected(self):
         try:
             self._current = self.current_rb.get()
         except Exception:
@@ -72,15 +79,37 @@ class OphydPSUnimag(OphydPS, epik8sDevice):
         except Exception:
             self._setpoint = None
 
+    def reconfigure(self, config=None, **kwargs):
+        super().reconfigure(config, **kwargs)
+        self._update_subscriptions()
+
     # ----------------------
     # Callbacks / subscriptions
     # ----------------------
-    def _on_current_change_rb(self, pvname=None, value=None, **kwargs):
+    def _update_subscriptions(self):
+        """Follow the readback monitors while the monitor cache is on."""
+        if self.monitor_cached and not self._monitor_subscribed:
+            self._subscribe(self.current_rb, self._on_current_change_rb,
+                            state=self._store_current)
+            self._subscribe(self.state_rb, self._on_state_change_rb,
+                            state=self._store_state)
+            self._monitor_subscribed = True
+        elif not self.monitor_cached and self._monitor_subscribed:
+            self._unsubscribe_all()
+            self._monitor_subscribed = False
+
+    # Stored on the monitor thread, so that no update is lost to the
+    # dispatcher; the notifications run on the dispatcher
+    def _store_current(self, value=None, **kwargs):
         self._current = value
+
+    def _store_state(self, value=None, **kwargs):
+        self._state = self._decode_state(value)
+
+    def _on_current_change_rb(self, pvname=None, value=None, **kwargs):
         self.on_current_change(self._current, self)
 
     def _on_state_change_rb(self, pvname=None, value=None, **kwargs):
-        self._state = self._decode_state(value)
         self.on_state_change(self._state, self)
 
     # ----------------------
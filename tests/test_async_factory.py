@@ -0,0 +1,117 @@
+"""Tests for the asyncio DeviceFactory API."""
+
+import asyncio
+import time
+
+import pytest
+from infn_ophyd_hal import LazyDevice, OphydMotorSim
+from infn_ophyd_hal.sim_devices import OphydAISim
+
+from test_device_factory import SlowSim, sim_config, slow_config
+
+
+class HangingSim(OphydAISim):
+    """Sim device whose constructor takes far too long."""
+
+    def __init__(self, prefix='SIM', *, name='hanging', **kwargs):
+        time.sleep(0.3)
+        super().__init__(prefix, name=name, **kwargs)
+
+
+def test_create_device_async(factory):
+    device = asyncio.run(factory.create_device_async('mot', 'sim', 'SIM:M1', 'm1'))
+    assert isinstance(device, OphydMotorSim)
+
+
+def test_create_device_async_timeout(factory):
+    factory.register_device_type('io', 'hanging', HangingSim)
+    assert asyncio.run(factory.create_device_async(
+        'io', 'hanging', 'SIM:H', 'h', timeout=0.01)) is None
+
+
+def test_same_result_as_sync(factory):
+    expected = factory.create_devices_from_config(sim_config())
+    devices = asyncio.run(factory.create_devices_from_config_async(
+        sim_config(), max_workers=4))
+    assert list(devices) == list(expected)
+    assert [d.prefix for d in devices.values()] == [d.prefix for d in expected.values()]
+
+
+def test_filters_and_lazy(factory):
+    devices = asyncio.run(factory.create_devices_from_config_async(
+        sim_config(), devgroup='mot', lazy=True))
+    assert list(devices) == ['M1', 'M2', 'SHARED', 'M3', 'motsim2_SHARED']
+    assert all(isinstance(d, LazyDevice) for d in devices.values())
+
+
+def test_loop_stays_responsive(factory):
+    factory.register_device_type('io', 'slow', SlowSim)
+    SlowSim.peak.clear()
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.005)
+
+    async def main():
+        task = asyncio.ensure_future(ticker())
+        devices = await factory.create_devices_from_config_async(
+            slow_config(2, 6), max_workers=2, max_per_ioc=1)
+        task.cancel()
+        return devices
+
+    devices = asyncio.run(main())
+    assert len(devices) == 12
+    assert len(ticks) > 5
+    assert max(SlowSim.peak.values()) <= 1
+
+
+def test_overall_timeout(factory):
+    factory.register_device_type('io', 'slow', SlowSim)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(factory.create_devices_from_config_async(
+            slow_config(3, 6), timeout=0.05))
+
+
+def test_device_timeout_leaves_device_out(factory):
+    factory.register_device_type('io', 'hanging', HangingSim)
+    config = sim_config()
+    config['epicsConfiguration']['iocs'].append(
+        {'name': 'hang', 'devgroup': 'io', 'devtype': 'hanging', 'iocprefix': 'SIM:H'})
+    devices = asyncio.run(factory.create_devices_from_config_async(
+        config, max_workers=4, device_timeout=0.1))
+    assert 'hang' not in devices
+    assert 'M1' in devices
+
+
+def test_device_timeout_covers_constructor_only(factory):
+    factory.register_device_type('io', 'slow', SlowSim)
+    # 12 constructors of 0.02s on 2 workers take well over device_timeout
+    # in total, but each one alone is far below it
+    devices = asyncio.run(factory.create_devices_from_config_async(
+        slow_config(2, 6), max_workers=2, device_timeout=0.06))
+    assert len(devices) == 12
+
+
+def test_async_iterator(factory):
+    async def collect(**kwargs):
+        return [key async for key, _ in factory.aiter_devices_from_config(
+            sim_config(), **kwargs)]
+
+    expected = list(factory.create_devices_from_config(sim_config()))
+    assert asyncio.run(collect(max_workers=4, ordered=True)) == expected
+    assert sorted(asyncio.run(collect(max_workers=4))) == sorted(expected)
+
+
+def test_async_iterator_early_exit(factory):
+    factory.register_device_type('io', 'slow', SlowSim)
+
+    async def first():
+        async for key, _ in factory.aiter_devices_from_config(slow_config(3, 6),
+                                                              max_workers=2):
+            return key
+
+    start = time.monotonic()
+    assert asyncio.run(first()) is not None
+    assert time.monotonic() - start < 18 * 0.02
@@ -0,0 +1,118 @@
+"""Tests for batched multi-device reads — runs without live EPICS IOCs."""
+
+import math
+import time
+
+import pytest
+from epics import ca
+from ophyd import Component as Cpt, Signal
+from infn_ophyd_hal import OphydAI, epik8sDevice
+from infn_ophyd_hal.sim_devices import OphydBpmSim
+
+from test_connection import PrimedDevice
+
+NATIVE_DOUBLE, TIME_DOUBLE = 6, 20
+CHANNELS = {}
+
+
+class FakeChannel:
+    """Connected pyepics PV of a CaSignal."""
+
+    def __init__(self, chid):
+        self.chid = chid
+        self.connected = True
+
+
+class CaSignal(Signal):
+    """Soft signal that read_many reads through the (mocked) CA calls."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._read_pv = FakeChannel(len(CHANNELS) + 1)
+        CHANNELS[self._read_pv.chid] = self
+
+
+class FakeCA:
+    """
+    The epics.ca calls of read_many: like pyepics, a pending get is kept
+    per field type and only completed under the type it was issued with.
+    """
+
+    def __init__(self):
+        self.results = {}
+
+    def promote_type(self, chid, use_time=False, use_ctrl=False):
+        return TIME_DOUBLE if use_time else NATIVE_DOUBLE
+
+    def get_with_metadata(self, chid, ftype=None, wait=True, **kwargs):
+        signal = CHANNELS[chid]
+        self.results[chid, ftype or NATIVE_DOUBLE] = {'value': signal.get(),
+                                                      'timestamp': signal.timestamp}
+
+    def get_complete_with_metadata(self, chid, ftype=None, timeout=None, **kwargs):
+        return self.results.pop((chid, ftype or NATIVE_DOUBLE), None)
+
+    def flush_io(self):
+        pass
+
+
+@pytest.fixture
+def fake_ca(monkeypatch):
+    fake = FakeCA()
+    for call in ('promote_type', 'get_with_metadata', 'get_complete_with_metadata', 'flush_io'):
+        monkeypatch.setattr(ca, call, getattr(fake, call))
+    return fake
+
+
+class CaBpm(epik8sDevice):
+    x = Cpt(CaSignal, value=0.0)
+    y = Cpt(CaSignal, value=0.0)
+
+
+def test_soft_signals_and_read_attrs():
+    devices = {f'P{i}': PrimedDevice('SOFT', name=f'p{i}', read_attrs=['value'])
+               for i in range(3)}
+    devices['P1'].value.put(4.0)
+    reading = epik8sDevice.read_many(devices)
+    assert reading.ok and reading.keys == ['P0', 'P1', 'P2']
+    assert reading.value('P1', 'value') == 4.0
+    assert reading.values['P0']['value']['timestamp'] > 0
+
+
+def test_plain_attributes_and_missing_signals():
+    bpms = [OphydBpmSim(f'SIM:BPM{i}', name=f'BPM{i}') for i in range(2)]
+    bpms[1]._x = 1.5
+    reading = epik8sDevice.read_many(bpms, signals=['x', 'sum', 'nope'])
+    assert reading.value('BPM1', 'x') == 1.5
+    assert reading.value('BPM0', 'sum') == 100.0
+    assert reading.failed == {'BPM0': ['nope'], 'BPM1': ['nope']}
+
+
+def test_array_output():
+    bpms = {name: OphydBpmSim(name=name) for name in ('A', 'B', 'C')}
+    bpms['B']._y = 2.0
+    reading = epik8sDevice.read_many(bpms, signals=['y'])
+    del reading.values['C']['y']
+    values, timestamps = reading.array('y')
+    assert values[:2].tolist() == [0.0, 2.0] and math.isnan(values[2])
+    assert timestamps[0] > 0 and math.isnan(timestamps[2])
+
+
+def test_disconnected_devices_fail_fast():
+    devices = {f'AI{i}': OphydAI(f'INFN:OPHYD:HAL:TEST:NOIOC:AI{i}', name=f'ai{i}',
+                                 defer_connect=True) for i in range(3)}
+    devices['P'] = PrimedDevice('SOFT', name='p', read_attrs=['value'])
+    start = time.monotonic()
+    reading = epik8sDevice.read_many(devices, timeout=5)
+    assert time.monotonic() - start < 1
+    assert reading.failed == {f'AI{i}': ['user_readback'] for i in range(3)}
+    assert reading.value('P', 'value') == 1.0
+
+
+def test_ca_replies_collected(fake_ca):
+    bpms = {f'BPM{i}': CaBpm('CA:BPM', name=f'bpm{i}') for i in range(3)}
+    bpms['BPM2'].x.put(1.25)
+    reading = epik8sDevice.read_many(bpms, signals=['x', 'y'])
+    assert reading.ok and not fake_ca.results
+    assert reading.array('x')[0].tolist() == [0.0, 0.0, 1.25]
+    assert reading.values['BPM2']['x']['timestamp'] == bpms['BPM2'].x.timestamp
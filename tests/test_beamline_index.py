@@ -0,0 +1,81 @@
+"""Tests for BeamlineIndex — runs without live EPICS IOCs."""
+
+from pathlib import Path
+
+import pytest
+from infn_ophyd_hal import BeamlineIndex
+
+from test_device_factory import sim_config
+
+SPARC = Path(__file__).resolve().parent / 'sparc_beamline.yaml'
+
+
+@pytest.fixture(scope='module')
+def sparc_index():
+    return BeamlineIndex.from_file(str(SPARC))
+
+
+@pytest.fixture
+def sim_index():
+    return BeamlineIndex(sim_config(), index_keys=['zone'])
+
+
+class TestLookups:
+    def test_len_and_order(self, sim_index):
+        assert [s.name for s in sim_index] == ['M1', 'M2', 'SHARED', 'M3', 'SHARED',
+                                               'BPM01', 'BPM02', 'aisim']
+        assert len(sim_index) == 8
+        assert sim_index.ioc_count == 6
+
+    def test_get(self, sim_index):
+        assert sim_index.get('M3').prefix == 'SIM:MOT2:ROOT:M3'
+        assert sim_index.get('SHARED').iocname == 'motsim1'
+        assert sim_index.get('missing') is None
+        assert 'BPM01' in sim_index
+
+    def test_by_ioc(self, sim_index):
+        assert [s.name for s in sim_index.by_ioc('motsim2')] == ['M3', 'SHARED']
+        assert [s.name for s in sim_index.by_ioc('aisim')] == ['aisim']
+
+    def test_by_devgroup_devtype(self, sim_index):
+        assert [s.name for s in sim_index.by_devgroup('diag')] == ['BPM01', 'BPM02']
+        assert len(sim_index.by_devtype('sim')) == 7
+
+    def test_lookup_arbitrary_key(self, sim_index):
+        assert [s.name for s in sim_index.lookup('zone', 'linac')] == \
+            ['M1', 'M2', 'SHARED', 'M3', 'BPM01', 'BPM02']
+        assert sorted(sim_index.values('zone')) == ['hall', 'linac']
+        assert sim_index.lookup('location', 'x') == []
+
+
+class TestQuery:
+    QUERIES = [
+        {},
+        {'devgroup': 'mag'},
+        {'devgroup': 'mot', 'devtype': 'tml'},
+        {'name_pattern': r'^AC\dSOL'},
+        {'devgroup': 'vac', 'iocname': 'regex:^vac-(gun|ac\\d)'},
+        {'devgroup': 'vac', 'iocname': ['gunvpc', 'ptlvpc']},
+        {'devtype': 'haz'},
+        {'zone': 'nowhere'},
+    ]
+
+    @pytest.mark.parametrize('query', QUERIES)
+    def test_same_as_factory_walk(self, factory, sparc_index, query):
+        iocs = sparc_index.config['epicsConfiguration']['iocs']
+        expected = list(factory._iter_device_specs(iocs, **query))
+        assert [s.prefix for s in sparc_index.query(**query)] == \
+            [s.prefix for s in expected]
+
+    def test_query_cached(self, sim_index):
+        first = sim_index.query(devgroup='mot', zone='linac')
+        assert [s.name for s in first] == ['M1', 'M2', 'SHARED', 'M3']
+        assert sim_index.query(devgroup='mot', zone='linac') == first
+
+    def test_factory_accepts_index(self, factory, sim_index):
+        from_index = factory.create_devices_from_config(sim_index, zone='hall')
+        from_dict = factory.create_devices_from_config(sim_config(), zone='hall')
+        assert list(from_index) == list(from_dict) == ['SHARED', 'aisim']
+
+    def test_empty_index(self, factory):
+        assert factory.create_devices_from_config(BeamlineIndex({})) == {}
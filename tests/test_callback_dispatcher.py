@@ -0,0 +1,188 @@
+"""Tests for the coalescing callback dispatcher — runs without live EPICS IOCs."""
+
+import threading
+import time
+
+from ophyd import Component as Cpt, Signal
+from infn_ophyd_hal import (
+    CallbackDispatcher,
+    MetricsRegistry,
+    OphydPSDante,
+    OphydPSUnimag,
+    OphydTmlMotor,
+    default_dispatcher,
+    epik8sDevice,
+    ophyd_ps_state,
+)
+from infn_ophyd_hal.tml_ophyd_motor import MSTA_MOVING
+
+from test_tml_motor import SoftTmlMotor
+
+NOIOC = 'INFN:OPHYD:HAL:TEST:NOIOC'
+
+
+def test_coalesces_while_consumer_is_slow():
+    dispatcher = CallbackDispatcher(max_workers=2)
+    release = threading.Event()
+    seen = []
+
+    def slow(value):
+        release.wait(5)
+        seen.append(value)
+
+    dispatcher.submit('sig', slow, 0)
+    time.sleep(0.05)          # first event is being delivered, the rest coalesce
+    for value in range(1, 10):
+        dispatcher.submit('sig', slow, value)
+    release.set()
+    assert dispatcher.flush(5)
+    assert seen[0] == 0 and seen[-1] == 9 and len(seen) == 2
+    stats = dispatcher.stats()
+    assert (stats.submitted, stats.delivered, stats.coalesced, stats.pending) == (10, 2, 8, 0)
+    dispatcher.shutdown()
+
+
+def test_bounded_queue_drops():
+    dispatcher = CallbackDispatcher(max_workers=1, max_pending=3)
+    release = threading.Event()
+    dispatcher.submit('blocker', release.wait, 5)
+    time.sleep(0.05)
+    accepted = [dispatcher.submit(key, lambda: None) for key in 'abcde']
+    assert accepted == [True, True, True, False, False]
+    assert dispatcher.stats().dropped == 2 and dispatcher.stats().peak == 3
+    release.set()
+    assert dispatcher.flush(5)
+    dispatcher.shutdown()
+
+
+def test_lane_runs_in_order_without_overlap():
+    dispatcher = CallbackDispatcher(max_workers=4)
+    active = []
+    order = []
+    lock = threading.Lock()
+
+    def callback(key):
+        with lock:
+            active.append(key)
+            assert len(active) == 1
+        time.sleep(0.01)
+        with lock:
+            order.append(key)
+            active.remove(key)
+
+    for key in range(6):
+        dispatcher.submit(key, callback, key, lane='device')
+    assert dispatcher.flush(5)
+    assert order == list(range(6))
+    dispatcher.shutdown()
+
+
+def test_errors_are_counted():
+    dispatcher = CallbackDispatcher()
+    dispatcher.submit('k', lambda: 1 / 0)
+    assert dispatcher.flush(5)
+    assert dispatcher.stats().errors == 1
+    dispatcher.shutdown()
+    assert not dispatcher.submit('k', print)
+
+
+class Watched(epik8sDevice):
+    value = Cpt(Signal, value=0)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values = []
+        self.threads = set()
+        self._subscribe(self.value, self._on_value, run=False)
+
+    def _on_value(self, value=None, **kwargs):
+        self.values.append(value)
+        self.threads.add(threading.current_thread().name)
+
+
+def test_device_subscriptions_use_dispatcher():
+    dispatcher = CallbackDispatcher(name='test-callbacks')
+    device = Watched('SOFT', name='watched')
+    device._callback_dispatcher = dispatcher
+    device._unsubscribe_all()
+    device._subscribe(device.value, device._on_value, run=False)
+    for value in range(1, 4):
+        device.value.put(value)
+    assert dispatcher.flush(5)
+    assert device.values[-1] == 3
+    assert all(name.startswith('test-callbacks') for name in device.threads)
+    device._unsubscribe_all()
+    device.value.put(10)
+    assert dispatcher.flush(5) and device.values[-1] == 3
+    metrics = MetricsRegistry()
+    metrics.add_collector(dispatcher.prometheus_lines)
+    assert 'epik8s_dispatcher_delivered_total{dispatcher="test-callbacks"}' in metrics.render()
+    dispatcher.shutdown()
+
+
+def test_tml_and_dante_subscribe_through_dispatcher():
+    tml = OphydTmlMotor(f'{NOIOC}:TML', name='tml', defer_connect=True)
+    dante = OphydPSDante(name='dante', prefix=f'{NOIOC}:DANTE', defer_connect=True)
+    # one state subscription and one dispatched callback per signal
+    assert [signal.attr_name for signal, _ in tml._dispatched_subs] == [
+        'user_readback', 'user_readback', 'mot_msta', 'mot_msta']
+    assert [signal.attr_name for signal, _ in dante._dispatched_subs][::2] == [
+        'current_rb', 'polarity_rb', 'mode_rb']
+    callbacks = list(tml.mot_msta._unwrapped_callbacks[tml.mot_msta.SUB_VALUE].values())
+    assert callbacks[0] == tml._store_msta
+    assert callbacks[1].__wrapped__ == tml._on_mot_msta_change
+    assert default_dispatcher() is default_dispatcher()
+
+
+class StoppedDispatcherUnimag(OphydPSUnimag):
+    """Unimag on soft signals whose dispatcher drops every event."""
+    current_rb = Cpt(Signal, value=0.0)
+    current = Cpt(Signal, value=0.0)
+    state_rb = Cpt(Signal, value='OFF')
+    state = Cpt(Signal, value='OFF')
+    _callback_dispatcher = CallbackDispatcher(name='stopped')
+    _callback_dispatcher.shutdown()
+
+
+class StoppedDispatcherTml(SoftTmlMotor):
+    _callback_dispatcher = StoppedDispatcherUnimag._callback_dispatcher
+
+
+def test_no_state_lost_when_events_are_dropped():
+    dropped = StoppedDispatcherTml._callback_dispatcher.stats().dropped
+    tml = StoppedDispatcherTml('SOFT:TML', name='tml')
+    tml.mot_msta.put(MSTA_MOVING)
+    tml.user_readback.put(42)
+    assert tml.moving and tml.current_position == 42
+    ps = StoppedDispatcherUnimag(name='q', prefix='SOFT:Q', config={'cache': 'monitor'})
+    ps.current_rb.put(3.5)
+    ps.state_rb.put('ON')
+    assert ps._current == 3.5 and ps._state == ophyd_ps_state.ON
+    assert StoppedDispatcherTml._callback_dispatcher.stats().dropped > dropped
+
+
+class StoppedDispatcherDante(OphydPSDante):
+    """Dante on soft signals whose dispatcher drops every event."""
+    current_rb = Cpt(Signal, value=0.0)
+    polarity_rb = Cpt(Signal, value=1)
+    mode_rb = Cpt(Signal, value=0)
+    current = Cpt(Signal, value=0.0)
+    polarity = Cpt(Signal, value=1)
+    mode = Cpt(Signal, value=0)
+    _callback_dispatcher = StoppedDispatcherUnimag._callback_dispatcher
+
+
+def test_dante_state_hooks_do_no_work(capsys):
+    ps = StoppedDispatcherDante(name='d', prefix='SOFT:D', verbose=1, defer_connect=True)
+    capsys.readouterr()
+    ps.polarity_rb.put(3)
+    ps.mode_rb.put(2)
+    # state stored on the monitor thread, without printing or transitions
+    assert ps._bipolar and ps._state == ophyd_ps_state.ON and ps.last_state_set == ophyd_ps_state.ON
+    assert ps._state_instance.state == 'OnInit' and capsys.readouterr().out == ''
+    # what the dispatcher runs
+    ps._on_pol_change(value=3)
+    ps._on_mode_change(value=2)
+    out = capsys.readouterr().out
+    assert 'is bipolar' in out and 'external change last state' in out
+    assert ps._state_instance.state == 'OnState'
@@ -0,0 +1,74 @@
+"""Tests for YAML loading and the parsed-config cache."""
+
+import os
+
+import pytest
+from infn_ophyd_hal import DeviceFactory
+from infn_ophyd_hal import config_loader
+from infn_ophyd_hal.config_loader import load_yaml
+
+
+@pytest.fixture
+def values(tmp_path):
+    path = tmp_path / 'values.yaml'
+    path.write_text("epicsConfiguration:\n  iocs:\n    - name: ioc1\n      devgroup: mot\n")
+    return path
+
+
+@pytest.fixture
+def count_parses(monkeypatch):
+    calls = []
+    real_load = config_loader.yaml.load
+
+    def counting_load(*args, **kwargs):
+        calls.append(args)
+        return real_load(*args, **kwargs)
+
+    monkeypatch.setattr(config_loader.yaml, 'load', counting_load)
+    return calls
+
+
+class TestConfigCache:
+    def test_no_cache(self, values, count_parses):
+        assert load_yaml(str(values))['epicsConfiguration']['iocs'][0]['name'] == 'ioc1'
+        load_yaml(str(values))
+        assert len(count_parses) == 2
+
+    def test_warm_start_skips_parsing(self, values, tmp_path, count_parses):
+        cache = tmp_path / 'cache'
+        first = load_yaml(str(values), cache_dir=str(cache))
+        second = load_yaml(str(values), cache_dir=str(cache))
+        assert first == second
+        assert len(count_parses) == 1
+        assert len(list(cache.iterdir())) == 1
+
+    def test_edit_invalidates(self, values, tmp_path, count_parses):
+        cache = str(tmp_path / 'cache')
+        load_yaml(str(values), cache_dir=cache)
+        values.write_text("epicsConfiguration:\n  iocs: []\n")
+        assert load_yaml(str(values), cache_dir=cache)['epicsConfiguration']['iocs'] == []
+        assert len(count_parses) == 2
+
+    def test_touch_without_change_invalidates_on_mtime(self, values, tmp_path, count_parses):
+        cache = str(tmp_path / 'cache')
+        load_yaml(str(values), cache_dir=cache)
+        stat = values.stat()
+        os.utime(values, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        load_yaml(str(values), cache_dir=cache)
+        load_yaml(str(values), cache_dir=cache)
+        assert len(count_parses) == 2
+
+    def test_corrupt_cache_is_ignored(self, values, tmp_path):
+        cache = tmp_path / 'cache'
+        load_yaml(str(values), cache_dir=str(cache))
+        for entry in cache.iterdir():
+            entry.write_bytes(b'garbage')
+        assert load_yaml(str(values), cache_dir=str(cache))['epicsConfiguration']
+
+    def test_factory_cache_dir_from_env(self, values, tmp_path, monkeypatch, count_parses):
+        monkeypatch.setenv('INFN_OPHYD_HAL_CACHE_DIR', str(tmp_path / 'envcache'))
+        factory = DeviceFactory()
+        factory.load_beamline_config(str(values))
+        factory.load_beamline_config(str(values))
+        assert len(count_parses) == 1
+        assert (tmp_path / 'envcache').is_dir()
@@ -0,0 +1,104 @@
+"""Tests for copy-on-write config views — runs without live EPICS IOCs."""
+
+import pickle
+from pathlib import Path
+
+import pytest
+from infn_ophyd_hal import BeamlineIndex
+from infn_ophyd_hal.config_view import ConfigView
+from infn_ophyd_hal.ioc_defaults import deep_merge
+
+from test_connection import PrimedDevice
+
+SPARC = Path(__file__).resolve().parent / 'sparc_beamline.yaml'
+
+IOC = {'name': 'tml-ch1', 'devgroup': 'mot', 'motor': {'dllm': -1000, 'dhlm': 1000},
+       'devices': [{'name': 'M1', 'motor': {'dllm': 0}}, {'name': 'M2'}]}
+
+
+def device_view(entry):
+    return ConfigView(entry, {'iocname': IOC['name']}, IOC)
+
+
+def expected(entry):
+    return deep_merge(dict(IOC, iocname=IOC['name']), entry)
+
+
+class TestLookup:
+    def test_same_content_and_order_as_deep_merge(self):
+        for entry in IOC['devices']:
+            view = device_view(entry)
+            assert view == expected(entry)
+            assert list(view) == list(expected(entry))
+            assert len(view) == len(expected(entry))
+
+    def test_nested_mappings_merge(self):
+        view = device_view(IOC['devices'][0])
+        assert view['motor'] == {'dllm': 0, 'dhlm': 1000}
+        assert view.get('missing', 5) == 5
+        assert 'iocname' in view and 'missing' not in view
+
+    def test_scalar_replaces_lower_mapping(self):
+        view = ConfigView({'motor': None}, {'motor': {'dllm': 1}})
+        assert view['motor'] is None
+        view = ConfigView({'motor': {'dllm': 2}}, {'motor': 7}, {'motor': {'dhlm': 3}})
+        assert view['motor'] == {'dllm': 2}
+
+    def test_layers_are_shared(self):
+        views = [device_view(entry) for entry in IOC['devices']]
+        assert all(view['devices'] is IOC['devices'] for view in views)
+
+
+class TestCopyOnWrite:
+    def test_writes_leave_layers_untouched(self):
+        entry = {'name': 'M1', 'motor': {'dllm': 0}}
+        view = device_view(entry)
+        view['devgroup'] = 'vac'
+        view['motor']['dhlm'] = 5
+        del view['name']
+        assert view['devgroup'] == 'vac' and view['motor']['dhlm'] == 5
+        assert 'name' not in view and 'name' not in dict(view)
+        assert entry == {'name': 'M1', 'motor': {'dllm': 0}}
+        assert IOC['devgroup'] == 'mot' and IOC['motor']['dhlm'] == 1000
+
+    def test_assigning_a_mapping_replaces_it(self):
+        view = device_view({'name': 'M1'})
+        view['motor'] = {'dllm': 3}
+        assert view['motor'] == {'dllm': 3}
+
+    def test_delete_missing_key(self):
+        with pytest.raises(KeyError):
+            del device_view({})['missing']
+
+    def test_copy_is_independent(self):
+        view = device_view(IOC['devices'][0])
+        copy = view.copy()
+        copy['motor']['dllm'] = 9
+        assert type(copy) is dict and view['motor']['dllm'] == 0
+
+
+def test_pickle_roundtrip():
+    views = [device_view(entry) for entry in IOC['devices']]
+    loaded = pickle.loads(pickle.dumps(views))
+    assert loaded == views
+    assert loaded[0]._layers[2] is loaded[1]._layers[2]
+
+
+def test_index_configs_match_deep_merge():
+    index = BeamlineIndex.from_file(str(SPARC))
+    iocs = {ioc['name']: ioc for ioc in index.config['epicsConfiguration']['iocs']}
+    multi = [spec for spec in index if spec.multi]
+    assert multi
+    for spec in multi:
+        ioc = iocs[spec.iocname]
+        entry = next(d for d in ioc['devices'] if d['name'] == spec.name)
+        assert spec.config == deep_merge(dict(ioc, iocname=spec.iocname), entry)
+
+
+def test_device_metadata_is_precomputed():
+    device = PrimedDevice('SOFT', name='p', config=device_view({'name': 'M1'}))
+    assert (device.iocname(), device.devgroup(), device.devtype()) == ('tml-ch1', 'mot', None)
+    device.reconfigure({'iocname': 'other', 'devtype': 'tml'})
+    assert (device.iocname(), device.devtype(), device.devgroup()) == ('other', 'tml', None)
+    device.reconfigure(None)
+    assert device.iocname() is None and device.get_config() is None
@@ -0,0 +1,73 @@
+"""Tests for deferred construction and the bulk connection wait."""
+
+import time
+
+from ophyd import Component as Cpt, Signal
+from infn_ophyd_hal import OphydAI, epik8sDevice
+from infn_ophyd_hal.connection import wait_for_connection
+
+from test_device_factory import sim_config
+
+
+class PrimedDevice(epik8sDevice):
+    """Device with soft signals, counting its initial reads."""
+    value = Cpt(Signal, value=1.0)
+
+    def __init__(self, prefix, *, name=None, **kwargs):
+        super().__init__(prefix, name=name, **kwargs)
+        self.primed = 0
+        if not self._defer_connect:
+            self._on_connected()
+
+    def _on_connected(self):
+        self.primed += 1
+
+
+def primed_config():
+    return {'epicsConfiguration': {'iocs': [
+        {'name': 'soft', 'devgroup': 'io', 'devtype': 'primed', 'iocprefix': 'SOFT',
+         'devices': [{'name': 'P1'}, {'name': 'P2'}]},
+    ]}}
+
+
+class TestBulkConnect:
+    def test_deferred_initial_reads(self, factory):
+        factory.register_device_type('io', 'primed', PrimedDevice)
+        devices = factory.create_devices_from_config(primed_config(), bulk_connect=True,
+                                                     connection_timeout=1)
+        report = factory.last_connection_report
+        assert report.ok
+        assert report.connected == ['P1', 'P2']
+        assert [d.primed for d in devices.values()] == [1, 1]
+        # A second wait does not read again
+        factory.wait_for_connection(devices)
+        assert [d.primed for d in devices.values()] == [1, 1]
+
+    def test_immediate_reads_without_bulk_connect(self, factory):
+        factory.register_device_type('io', 'primed', PrimedDevice)
+        devices = factory.create_devices_from_config(primed_config())
+        assert [d.primed for d in devices.values()] == [1, 1]
+        assert factory.last_connection_report is None
+
+    def test_unreachable_pvs_are_reported(self, factory):
+        config = {'epicsConfiguration': {'iocs': [
+            {'name': 'noioc', 'devgroup': 'io', 'devtype': 'ai',
+             'iocprefix': 'INFN:OPHYD:HAL:TEST:NOIOC', 'devices': [{'name': 'AI1'}]},
+        ]}}
+        start = time.monotonic()
+        devices = factory.create_devices_from_config(config, bulk_connect=True,
+                                                     connection_timeout=0.3)
+        assert time.monotonic() - start < 2
+        assert isinstance(devices['AI1'], OphydAI)
+        report = factory.last_connection_report
+        assert report.connected == []
+        assert report.failed == {'AI1': ['INFN:OPHYD:HAL:TEST:NOIOC:AI1:AI_RB']}
+        assert 0.3 <= report.elapsed < 2
+
+    def test_sim_and_lazy_devices(self, factory):
+        devices = factory.create_devices_from_config(sim_config(), bulk_connect=True)
+        assert factory.last_connection_report.connected == list(devices)
+        lazy = factory.create_devices_from_config(sim_config(), lazy=True)
+        report = wait_for_connection(lazy, timeout=0.1)
+        assert report.ok
+        assert not any(d.is_resolved for d in lazy.values())
@@ -0,0 +1,437 @@
+"""Tests for DeviceFactory config handling — runs without live EPICS IOCs."""
+
+import pickle
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from infn_ophyd_hal import DeviceFactory, LazyDevice, OphydMotorSim
+from infn_ophyd_hal.device_filter import DeviceFilter
+from infn_ophyd_hal.device_plan import load_plan, save_plan
+from infn_ophyd_hal.sim_devices import OphydBpmSim, OphydAISim
+
+
+def sim_config():
+    """Small beamline config made only of sim devices."""
+    return {
+        'epicsConfiguration': {
+            'iocs': [
+                {'name': 'motsim1', 'devgroup': 'mot', 'devtype': 'sim',
+                 'iocprefix': 'SIM:MOT1', 'zone': 'linac',
+                 'devices': [{'name': 'M1'}, {'name': 'M2'}, {'name': 'SHARED'}]},
+                {'name': 'motsim2', 'devgroup': 'mot', 'devtype': 'sim',
+                 'iocprefix': 'SIM:MOT2', 'iocroot': 'ROOT', 'zone': 'hall',
+                 'devices': [{'name': 'M3', 'zone': 'linac'}, {'name': 'SHARED'}]},
+                {'name': 'bpmsim', 'devgroup': 'diag', 'devtype': 'sim',
+                 'iocprefix': 'SIM:BPM', 'zone': 'linac',
+                 'devices': [{'name': 'BPM01'}, {'name': 'BPM02'}]},
+                {'name': 'aisim', 'devgroup': 'io', 'devtype': 'sim-ai',
+                 'iocprefix': 'SIM:AI', 'zone': 'hall'},
+                {'name': 'disabled', 'devgroup': 'io', 'devtype': 'sim-ai',
+                 'iocprefix': 'SIM:OFF', 'disable': True},
+                {'name': 'nogroup', 'iocprefix': 'SIM:NOGROUP'},
+            ]
+        }
+    }
+
+
+class SlowSim(OphydAISim):
+    """Sim device whose constructor blocks, to exercise concurrency."""
+
+    lock = threading.Lock()
+    running = {}
+    peak = {}
+
+    def __init__(self, prefix='SIM', *, name='slow', **kwargs):
+        super().__init__(prefix, name=name, **kwargs)
+        ioc = kwargs['config']['iocname']
+        with SlowSim.lock:
+            SlowSim.running[ioc] = SlowSim.running.get(ioc, 0) + 1
+            SlowSim.peak[ioc] = max(SlowSim.peak.get(ioc, 0), SlowSim.running[ioc])
+        time.sleep(0.02)
+        with SlowSim.lock:
+            SlowSim.running[ioc] -= 1
+
+
+def slow_config(n_iocs=3, n_devices=6):
+    return {
+        'epicsConfiguration': {
+            'iocs': [
+                {'name': f'ioc{i}', 'devgroup': 'io', 'devtype': 'slow',
+                 'iocprefix': f'SIM:IOC{i}',
+                 'devices': [{'name': f'D{j}'} for j in range(n_devices)]}
+                for i in range(n_iocs)
+            ]
+        }
+    }
+
+
+class TestCreateDevicesFromConfig:
+    def test_creates_sim_devices(self, factory):
+        devices = factory.create_devices_from_config(sim_config())
+        assert list(devices) == ['M1', 'M2', 'SHARED', 'M3', 'motsim2_SHARED',
+                                 'BPM01', 'BPM02', 'aisim']
+        assert isinstance(devices['M1'], OphydMotorSim)
+        assert isinstance(devices['BPM01'], OphydBpmSim)
+        assert devices['M3'].prefix == 'SIM:MOT2:ROOT:M3'
+        assert devices['aisim'].prefix == 'SIM:AI'
+
+    def test_merged_config(self, factory):
+        devices = factory.create_devices_from_config(sim_config())
+        cfg = devices['M3']._config
+        assert cfg['iocname'] == 'motsim2'
+        assert cfg['zone'] == 'linac'
+        assert cfg['devgroup'] == 'mot'
+
+    def test_filters(self, factory):
+        devices = factory.create_devices_from_config(sim_config(), devgroup='mot',
+                                                     zone='linac')
+        assert list(devices) == ['M1', 'M2', 'SHARED', 'M3']
+
+    def test_empty_config(self, factory):
+        assert factory.create_devices_from_config({}) == {}
+
+
+class TestConcurrentCreation:
+    def test_same_result_as_sequential(self, factory):
+        sequential = factory.create_devices_from_config(sim_config())
+        concurrent = factory.create_devices_from_config(sim_config(), max_workers=4)
+        assert list(concurrent) == list(sequential)
+        assert [d.prefix for d in concurrent.values()] == \
+            [d.prefix for d in sequential.values()]
+
+    def test_per_ioc_cap(self, factory):
+        factory.register_device_type('io', 'slow', SlowSim)
+        SlowSim.peak.clear()
+        devices = factory.create_devices_from_config(slow_config(), max_workers=6,
+                                                     max_per_ioc=2)
+        assert len(devices) == 18
+        assert list(devices) == [f'D{j}' for j in range(6)] + \
+            [f'ioc{i}_D{j}' for i in (1, 2) for j in range(6)]
+        assert max(SlowSim.peak.values()) <= 2
+
+    def test_workers_run_in_parallel(self, factory):
+        factory.register_device_type('io', 'slow', SlowSim)
+        start = time.monotonic()
+        factory.create_devices_from_config(slow_config(3, 4), max_workers=12)
+        assert time.monotonic() - start < 12 * 0.02
+
+
+class CountingSim(OphydAISim):
+    """Sim device counting how many times it has been constructed."""
+
+    created = 0
+
+    def __init__(self, prefix='SIM', *, name='counting', **kwargs):
+        super().__init__(prefix, name=name, **kwargs)
+        CountingSim.created += 1
+
+
+class TestLazyDevices:
+    def test_create_device_lazy(self, factory):
+        factory.register_device_type('io', 'counting', CountingSim)
+        CountingSim.created = 0
+        dev = factory.create_device('io', 'counting', 'SIM:AI', 'lazy_ai',
+                                    config={'iocname': 'aisim', 'devgroup': 'io'},
+                                    lazy=True)
+        assert isinstance(dev, LazyDevice)
+        assert isinstance(dev, CountingSim)
+        assert dev.name == 'lazy_ai'
+        assert dev.prefix == 'SIM:AI'
+        assert dev.iocname() == 'aisim'
+        assert dev.devgroup() == 'io'
+        assert not dev.is_resolved
+        assert CountingSim.created == 0
+
+        dev.set_sim_value(3.0)
+        assert dev.is_resolved
+        assert dev._value == 3.0
+        dev.get()
+        assert CountingSim.created == 1
+
+    def test_config_lazy(self, factory):
+        devices = factory.create_devices_from_config(sim_config(), lazy=True)
+        assert list(devices) == list(factory.create_devices_from_config(sim_config()))
+        assert not any(d.is_resolved for d in devices.values())
+        devices['M1'].move(10.0)
+        assert devices['M1'].position == 10.0
+        assert [k for k, d in devices.items() if d.is_resolved] == ['M1']
+
+    def test_lazy_unknown_type(self, factory):
+        assert factory.create_device('unknown', 'nope', 'SIM', 'x', lazy=True) is None
+
+    def test_lazy_construction_error(self, factory):
+        class Broken:
+            def __init__(self, **kwargs):
+                raise RuntimeError('IOC unreachable')
+
+        factory.register_device_type('io', 'broken', Broken)
+        dev = factory.create_device('io', 'broken', 'SIM', 'broken', lazy=True)
+        with pytest.raises(RuntimeError):
+            dev.get()
+        assert not dev.is_resolved
+
+
+class TestDeviceFilter:
+    CFG = {'devgroup': 'mag', 'devtype': 'haz-ser', 'zone': 'Beam1', 'channel': 3}
+
+    def test_empty(self):
+        assert DeviceFilter().is_empty
+        assert DeviceFilter(zone=None).matches('X', {})
+
+    def test_literal_is_substring(self):
+        assert DeviceFilter(devtype='haz').matches('PS1', self.CFG)
+        assert DeviceFilter(devtype='HAZ-SER').matches('PS1', self.CFG)
+        assert not DeviceFilter(devtype='unimag').matches('PS1', self.CFG)
+
+    def test_regex(self):
+        assert DeviceFilter(name_pattern=r'^QUA\d+$').matches('qua01', self.CFG)
+        assert not DeviceFilter(name_pattern=r'^QUA\d+$').matches('XQUA01', self.CFG)
+        assert DeviceFilter(zone='regex:^beam[0-9]').matches('PS1', self.CFG)
+        assert not DeviceFilter(zone='regex:^hall').matches('PS1', self.CFG)
+
+    def test_invalid_regex_falls_back_to_exact(self):
+        cfg = {'devgroup': 'mag', 'devtype': 'a(b'}
+        assert DeviceFilter(devtype='a(b').matches('PS1', cfg)
+        assert not DeviceFilter(name_pattern='a(b').matches('a(b', cfg)
+        assert not DeviceFilter(zone='regex:a(b').matches('PS1', self.CFG)
+
+    def test_list_values(self):
+        assert DeviceFilter(zone=['hall', 'beam1']).matches('PS1', self.CFG)
+        assert not DeviceFilter(zone=['hall', 'linac']).matches('PS1', self.CFG)
+
+    def test_missing_key(self):
+        assert not DeviceFilter(location='hall').matches('PS1', self.CFG)
+
+    def test_non_string_values(self):
+        assert DeviceFilter(channel=3).matches('PS1', self.CFG)
+        assert not DeviceFilter(channel=4).matches('PS1', self.CFG)
+
+    def test_factory_wrapper(self, factory):
+        assert factory._matches_filters('PS1', self.CFG, devgroup='mag', zone='beam')
+        assert not factory._matches_filters('PS1', self.CFG, devgroup='mot')
+
+
+class DestroyableSim(OphydAISim):
+    """Sim device recording destroy() calls."""
+
+    destroyed = []
+
+    def destroy(self):
+        DestroyableSim.destroyed.append(self.name)
+
+
+class TestReconcile:
+    def test_unchanged_devices_are_reused(self, factory):
+        old = factory.create_devices_from_config(sim_config())
+        new = factory.reconcile(old, sim_config())
+        assert list(new) == list(old)
+        assert all(new[key] is old[key] for key in old)
+
+    def test_changed_config_reconfigures_in_place(self, factory):
+        old = factory.create_devices_from_config(sim_config())
+        cfg = sim_config()
+        cfg['epicsConfiguration']['iocs'][0]['devices'][0]['motor'] = {'dllm': -5, 'dhlm': 5}
+        new = factory.reconcile(old, cfg)
+        assert new['M1'] is old['M1']
+        assert new['M1'].limits == (-5, 5)
+        assert new['M1']._config['motor'] == {'dllm': -5, 'dhlm': 5}
+
+    def test_changed_prefix_or_class_recreates(self, factory):
+        factory.register_device_type('io', 'destroyable', DestroyableSim)
+        DestroyableSim.destroyed.clear()
+        cfg = sim_config()
+        cfg['epicsConfiguration']['iocs'][3]['devtype'] = 'destroyable'
+        old = factory.create_devices_from_config(cfg)
+
+        cfg = sim_config()
+        cfg['epicsConfiguration']['iocs'][2]['iocprefix'] = 'SIM:BPMX'
+        new = factory.reconcile(old, cfg)
+        assert new['BPM01'] is not old['BPM01']
+        assert new['BPM01'].prefix == 'SIM:BPMX:BPM01'
+        assert type(new['aisim']) is OphydAISim
+        assert DestroyableSim.destroyed == ['aisim']
+        assert new['M1'] is old['M1']
+
+    def test_added_and_removed_devices(self, factory):
+        factory.register_device_type('io', 'destroyable', DestroyableSim)
+        DestroyableSim.destroyed.clear()
+        cfg = sim_config()
+        cfg['epicsConfiguration']['iocs'][3]['devtype'] = 'destroyable'
+        old = factory.create_devices_from_config(cfg)
+
+        del cfg['epicsConfiguration']['iocs'][3]
+        cfg['epicsConfiguration']['iocs'][2]['devices'].append({'name': 'BPM03'})
+        new = factory.reconcile(old, cfg)
+        assert 'aisim' not in new
+        assert DestroyableSim.destroyed == ['aisim']
+        assert isinstance(new['BPM03'], OphydBpmSim)
+        assert new['BPM01'] is old['BPM01']
+
+    def test_lazy_devices(self, factory):
+        old = factory.create_devices_from_config(sim_config(), lazy=True)
+        cfg = sim_config()
+        cfg['epicsConfiguration']['iocs'][0]['zone'] = 'hall'
+        new = factory.reconcile(old, cfg, lazy=True)
+        assert new['M1'] is old['M1']
+        assert not new['M1'].is_resolved
+        assert new['M1']._config['zone'] == 'hall'
+        assert new['M1'].get_config()['zone'] == 'hall'
+
+
+class TestPlan:
+    def test_plan_matches_created_devices(self, factory):
+        factory.register_device_type('mot', 'sim', CountingSim)
+        CountingSim.created = 0
+        plan = factory.plan(sim_config())
+        assert CountingSim.created == 0
+        assert [p.key for p in plan] == list(factory.create_devices_from_config(sim_config()))
+        m3 = plan[3]
+        assert (m3.name, m3.prefix, m3.iocname) == ('M3', 'SIM:MOT2:ROOT:M3', 'motsim2')
+        assert m3.class_path == 'test_device_factory:CountingSim'
+        assert m3.kwargs['config']['zone'] == 'linac'
+        assert plan[-1].class_path == 'infn_ophyd_hal.sim_devices:OphydAISim'
+
+    def test_plan_filters_and_unknown_types(self, factory):
+        cfg = sim_config()
+        cfg['epicsConfiguration']['iocs'][3]['devtype'] = 'nope'
+        cfg['epicsConfiguration']['iocs'][3]['devgroup'] = 'nope'
+        assert [p.key for p in factory.plan(cfg)][-1] == 'BPM02'
+        assert [p.key for p in factory.plan(cfg, zone='hall')] == ['SHARED']
+
+    @pytest.mark.parametrize('options', [{}, {'max_workers': 4}, {'lazy': True}])
+    def test_build(self, factory, options):
+        expected = factory.create_devices_from_config(sim_config())
+        devices = factory.build(factory.plan(sim_config()), **options)
+        assert list(devices) == list(expected)
+        for key, device in devices.items():
+            assert device.__class__ is type(expected[key])
+            assert device.prefix == expected[key].prefix
+            assert device._config == expected[key]._config
+
+    def test_save_and_load(self, factory, tmp_path):
+        plan = factory.plan(sim_config())
+        save_plan(plan, tmp_path / 'beamline.plan')
+        loaded = load_plan(tmp_path / 'beamline.plan')
+        assert loaded == plan
+        assert list(factory.build(loaded)) == [p.key for p in plan]
+
+    def test_plan_stores_plain_configs(self, factory, tmp_path):
+        def plan_size(count):
+            cfg = {'epicsConfiguration': {'iocs': [{
+                'name': 'motsim', 'devgroup': 'mot', 'devtype': 'sim', 'iocprefix': 'SIM',
+                'devices': [{'name': f'M{i}'} for i in range(count)]}]}}
+            plan = factory.plan(cfg)
+            assert all(type(p.kwargs['config']) is dict for p in plan)
+            path = tmp_path / f'{count}.plan'
+            save_plan(plan, path)
+            return path.stat().st_size
+
+        # the IOC device list is stored once, not once per device
+        assert plan_size(400) < 2.5 * plan_size(200)
+
+    def test_load_rejects_other_files(self, tmp_path):
+        path = tmp_path / 'other.pickle'
+        path.write_bytes(pickle.dumps({'not': 'a plan'}))
+        with pytest.raises(ValueError):
+            load_plan(path)
+
+    def test_build_skips_unimportable_class(self, factory):
+        plan = factory.plan(sim_config())
+        plan[0] = plan[0]._replace(class_path='no_such_module:Device')
+        assert 'M1' not in factory.build(plan)
+
+
+class FlakySim(SlowSim):
+    """SlowSim that cannot be built for IOC 'ioc0' and is slower on 'ioc1'."""
+
+    def __init__(self, prefix='SIM', *, name='flaky', **kwargs):
+        ioc = kwargs['config']['iocname']
+        if ioc == 'ioc0':
+            raise RuntimeError('IOC unreachable')
+        if ioc == 'ioc1':
+            time.sleep(0.02)
+        super().__init__(prefix, name=name, **kwargs)
+
+
+class TestIterDevices:
+    @pytest.mark.parametrize('options', [{}, {'lazy': True}, {'max_workers': 4},
+                                         {'max_workers': 4, 'ordered': True}])
+    def test_same_devices_as_create(self, factory, options):
+        expected = factory.create_devices_from_config(sim_config())
+        items = list(factory.iter_devices_from_config(sim_config(), **options))
+        assert sorted(k for k, _ in items) == sorted(expected)
+        assert {k: d.prefix for k, d in items} == {k: d.prefix for k, d in expected.items()}
+
+    def test_ordered(self, factory):
+        factory.register_device_type('io', 'slow', SlowSim)
+        keys = [k for k, _ in factory.iter_devices_from_config(
+            slow_config(), max_workers=6, ordered=True)]
+        assert keys == list(factory.create_devices_from_config(slow_config()))
+
+    @pytest.mark.parametrize('ordered', [False, True])
+    def test_conflicts_with_failures(self, factory, ordered):
+        factory.register_device_type('io', 'slow', FlakySim)
+        expected = factory.create_devices_from_config(slow_config())
+        assert 'D0' in expected and 'ioc2_D0' in expected and 'ioc1_D0' not in expected
+        items = dict(factory.iter_devices_from_config(slow_config(), max_workers=6,
+                                                      ordered=ordered))
+        assert {k: d.prefix for k, d in items.items()} == \
+            {k: d.prefix for k, d in expected.items()}
+
+    def test_first_device_before_the_rest(self, factory):
+        factory.register_device_type('io', 'slow', SlowSim)
+        start = time.monotonic()
+        devices = factory.iter_devices_from_config(slow_config(4, 6), max_workers=2)
+        next(devices)
+        first = time.monotonic() - start
+        rest = list(devices)
+        assert len(rest) == 23
+        assert first < (time.monotonic() - start) / 4
+
+
+class TestDeviceTypeResolution:
+
+    def test_device_classes_are_imported_on_first_use(self):
+        code = (
+            "import sys\n"
+            "from infn_ophyd_hal import DeviceFactory\n"
+            "factory = DeviceFactory()\n"
+            "factory.create_device('mot', 'sim', 'SIM:M1', 'm1')\n"
+            "print(*[m in sys.modules for m in ('infn_ophyd_hal.asyn_ophyd_motor',\n"
+            "    'infn_ophyd_hal.ophyd_ps_dantemag', 'infn_ophyd_hal.spp_ophyd_bpm',\n"
+            "    'infn_ophyd_hal.tml_ophyd_motor')])\n"
+        )
+        out = subprocess.run([sys.executable, '-c', code], check=True,
+                             capture_output=True, text=True).stdout
+        assert out.split() == ['True', 'False', 'False', 'False']
+
+    def test_register_device_type_by_path(self, factory):
+        factory.register_device_type('io', 'path', 'infn_ophyd_hal.sim_devices:OphydAISim')
+        assert isinstance(factory.create_device('io', 'path', 'SIM:AI', 'ai'), OphydAISim)
+        assert factory._device_map[('io', 'path')] is OphydAISim
+
+    def test_unimportable_device_type(self, factory):
+        factory.register_device_type('io', 'broken', 'infn_ophyd_hal.no_such_module:Nope')
+        assert factory.create_device('io', 'broken', 'SIM:X', 'x') is None
+
+    def test_entry_point_plugins(self, monkeypatch):
+        from importlib.metadata import EntryPoint
+        from infn_ophyd_hal import device_factory
+        group = device_factory.DEVICE_ENTRY_POINT_GROUP
+        monkeypatch.setattr(device_factory, 'device_entry_points', lambda: (
+            EntryPoint('diag.plugin-bpm', 'infn_ophyd_hal.sim_devices:OphydBpmSim', group),
+            EntryPoint('no-devtype', 'infn_ophyd_hal.sim_devices:OphydAISim', group),
+        ))
+        factory = DeviceFactory()
+        assert ('diag', 'plugin-bpm') in factory.get_supported_types()
+        assert isinstance(factory.create_device('diag', 'plugin-bpm', 'SIM:B', 'b'),
+                          OphydBpmSim)
+        assert all(key[0] != 'no-devtype' for key in factory.get_supported_types())
+
+    def test_plan_build_resolves_lazily_registered_types(self, factory):
+        plan = factory.plan(sim_config())
+        rebuilt = DeviceFactory().build(plan)
+        assert set(rebuilt) == {item.key for item in plan}
@@ -0,0 +1,100 @@
+"""Tests for vectorised device groups — runs without live EPICS IOCs."""
+
+import math
+
+import numpy as np
+import pytest
+from ophyd import Component as Cpt, Signal
+from infn_ophyd_hal import OphydPSUnimag, SppOphydBpm, epik8sDevice, epik8sDeviceGroup
+from infn_ophyd_hal.lazy_device import LazyDevice
+
+from test_batch_read import CaBpm, fake_ca  # noqa: F401 (fixture)
+
+
+class SoftMag(epik8sDevice):
+    current_rb = Cpt(Signal, value=0.0)
+    current = Cpt(Signal, value=0.0)
+    _readback_signals = ('current_rb',)
+    _setpoint_signals = ('current',)
+
+    def __init__(self, prefix, *, name=None, **kwargs):
+        super().__init__(prefix, name=name, **kwargs)
+        self.min_current = -5
+        self.max_current = 5
+
+
+class SoftBpm(epik8sDevice):
+    x = Cpt(Signal, value=0.0)
+    y = Cpt(Signal, value=0.0)
+    _readback_signals = ('x', 'y')
+
+
+def family(count=4):
+    return {f'Q{i}': SoftMag(f'SOFT:Q{i}', name=f'q{i}', config={'iocname': 'mag-ioc'})
+            for i in range(count)}
+
+
+def test_read_arrays_and_metadata():
+    bpms = [SoftBpm(f'SOFT:BPM{i}', name=f'bpm{i}') for i in range(3)]
+    for i, bpm in enumerate(bpms):
+        bpm.x.put(0.1 * i)
+    group = epik8sDeviceGroup(bpms, name='orbit')
+    orbit = group.read()
+    assert list(orbit) == ['x', 'y']
+    assert np.allclose(orbit['x'], [0.0, 0.1, 0.2])
+    assert group.valid['x'].all() and (group.timestamps['y'] > 0).all()
+    assert group.keys.tolist() == ['bpm0', 'bpm1', 'bpm2']
+    assert group.prefixes.tolist() == ['SOFT:BPM0', 'SOFT:BPM1', 'SOFT:BPM2']
+    assert group.setpoint is None
+    with pytest.raises(ValueError):
+        group.set([1, 2, 3])
+
+
+def test_set_array_with_limits_and_nan():
+    group = epik8sDeviceGroup(family())
+    assert group.setpoint == 'current' and group.iocnames.tolist() == ['mag-ioc'] * 4
+    assert group.low_limits.tolist() == [-5.0] * 4
+    done = group.set([1.0, float('nan'), 7.0, -2.0])
+    assert done.tolist() == [True, False, False, True]
+    assert group.get('current').tolist() == [1.0, 0.0, 0.0, -2.0]
+    assert group.set(3).all()
+    assert group['Q2'].current.get() == 3.0
+    with pytest.raises(ValueError):
+        group.set([1, 2])
+
+
+def test_homogeneous_only():
+    with pytest.raises(ValueError):
+        epik8sDeviceGroup([SoftMag('SOFT:Q', name='q'), SoftBpm('SOFT:B', name='b')])
+    with pytest.raises(ValueError):
+        epik8sDeviceGroup({})
+
+
+def test_lazy_devices():
+    lazy = {f'Q{i}': LazyDevice(SoftMag, {'prefix': f'SOFT:Q{i}', 'name': f'q{i}'})
+            for i in range(2)}
+    group = epik8sDeviceGroup(lazy)
+    assert group.device_class is SoftMag and group.setpoint == 'current'
+    assert group.read()['current_rb'].tolist() == [0.0, 0.0]
+    lazy['B'] = LazyDevice(SoftBpm, {'prefix': 'SOFT:B', 'name': 'b'})
+    with pytest.raises(ValueError):
+        epik8sDeviceGroup(lazy)
+
+
+def test_read_through_ca(fake_ca):
+    group = epik8sDeviceGroup([CaBpm('CA:BPM', name=f'bpm{i}') for i in range(2)],
+                              signals=['x', 'y'])
+    group['bpm1'].y.put(-0.5)
+    orbit = group.read()
+    assert orbit['y'].tolist() == [0.0, -0.5] and group.valid['x'].all()
+
+
+def test_real_classes_defaults():
+    bpms = epik8sDeviceGroup([SppOphydBpm(f'INFN:OPHYD:HAL:TEST:NOIOC:BPM{i}', name=f'b{i}',
+                                          defer_connect=True) for i in range(2)])
+    assert bpms.signals == ['x', 'y', 'sum'] and bpms.setpoint == 'thsp'
+    quads = epik8sDeviceGroup([OphydPSUnimag(name='qf', prefix='INFN:OPHYD:HAL:TEST:NOIOC:QF',
+                                             min=-20, max=20, defer_connect=True)])
+    assert quads.setpoint == 'current' and quads.high_limits.tolist() == [20.0]
+    reading = bpms.read(timeout=0.2)
+    assert math.isnan(reading['x'][0]) and not bpms.valid['sum'].any()
@@ -0,0 +1,98 @@
+"""Tests for query expressions — runs without live EPICS IOCs."""
+
+from pathlib import Path
+
+import pytest
+from infn_ophyd_hal import BeamlineIndex, DeviceFilter, DeviceQuery, QuerySyntaxError
+from infn_ophyd_hal.device_query import _MEMO_SIZE, parse_query
+
+from test_device_factory import sim_config
+
+SPARC = Path(__file__).resolve().parent / 'sparc_beamline.yaml'
+
+QUAD = {'devgroup': 'mag', 'devtype': 'unimag', 'iocname': 'unimag-1', 'zones': 'LINAC'}
+DANTE = {'devgroup': 'mag', 'devtype': 'dante', 'iocname': 'dante-1', 'zones': 'LINAC'}
+MOTOR = {'devgroup': 'mot', 'devtype': 'tml', 'iocname': 'tml-ch1'}
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ('devgroup = mag', [True, True, False]),
+    ('devgroup == "mag"', [True, True, False]),
+    ('devgroup != mag', [False, False, True]),
+    ('devgroup in (mag, mot)', [True, True, True]),
+    ('devgroup not in (mag)', [False, False, True]),
+    ('iocname =~ DANTE', [False, True, False]),
+    ('iocname !~ "^dante-\\d"', [True, False, True]),
+    ('devgroup in (mag,mot) and not iocname =~ dante', [True, False, True]),
+    ('devtype = tml or zones = LINAC and devtype = dante', [False, True, True]),
+    ('(devtype = tml or zones = LINAC) and not devtype = dante', [True, False, True]),
+    ('zones = ""', [False, False, True]),
+    ('NOT devgroup = mot AND name =~ "^q"', [True, False, False]),
+])
+def test_matches(expression, expected):
+    query = DeviceQuery(expression)
+    assert [query.matches(name, config) for name, config in
+            (('QUAD01', QUAD), ('DANTE01', DANTE), ('GUNFLG01', MOTOR))] == expected
+
+
+@pytest.mark.parametrize('expression', [
+    '', 'devgroup', 'devgroup =', 'devgroup = mag and', '(devgroup = mag',
+    'devgroup in mag', 'devgroup in ()', 'devgroup = "mag', 'name =~ "("',
+    'devgroup not = mag', 'devgroup = mag mot',
+])
+def test_syntax_errors(expression):
+    with pytest.raises(QuerySyntaxError):
+        DeviceQuery(expression)
+
+
+def test_parse_is_cached():
+    assert parse_query('devgroup = mag') is parse_query('devgroup = mag')
+
+
+def test_regex_memo_is_bounded():
+    query = parse_query('name =~ "^Q"')
+    for i in range(5000):
+        assert query.matches(f'Q{i}', {}) and not query.matches(f'D{i}', {})
+    assert len(query._root._memo) <= _MEMO_SIZE
+    assert not hasattr(query._root, '__dict__')
+
+
+def test_filter_combines_keywords_and_query():
+    selected = DeviceFilter(devtype='unimag', where='zones = LINAC')
+    assert selected.matches('QUAD01', QUAD)
+    assert not selected.matches('DANTE01', DANTE)
+    assert not DeviceFilter(where='devgroup = mag').is_empty
+
+
+@pytest.fixture(scope='module')
+def sparc_index():
+    return BeamlineIndex.from_file(str(SPARC))
+
+
+class TestIndexedQuery:
+    QUERIES = [
+        'devgroup in (mag, mot)',
+        'devgroup in (mag, vac) and zones =~ "^(LINAC|PLX)" and not iocname =~ "vpc"',
+        'not devgroup = vac or name =~ "^AC\\dSOL"',
+        'devtype = missing',
+        'not (zones = LINAC or zones = PLX)',
+    ]
+
+    @pytest.mark.parametrize('expression', QUERIES)
+    def test_same_as_config_walk(self, factory, sparc_index, expression):
+        iocs = sparc_index.config['epicsConfiguration']['iocs']
+        expected = [s.prefix for s in factory._iter_device_specs(iocs, where=expression)]
+        assert [s.prefix for s in sparc_index.query(where=expression)] == expected
+
+    def test_combined_with_keyword_filters(self, sparc_index):
+        assert sparc_index.query(devgroup='mag', where='devgroup = vac') == []
+        both = sparc_index.query(devgroup='mag', where='zones = LINAC')
+        assert both and all(s.devgroup == 'mag' for s in both)
+
+
+def test_factory_where(factory):
+    expression = '(devgroup = mot and zone = linac) or devtype = sim-ai'
+    from_config = factory.create_devices_from_config(sim_config(), where=expression)
+    from_index = factory.create_devices_from_config(BeamlineIndex(sim_config()),
+                                                    where=expression)
+    assert list(from_config) == list(from_index) == ['M1', 'M2', 'SHARED', 'M3', 'aisim']
@@ -0,0 +1,134 @@
+"""Tests for the weakref device registry and factory deduplication."""
+
+import gc
+import threading
+import time
+
+import pytest
+from infn_ophyd_hal import DeviceFactory, DeviceRegistry, default_registry
+from infn_ophyd_hal.device_registry import freeze
+from infn_ophyd_hal.sim_devices import OphydAISim
+
+from test_device_factory import CountingSim, sim_config
+
+
+def test_freeze_ignores_key_order():
+    assert freeze({'a': 1, 'b': [1, {'c': 2}]}) == freeze({'b': [1, {'c': 2}], 'a': 1})
+    assert freeze({'a': [1, 2]}) != freeze({'a': [2, 1]})
+
+
+def test_key_ignores_ioc_device_list():
+    class Unfreezable(dict):
+        def items(self):
+            raise AssertionError('sibling devices walked')
+
+    ioc = {'iocname': 'ioc1', 'iocprefix': 'SIM', 'devices': [Unfreezable(name='M2')]}
+    key = DeviceRegistry.key(OphydAISim, 'SIM:M1', dict(ioc, name='M1'))
+    assert key == DeviceRegistry.key(OphydAISim, 'SIM:M1', {'iocname': 'ioc1', 'iocprefix': 'SIM',
+                                                           'name': 'M1', 'devices': []})
+    assert key != DeviceRegistry.key(OphydAISim, 'SIM:M1', dict(ioc, name='M1', iocname='ioc2'))
+
+
+class TestDeviceRegistry:
+
+    def test_same_key_returns_existing_instance(self):
+        registry = DeviceRegistry()
+        config = {'iocname': 'ioc1', 'devgroup': 'io', 'devtype': 'sim-ai'}
+        first = registry.get_or_create(OphydAISim, 'SIM:AI', 'ai', config,
+                                       lambda: OphydAISim('SIM:AI', name='ai'))
+        again = registry.get_or_create(OphydAISim, 'SIM:AI', 'ai', dict(config),
+                                       lambda: pytest.fail('should not be built'))
+        assert again is first
+        assert len(registry) == 1
+
+    def test_different_config_builds_new_instance(self):
+        registry = DeviceRegistry()
+        a = registry.get_or_create(OphydAISim, 'SIM:AI', 'ai', {'x': 1},
+                                   lambda: OphydAISim('SIM:AI', name='ai'))
+        b = registry.get_or_create(OphydAISim, 'SIM:AI', 'ai', {'x': 2},
+                                   lambda: OphydAISim('SIM:AI', name='ai'))
+        assert a is not b
+
+    def test_dropped_devices_leave_registry_and_indexes(self):
+        registry = DeviceRegistry()
+        registry.get_or_create(OphydAISim, 'SIM:AI', 'ai', {'iocname': 'ioc1'},
+                               lambda: OphydAISim('SIM:AI', name='ai'))
+        gc.collect()
+        assert len(registry) == 0
+        assert registry.find(iocname='ioc1') == []
+        assert registry._indexes['iocname'] == {}
+
+    def test_failed_creation_is_not_registered(self):
+        registry = DeviceRegistry()
+        assert registry.get_or_create(OphydAISim, 'SIM:AI', 'ai', None, lambda: None) is None
+        assert len(registry) == 0
+
+    def test_concurrent_requests_build_once(self):
+        registry = DeviceRegistry()
+        built = []
+
+        def create():
+            time.sleep(0.02)
+            built.append(1)
+            return OphydAISim('SIM:AI', name='ai')
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                registry.get_or_create(OphydAISim, 'SIM:AI', 'ai', None, create)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(built) == 1
+        assert all(device is results[0] for device in results)
+
+    def test_find_rejects_unknown_criteria(self):
+        with pytest.raises(ValueError):
+            DeviceRegistry().find(zone='linac')
+
+
+class TestFactoryRegistry:
+
+    def test_create_device_deduplicates(self):
+        factory = DeviceFactory(registry=DeviceRegistry())
+        first = factory.create_device('mot', 'sim', 'SIM:M1', 'm1', {'iocname': 'motsim1'})
+        assert factory.create_device('mot', 'sim', 'SIM:M1', 'm1',
+                                     {'iocname': 'motsim1'}) is first
+        assert factory.create_device('mot', 'sim', 'SIM:M2', 'm2',
+                                     {'iocname': 'motsim1'}) is not first
+
+    def test_factories_share_registry(self):
+        registry = DeviceRegistry()
+        a = DeviceFactory(registry=registry).create_devices_from_config(sim_config())
+        b = DeviceFactory(registry=registry).create_devices_from_config(sim_config())
+        assert a.keys() == b.keys()
+        assert all(b[key] is device for key, device in a.items())
+
+    def test_lookup_by_index(self):
+        registry = DeviceRegistry()
+        devices = DeviceFactory(registry=registry).create_devices_from_config(sim_config())
+        assert set(registry.find(devgroup='mot')) == {
+            devices[key] for key in ('M1', 'M2', 'SHARED', 'M3', 'motsim2_SHARED')}
+        assert registry.find(iocname='bpmsim', name='BPM01') == [devices['BPM01']]
+        assert len(registry.find()) == len(devices)
+
+    def test_plan_build_uses_registry(self):
+        registry = DeviceRegistry()
+        factory = DeviceFactory(registry=registry)
+        CountingSim.created = 0
+        factory.register_device_type('io', 'counting', CountingSim)
+        config = {'epicsConfiguration': {'iocs': [
+            {'name': 'cnt', 'devgroup': 'io', 'devtype': 'counting',
+             'iocprefix': 'SIM:CNT', 'devices': [{'name': 'C1'}, {'name': 'C2'}]},
+        ]}}
+        built = factory.create_devices_from_config(config)
+        rebuilt = factory.build(factory.plan(config))
+        assert CountingSim.created == 2
+        assert all(rebuilt[key] is device for key, device in built.items())
+
+    def test_registry_true_uses_process_registry(self):
+        assert DeviceFactory(registry=True).registry is default_registry()
+        assert DeviceFactory().registry is None
@@ -0,0 +1,103 @@
+"""Tests for iocDefaults template inheritance."""
+
+from infn_ophyd_hal import ioc_defaults as ioc_defaults_module
+from infn_ophyd_hal import BeamlineIndex, OphydMotorSim
+from infn_ophyd_hal.ioc_defaults import IocDefaults, deep_merge, ioc_defaults_of
+
+TEMPLATES = {
+    'sim-base': {'devgroup': 'mot', 'devtype': 'sim', 'zone': 'linac',
+                 'motor': {'dllm': -100, 'dhlm': 100, 'egu': 'mm'},
+                 'poi': [{'name': 'IN', 'pos': 1}]},
+    'sim-long': {'template': 'sim-base', 'motor': {'dhlm': 500}},
+    'self': {'template': 'self', 'zone': 'hall'},
+    'loop-a': {'template': 'loop-b', 'a': 1},
+    'loop-b': {'template': 'loop-a', 'b': 1},
+}
+
+
+def templated_config():
+    return {
+        'epicsConfiguration': {
+            'iocDefaults': TEMPLATES,
+            'iocs': [
+                {'name': 'motioc', 'template': 'sim-long', 'iocprefix': 'SIM:MOT',
+                 'devices': [{'name': 'M1'},
+                             {'name': 'M2', 'motor': {'dllm': 0},
+                              'poi': [{'name': 'OUT', 'pos': 2}]}]},
+                {'name': 'plain', 'devgroup': 'mot', 'devtype': 'sim',
+                 'iocprefix': 'SIM:PLAIN', 'devices': [{'name': 'M3'}]},
+            ]
+        }
+    }
+
+
+class TestDeepMerge:
+    def test_nested_mappings_merge(self):
+        base = {'a': 1, 'motor': {'dllm': -1, 'dhlm': 1}, 'poi': [1, 2]}
+        merged = deep_merge(base, {'motor': {'dhlm': 5}, 'poi': [3]})
+        assert merged == {'a': 1, 'motor': {'dllm': -1, 'dhlm': 5}, 'poi': [3]}
+        assert base == {'a': 1, 'motor': {'dllm': -1, 'dhlm': 1}, 'poi': [1, 2]}
+
+    def test_scalar_replaces_mapping(self):
+        assert deep_merge({'motor': {'dllm': 1}}, {'motor': None}) == {'motor': None}
+
+
+class TestIocDefaults:
+    def test_inheritance_chain(self):
+        resolved = IocDefaults(TEMPLATES).template('sim-long')
+        assert resolved['devgroup'] == 'mot'
+        assert resolved['motor'] == {'dllm': -100, 'dhlm': 500, 'egu': 'mm'}
+
+    def test_self_reference_is_root(self):
+        assert IocDefaults(TEMPLATES).template('self') == {'template': 'self', 'zone': 'hall'}
+
+    def test_cycle_is_broken(self, caplog):
+        resolved = IocDefaults(TEMPLATES).template('loop-a')
+        assert resolved['a'] == 1 and resolved['b'] == 1
+        assert 'cycle' in caplog.text
+
+    def test_unknown_template(self):
+        ioc = {'name': 'x', 'template': 'missing'}
+        assert IocDefaults(TEMPLATES).resolve_ioc(ioc) is ioc
+
+    def test_templates_resolved_once(self, monkeypatch):
+        calls = []
+        real = ioc_defaults_module.deep_merge
+
+        def counting(base, override):
+            calls.append(override)
+            return real(base, override)
+
+        monkeypatch.setattr(ioc_defaults_module, 'deep_merge', counting)
+        defaults = IocDefaults(TEMPLATES)
+        for i in range(50):
+            defaults.resolve_ioc({'name': f'ioc{i}', 'template': 'sim-long'})
+        template_merges = [c for c in calls if c is TEMPLATES['sim-long'] or c is TEMPLATES['sim-base']]
+        assert len(template_merges) == 2
+
+    def test_defaults_location(self):
+        assert ioc_defaults_of({'iocDefaults': {'t': {}}}) == {'t': {}}
+        assert ioc_defaults_of(templated_config()) is TEMPLATES
+        assert ioc_defaults_of({}) == {}
+
+
+class TestFactoryMerge:
+    def test_device_config(self, factory):
+        devices = factory.create_devices_from_config(templated_config())
+        assert list(devices) == ['M1', 'M2', 'M3']
+        assert isinstance(devices['M1'], OphydMotorSim)
+        assert devices['M1'].limits == (-100, 500)
+        assert devices['M2'].limits == (0, 500)
+        assert devices['M1'].poi == [{'name': 'IN', 'pos': 1}]
+        assert devices['M2'].poi == [{'name': 'OUT', 'pos': 2}]
+        assert devices['M2']._config['iocname'] == 'motioc'
+        assert devices['M2']._config['motor']['egu'] == 'mm'
+
+    def test_filters_see_template_values(self, factory):
+        devices = factory.create_devices_from_config(templated_config(), zone='linac')
+        assert list(devices) == ['M1', 'M2']
+
+    def test_index(self):
+        index = BeamlineIndex(templated_config())
+        assert [s.name for s in index.by_devgroup('mot')] == ['M1', 'M2', 'M3']
+        assert index.get('M1').config['motor']['dhlm'] == 500
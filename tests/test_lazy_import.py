@@ -0,0 +1,60 @@
+"""Tests for the lazily loaded package namespace."""
+
+import subprocess
+import sys
+
+import pytest
+import infn_ophyd_hal
+from infn_ophyd_hal import OphydPS, PowerSupplyFactory
+from infn_ophyd_hal.class_path import class_path, import_class_path
+from infn_ophyd_hal.sim_devices import OphydAISim
+
+
+def loaded_modules(code):
+    """Run code in a fresh interpreter and return which heavy modules it loaded."""
+    out = subprocess.run(
+        [sys.executable, '-c',
+         code + "\nimport sys; print('ophyd' in sys.modules, 'epics' in sys.modules)"],
+        check=True, capture_output=True, text=True).stdout
+    return out.split()[-2:]
+
+
+@pytest.mark.parametrize('code', [
+    'import infn_ophyd_hal',
+    'from infn_ophyd_hal import ChannelFinderClient, DeviceFilter, BeamlineIndex',
+    'from infn_ophyd_hal import PowerSupplyFactory',
+])
+def test_no_ophyd_on_import(code):
+    assert loaded_modules(code) == ['False', 'False']
+
+
+def test_import_is_silent():
+    out = subprocess.run([sys.executable, '-c', 'import infn_ophyd_hal'],
+                         check=True, capture_output=True, text=True)
+    assert out.stdout == ''
+
+
+def test_public_names():
+    for name in infn_ophyd_hal.__all__:
+        assert getattr(infn_ophyd_hal, name) is not None
+    assert 'OphydTmlMotor' in dir(infn_ophyd_hal)
+    with pytest.raises(AttributeError):
+        infn_ophyd_hal.NoSuchDevice
+
+
+def test_class_path_roundtrip():
+    assert class_path(OphydAISim) == 'infn_ophyd_hal.sim_devices:OphydAISim'
+    assert import_class_path(class_path(OphydAISim)) is OphydAISim
+    with pytest.raises(ValueError):
+        import_class_path('infn_ophyd_hal.sim_devices.OphydAISim')
+
+
+def test_power_supply_types_resolve_on_create():
+    PowerSupplyFactory.register_type('base', 'infn_ophyd_hal.ophyd_ps:OphydPS')
+    try:
+        ps = PowerSupplyFactory.create('base', 'PS01', max_current=5)
+        assert isinstance(ps, OphydPS)
+        assert ps.max_current == 5
+        assert PowerSupplyFactory._registry['base'] is OphydPS
+    finally:
+        del PowerSupplyFactory._registry['base']
@@ -0,0 +1,110 @@
+"""Tests for per-signal metrics — runs without live EPICS IOCs."""
+
+import gc
+import urllib.request
+
+import pytest
+from ophyd import Component as Cpt, Signal
+from infn_ophyd_hal import (
+    MetricsRegistry,
+    OphydAI,
+    PrometheusHttpExporter,
+    PrometheusTextfileExporter,
+    default_metrics,
+    epik8sDevice,
+)
+from infn_ophyd_hal.metrics import LATENCY_BUCKETS, MetricsExporter
+
+
+class TimingOutSignal(Signal):
+    def get(self, **kwargs):
+        raise TimeoutError('no reply')
+
+
+class MeteredDevice(epik8sDevice):
+    value = Cpt(Signal, value=1.0)
+    stuck = Cpt(TimingOutSignal, value=0, kind='omitted')
+
+
+def test_counts_and_latency():
+    metrics = MetricsRegistry()
+    device = MeteredDevice('SOFT', name='dev')
+    assert metrics.instrument({'DEV': device}) == 2
+    assert metrics.instrument(device) == 0          # already instrumented
+    device.value.get()
+    device.value.put(2.0)                           # runs the value callbacks
+    device.read()
+    with pytest.raises(TimeoutError):
+        device.stuck.get()
+    stats = metrics.stats(device.value)
+    assert (stats.gets, stats.puts, stats.callbacks) == (2, 1, 1)
+    assert stats.get_seconds.count == 2 and sum(stats.get_seconds.counts) == 2
+    assert metrics.stats(device.stuck).timeouts == 1
+
+
+def test_destroyed_devices_leave_the_output():
+    metrics = MetricsRegistry()
+    device = MeteredDevice('SOFT', name='gone')
+    metrics.instrument(device)
+    assert len(metrics) == 2 and 'device="gone"' in metrics.render()
+    del device
+    gc.collect()
+    assert len(metrics) == 0 and 'device="gone"' not in metrics.render()
+
+
+def test_exporter_is_abstract():
+    with pytest.raises(TypeError):
+        MetricsExporter(MetricsRegistry())
+
+
+def test_disconnects_from_metadata():
+    metrics = MetricsRegistry()
+    device = MeteredDevice('SOFT', name='dev')
+    metrics.instrument(device, signals=['value'])
+    for connected in (True, False, False, True):
+        device.value._run_subs(sub_type=device.value.SUB_META, connected=connected)
+    assert metrics.stats(device.value).disconnects == 1
+    assert metrics.stats(device.stuck) is None
+
+
+def test_prometheus_text():
+    metrics = MetricsRegistry()
+    device = MeteredDevice('SOFT', name='dev', config={'iocname': 'soft-ioc'})
+    metrics.instrument(device, signals=['value'])
+    device.value.get()
+    text = metrics.render()
+    labels = 'device="dev",signal="value",iocname="soft-ioc",pv=""'
+    assert '# TYPE epik8s_signal_gets_total counter' in text
+    assert f'epik8s_signal_gets_total{{{labels}}} 1' in text
+    assert f'epik8s_signal_get_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+    assert f'epik8s_signal_get_seconds_count{{{labels}}} 1' in text
+    assert text.count('epik8s_signal_get_seconds_bucket') == len(LATENCY_BUCKETS) + 1
+    assert 'epik8s_signal_put_seconds_bucket' not in text
+
+
+def test_config_enables_metrics():
+    ai = OphydAI('INFN:OPHYD:HAL:TEST:NOIOC:AI', name='ai', defer_connect=True,
+                 config={'metrics': True, 'iocname': 'ai-ioc'})
+    stats = default_metrics().stats(ai.user_readback)
+    assert stats is not None
+    assert dict(stats.labels)['pv'] == 'INFN:OPHYD:HAL:TEST:NOIOC:AI:AI_RB'
+
+
+def test_http_exporter():
+    metrics = MetricsRegistry()
+    device = MeteredDevice('SOFT', name='dev')      # series live with the device
+    metrics.instrument(device, signals=['value'])
+    with PrometheusHttpExporter(metrics, port=0, addr='127.0.0.1') as exporter:
+        url = f'http://127.0.0.1:{exporter.port}/metrics'
+        with urllib.request.urlopen(url, timeout=5) as reply:
+            assert reply.headers['Content-Type'].startswith('text/plain')
+            assert 'epik8s_signal_gets_total{device="dev"' in reply.read().decode()
+
+
+def test_textfile_exporter(tmp_path):
+    metrics = MetricsRegistry()
+    device = MeteredDevice('SOFT', name='dev')      # series live with the device
+    metrics.instrument(device, signals=['value'])
+    path = tmp_path / 'ophyd.prom'
+    with PrometheusTextfileExporter(str(path), metrics, interval=60):
+        assert 'epik8s_signal_puts_total' in path.read_text()
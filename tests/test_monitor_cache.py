@@ -0,0 +1,122 @@
+"""Tests for the monitor-backed readback cache — runs without live EPICS IOCs."""
+
+import time
+
+import pytest
+from ophyd import Signal
+from infn_ophyd_hal import OphydAI, OphydAsynMotor, OphydPSUnimag, SppOphydBpm
+from infn_ophyd_hal.monitor_cache import MonitoredReadback, cache_settings
+
+NOIOC = 'INFN:OPHYD:HAL:TEST:NOIOC'
+
+
+class RecordingSignal(Signal):
+    """Soft signal recording the use_monitor of each get()."""
+
+    _auto_monitor = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    def get(self, use_monitor=None, **kwargs):
+        self.calls.append(self._auto_monitor if use_monitor is None else use_monitor)
+        return super().get()
+
+
+@pytest.mark.parametrize('config, expected', [
+    (None, (None, None)),
+    ({}, (None, None)),
+    ({'cache': 'monitor'}, ('monitor', None)),
+    ({'cache': 'MONITOR'}, ('monitor', None)),
+    ({'cache': 'none'}, (None, None)),
+    ({'cache': {'max_age': '1.5'}}, ('monitor', 1.5)),
+    ({'cache': {'mode': 'monitor', 'max_age': 0}}, ('monitor', None)),
+    ({'cache': 'polling'}, (None, None)),
+    ({'cache': {'mode': 'monitor', 'max_age': 'soon'}}, (None, None)),
+])
+def test_cache_settings(config, expected):
+    assert cache_settings(config) == expected
+
+
+def test_get_served_from_monitor():
+    signal = RecordingSignal(name='sig', value=1.0)
+    MonitoredReadback(signal)
+    assert signal.get() == 1.0
+    assert signal.read()['sig']['value'] == 1.0
+    assert signal.calls == [True, True]
+    signal.get(use_monitor=False)
+    assert signal.calls[-1] is False
+
+
+def test_max_age_falls_back_to_real_get():
+    signal = RecordingSignal(name='sig', value=1.0)
+    readback = MonitoredReadback(signal, max_age=0.05)
+    signal.get()                    # never updated: real get
+    signal.get()                    # just refreshed: cached
+    signal.put(2.0)                 # monitor update
+    assert signal.get() == 2.0
+    time.sleep(0.1)
+    signal.get()                    # stale: real get
+    assert signal.calls == [False, True, True, False]
+    readback.remove()
+    signal.get()
+    assert signal.calls[-1] is False and 'get' not in vars(signal)
+
+
+def test_device_config_enables_cache():
+    bpm = SppOphydBpm(f'{NOIOC}:BPM', name='bpm', defer_connect=True,
+                      config={'cache': {'mode': 'monitor', 'max_age': 2}})
+    assert bpm.monitor_cached and sorted(bpm._monitor_cache) == ['sum', 'x', 'y']
+    assert bpm.x._auto_monitor and bpm.x._read_pv.auto_monitor
+    assert not bpm.va._auto_monitor
+    assert bpm._monitor_cache['x'].max_age == 2.0
+
+
+def test_asyn_motor_keeps_config():
+    motor = OphydAsynMotor(f'{NOIOC}:MOT', name='mot', defer_connect=True,
+                           config={'cache': 'monitor', 'iocname': 'mot-ioc'})
+    assert motor.get_config()['iocname'] == 'mot-ioc'
+    assert motor.monitor_cached and sorted(motor._monitor_cache) == ['user_readback']
+
+
+def test_no_cache_by_default():
+    ai = OphydAI(f'{NOIOC}:AI', name='ai', defer_connect=True)
+    assert not ai.monitor_cached and 'get' not in vars(ai.user_readback)
+
+
+def test_reconfigure_toggles_cache():
+    ai = OphydAI(f'{NOIOC}:AI', name='ai', defer_connect=True)
+    ai.reconfigure({'cache': 'monitor'})
+    assert ai.monitor_cached and ai.user_readback._auto_monitor
+    ai.reconfigure({'cache': {'max_age': 3}})
+    assert ai._monitor_cache['user_readback'].max_age == 3.0
+    ai.reconfigure({})
+    assert not ai.monitor_cached and not ai.user_readback._auto_monitor
+
+
+def test_unimag_subscribes_in_monitor_mode():
+    ps = OphydPSUnimag(name='q1', prefix=f'{NOIOC}:Q1', defer_connect=True,
+                       config={'cache': 'monitor'})
+    assert ps.monitor_cached
+    assert ps.current_rb._callbacks[ps.current_rb.SUB_VALUE]
+    plain = OphydPSUnimag(name='q2', prefix=f'{NOIOC}:Q2', defer_connect=True)
+    assert not plain.current_rb._callbacks[plain.current_rb.SUB_VALUE]
+
+
+def test_remove_keeps_previous_monitoring():
+    signal = RecordingSignal(name='sig', value=1.0)
+    signal._auto_monitor = True
+    MonitoredReadback(signal).remove()
+    assert signal._auto_monitor
+
+
+def test_unimag_subscribes_when_reconfigured():
+    ps = OphydPSUnimag(name='q3', prefix=f'{NOIOC}:Q3', defer_connect=True)
+    ps.reconfigure({'cache': 'monitor'})
+    ps.reconfigure({'cache': {'mode': 'monitor', 'max_age': 1}})
+    # cache update, stored state and dispatched callback, each subscribed once
+    assert len(ps.current_rb._callbacks[ps.current_rb.SUB_VALUE]) == 3
+    assert ps.state_rb._callbacks[ps.state_rb.SUB_VALUE]
+    ps.reconfigure({})
+    assert not ps.current_rb._callbacks[ps.current_rb.SUB_VALUE]
@@ -0,0 +1,75 @@
+"""Tests for the DeviceFactory start-up profiler."""
+
+import json
+
+from infn_ophyd_hal import DeviceFactory
+
+from test_connection import PrimedDevice, primed_config
+from test_device_factory import SlowSim, sim_config, slow_config
+
+
+def test_phases_recorded():
+    factory = DeviceFactory(profile=True)
+    factory.register_device_type('io', 'slow', SlowSim)
+    devices = factory.create_devices_from_config(slow_config(2, 3), max_workers=4)
+    report = factory.startup_profile.report()
+
+    assert [d['key'] for d in report['devices']] == list(devices)
+    for device in report['devices']:
+        assert device['class'] == 'SlowSim'
+        assert device['construct'] >= 0.02
+        assert device['merge'] is not None and device['filter'] is not None
+        assert device['connect'] is not None
+        assert device['first_get'] is not None
+        assert device['connected'] is True
+    assert report['wall_time'] > 0
+    assert report['phases']['construct'] >= 6 * 0.02
+    assert sum(b['count'] for b in report['histogram']) == 6
+    assert set(report['iocs']) == {'ioc0', 'ioc1'}
+    assert report['iocs']['ioc0']['devices'] == 3
+    json.dumps(report)
+
+
+def test_connect_measured_from_bulk_wait():
+    factory = DeviceFactory(profile=True)
+    factory.register_device_type('io', 'slow', SlowSim)
+    factory.create_devices_from_config(slow_config(2, 3))
+    report = factory.startup_profile.report()
+    # built one after the other: the first device must not be charged
+    # for the construction of the five after it
+    assert report['phases']['construct'] >= 6 * 0.02
+    assert max(d['connect'] for d in report['devices']) < 5 * 0.02
+
+
+def test_filtered_devices_count_in_ioc_totals():
+    factory = DeviceFactory(profile=True)
+    devices = factory.create_devices_from_config(sim_config(), name_pattern='^M1$')
+    report = factory.startup_profile.report()
+    assert list(devices) == ['M1']
+    assert [d['key'] for d in report['devices']] == ['M1']
+    assert report['iocs']['motsim1']['devices'] == 1
+    assert report['iocs']['bpmsim']['devices'] == 0
+    assert report['iocs']['bpmsim']['filter'] > 0
+
+
+def test_deferred_reads_run_once():
+    factory = DeviceFactory(profile=True)
+    factory.register_device_type('io', 'primed', PrimedDevice)
+    devices = factory.create_devices_from_config(primed_config())
+    assert [d.primed for d in devices.values()] == [1, 1]
+    assert factory.last_connection_report.ok
+
+
+def test_summary_and_clear():
+    factory = DeviceFactory(profile=True)
+    factory.create_devices_from_config(sim_config())
+    summary = factory.startup_profile.summary(slowest=3)
+    assert 'slowest devices' in summary
+    assert 'motsim1 (3)' in summary
+    assert 'histogram' in summary
+    factory.startup_profile.clear()
+    assert factory.startup_profile.report()['devices'] == []
+
+
+def test_off_by_default(factory):
+    assert factory.startup_profile is None
@@ -0,0 +1,140 @@
+"""Tests for machine snapshot and restore — runs without live EPICS IOCs."""
+
+import threading
+
+from ophyd import Component as Cpt, Signal
+from infn_ophyd_hal import (
+    OphydAO,
+    Snapshot,
+    diff_snapshot,
+    epik8sDevice,
+    restore_snapshot,
+    take_snapshot,
+)
+
+from test_batch_read import CaSignal, fake_ca  # noqa: F401 (fixture)
+
+ORDER = []
+ORDER_LOCK = threading.Lock()
+
+
+class OrderedSignal(Signal):
+    """Soft signal recording the order of the puts."""
+
+    def put(self, value, **kwargs):
+        with ORDER_LOCK:
+            ORDER.append((self.parent.name, self.attr_name))
+        super().put(value, **kwargs)
+
+
+class SoftPS(epik8sDevice):
+    state = Cpt(OrderedSignal, value='OFF')
+    current = Cpt(OrderedSignal, value=0.0)
+    _setpoint_signals = ('state', 'current')
+
+
+class SoftAO(epik8sDevice):
+    user_setpoint = Cpt(OrderedSignal, value=0)
+    _setpoint_signals = ('user_setpoint',)
+
+
+class NoSetpoints(epik8sDevice):
+    value = Cpt(Signal, value=1.0)
+
+
+class CaPS(epik8sDevice):
+    state = Cpt(CaSignal, value='OFF')
+    current = Cpt(CaSignal, value=0.0)
+    _setpoint_signals = ('state', 'current')
+
+
+def machine():
+    devices = {f'PS{i}': SoftPS('SOFT', name=f'ps{i}') for i in range(3)}
+    devices['AO'] = SoftAO('SOFT', name='ao')
+    devices['OTHER'] = NoSetpoints('SOFT', name='other')
+    return devices
+
+
+def test_snapshot_columns():
+    devices = machine()
+    devices['PS1'].current.put(2.5)
+    snapshot = take_snapshot(devices)
+    assert len(snapshot) == 7 and not snapshot.failed
+    assert snapshot.value('PS1', 'current') == 2.5
+    assert snapshot.value('PS0', 'state') == 'OFF'
+    assert isinstance(snapshot.value('AO', 'user_setpoint'), int)
+    assert 'OTHER' not in snapshot.keys.tolist()
+
+
+def test_save_and_load(tmp_path):
+    snapshot = take_snapshot(machine())
+    snapshot.failed = {'PS9': ['current']}
+    path = str(tmp_path / 'machine.npz')
+    snapshot.save(path)
+    loaded = Snapshot.load(path)
+    assert list(loaded.rows()) == list(snapshot.rows())
+    assert loaded.failed == {'PS9': ['current']}
+    assert loaded.taken_at == snapshot.taken_at
+
+
+def test_diff():
+    devices = machine()
+    snapshot = take_snapshot(devices)
+    assert len(diff_snapshot(snapshot, devices)) == 0
+    devices['PS2'].current.put(1.0)
+    devices['PS0'].state.put('ON')
+    del devices['AO']
+    diff = diff_snapshot(snapshot, devices)
+    assert sorted(diff.rows()) == [('AO', 'user_setpoint', 0, None),
+                                   ('PS0', 'state', 'OFF', 'ON'),
+                                   ('PS2', 'current', 0.0, 1.0)]
+    assert diff.delta[diff.changed & (snapshot.signals == 'current')].tolist() == [1.0]
+
+
+def test_restore_in_phases():
+    devices = machine()
+    snapshot = take_snapshot(devices)
+    for device in (devices['PS0'], devices['PS1']):
+        device.state.put('ON')
+        device.current.put(5.0)
+    devices['AO'].user_setpoint.put(3)
+    ORDER.clear()
+    report = restore_snapshot(snapshot, devices)
+    assert report.ok and report.unchanged == 2
+    assert {k: sorted(v) for k, v in report.written.items()} == {
+        'PS0': ['current', 'state'], 'PS1': ['current', 'state'], 'AO': ['user_setpoint']}
+    # every state (and the AO) is written before any current
+    signals = [signal for _, signal in ORDER]
+    assert signals.index('current') == 3 and set(signals[3:]) == {'current'}
+    assert len(diff_snapshot(snapshot, devices)) == 0
+
+
+def test_restore_selected_keys_and_missing_devices():
+    devices = machine()
+    snapshot = take_snapshot(devices)
+    devices['PS0'].current.put(1.0)
+    devices['PS1'].current.put(1.0)
+    report = restore_snapshot(snapshot, devices, keys=['PS0'], only_changed=False)
+    assert report.written == {'PS0': ['state', 'current']}
+    assert devices['PS1'].current.get() == 1.0
+    del devices['PS2']
+    assert restore_snapshot(snapshot, devices).failed == {'PS2': ['state', 'current']}
+
+
+def test_disconnected_setpoints_fail():
+    ao = OphydAO('INFN:OPHYD:HAL:TEST:NOIOC:AO', name='ao', defer_connect=True)
+    snapshot = take_snapshot({'AO': ao}, timeout=0.5)
+    assert len(snapshot) == 0 and snapshot.failed == {'AO': ['user_setpoint']}
+
+
+def test_ca_setpoints_restore_only_changed(fake_ca):
+    devices = {f'PS{i}': CaPS('CA:PS', name=f'ps{i}') for i in range(3)}
+    devices['PS1'].current.put(2.5)
+    snapshot = take_snapshot(devices)
+    assert len(snapshot) == 6 and not snapshot.failed
+    assert snapshot.value('PS1', 'current') == 2.5
+    devices['PS2'].current.put(4.0)
+    assert [row[:2] for row in diff_snapshot(snapshot, devices).rows()] == [('PS2', 'current')]
+    report = restore_snapshot(snapshot, devices)
+    assert report.written == {'PS2': ['current']} and report.unchanged == 5
+    assert devices['PS2'].current.get() == 0.0
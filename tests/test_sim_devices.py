@@ -37,7 +37,7 @@ class TestDeviceFactory:
     def test_factory_generic_mot_is_asyn(self, factory):
         """devtype='generic' for mot group must resolve to the asyn motor class."""
         from infn_ophyd_hal.asyn_ophyd_motor import OphydAsynMotor
-        cls = factory._device_map.get(('mot', 'generic'))
+        cls = factory._resolve_device_class('mot', 'generic')
         assert cls is OphydAsynMotor
 
     def test_factory_unknown_type_returns_none(self, factory):
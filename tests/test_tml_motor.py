@@ -0,0 +1,208 @@
+"""Tests for the TML motor command handshake — runs without live EPICS IOCs."""
+
+import threading
+import time
+
+import pytest
+from ophyd import Component as Cpt, Signal
+from infn_ophyd_hal import OphydTmlMotor, default_dispatcher
+from infn_ophyd_hal.tml_ophyd_motor import (
+    CMD_ABS_POS,
+    CMD_NONE,
+    CMD_REL_POS,
+    MSTA_HOMED,
+    MSTA_LSN,
+    MSTA_LSP,
+    MSTA_MOVING,
+    MotorStatus,
+    RUN,
+)
+
+
+class SoftTmlMotor(OphydTmlMotor):
+    """OphydTmlMotor with its PVs replaced by soft signals."""
+    mot_msta = Cpt(Signal, value=0)
+    mot_stat = Cpt(Signal, value=0)
+    user_readback = Cpt(Signal, value=0)
+    mot_msgs = Cpt(Signal, value='')
+    mot_act_sp = Cpt(Signal, value=0)
+    mot_act_rb = Cpt(Signal, value=0)
+    mot_actx_sp = Cpt(Signal, value=0)
+    user_setpoint = Cpt(Signal, value=0)
+    mot_val_rb = Cpt(Signal, value=0)
+    motor_moving = Cpt(Signal, value=0)
+    motor_done_move = Cpt(Signal, value=1)
+
+
+class FakeController:
+    """Acknowledges writes after ``ack_delay`` and moves for ``move_time``.
+
+    Like CA monitors, the acknowledge readbacks are only posted when their
+    value changes. The final readback is off the setpoint by ``error``;
+    ``reports_moving`` False leaves the MSTA moving bit down, as for a move
+    shorter than the MSTA update period, and ``creep`` posts a readback
+    that far from the setpoint half way through the move.
+    """
+
+    def __init__(self, motor, ack_delay=0.05, move_time=0.2, starts=True,
+                 error=0.0, reports_moving=True, creep=None):
+        self.motor = motor
+        self.ack_delay = ack_delay
+        self.move_time = move_time
+        self.starts = starts
+        self.error = error
+        self.reports_moving = reports_moving
+        self.creep = creep
+        self.acks_commands = True
+        # first monitor update of a connected IOC
+        motor.mot_msta.put(0)
+        motor.user_setpoint.subscribe(self._on_setpoint, run=False)
+        motor.mot_act_sp.subscribe(self._on_action, run=False)
+        motor.mot_actx_sp.subscribe(self._on_run, run=False)
+
+    def _later(self, delay, fn):
+        timer = threading.Timer(delay, fn)
+        timer.daemon = True
+        timer.start()
+
+    def _post(self, readback, value):
+        if readback.get() != value:
+            readback.put(value)
+
+    def _on_setpoint(self, value, **kwargs):
+        self._later(self.ack_delay, lambda: self._post(self.motor.mot_val_rb, value))
+
+    def _on_action(self, value, **kwargs):
+        if self.acks_commands:
+            self._later(self.ack_delay, lambda: self._post(self.motor.mot_act_rb, value))
+
+    def _on_run(self, value, **kwargs):
+        if value == RUN and self.starts:
+            self._later(self.ack_delay, self._move)
+
+    def _move(self):
+        motor = self.motor
+        if self.reports_moving:
+            motor.mot_msta.put(MSTA_MOVING)
+        if self.creep is not None:
+            time.sleep(self.move_time / 2)
+            motor.user_readback.put(motor.user_setpoint.get() - self.creep)
+            time.sleep(self.move_time / 2)
+        else:
+            time.sleep(self.move_time)
+        motor.user_readback.put(motor.user_setpoint.get() + self.error)
+        if self.reports_moving:
+            motor.mot_msta.put(0)
+
+
+def make_motor(**motor_cfg):
+    return SoftTmlMotor('SOFT:TML', name='tml', config={'motor': motor_cfg})
+
+
+def test_move_follows_readbacks():
+    motor = make_motor()
+    FakeController(motor)
+    start = time.monotonic()
+    status = motor.set(1000)
+    elapsed = time.monotonic() - start
+    assert status.done and status.success
+    assert motor.position == 1000 and motor.mot_act_rb.get() == CMD_ABS_POS
+    # three acknowledges and a 0.2 s move, not the former 6 s of sleeps
+    assert elapsed < 2.0
+
+
+def test_unchanged_readbacks_acknowledge():
+    motor = make_motor(ack_timeout=0.3)
+    controller = FakeController(motor)
+    motor.set(1000)
+    motor.set(2000)                 # ACT_RB not posted again: still CMD_ABS_POS
+    assert motor.position == 2000
+    motor.set_rel(5, wait=False)
+    motor.set_rel(5, wait=False)    # VAL_RB not posted again: still 5
+    assert motor.mot_act_rb.get() == CMD_REL_POS
+    # ACT_RB still holds CMD_REL_POS: not an acknowledge of CMD_ABS_POS
+    controller.acks_commands = False
+    with pytest.raises(TimeoutError):
+        motor.set(3000)
+
+
+def test_stale_readback_needs_an_update():
+    motor = make_motor(ack_timeout=0.3)
+    FakeController(motor, ack_delay=1.0)
+    motor.mot_val_rb.put(1000)
+    motor.user_setpoint.put(1000)   # written after VAL_RB last reported
+    with pytest.raises(TimeoutError):
+        motor.set(1000.0005)
+
+
+def test_readback_near_target_counts_as_started():
+    motor = make_motor(start_timeout=0.5, settle_time=0.1)
+    FakeController(motor, move_time=0.05, error=0.5, reports_moving=False)
+    status = motor.set(1000)
+    assert status.done and motor.position == 1000.5
+
+
+def test_short_move_waits_for_settled_readback():
+    motor = make_motor(settle_time=0.3)
+    FakeController(motor, move_time=0.4, reports_moving=False, creep=5)
+    status = motor.set(1000)
+    assert status.done and status.success and motor.position == 1000
+
+
+def test_no_wait_returns_running_status():
+    motor = make_motor()
+    FakeController(motor, move_time=0.3)
+    status = motor.set(500, wait=False)
+    assert not status.done
+    status.wait(2)
+    assert motor.position == 500
+
+
+def test_missing_ack_times_out():
+    motor = make_motor(ack_timeout=0.2)
+    controller = FakeController(motor)
+    controller.ack_delay = 1.0
+    with pytest.raises(TimeoutError):
+        motor.set(1000)
+
+
+def test_motor_not_starting():
+    motor = make_motor(ack_timeout=0.5, start_timeout=0.3)
+    FakeController(motor, starts=False)
+    start = time.monotonic()
+    with pytest.raises(RuntimeError):
+        motor.set(1000)
+    assert time.monotonic() - start < 2.0
+    assert motor.user_setpoint.get() == 0 and motor.mot_act_sp.get() == CMD_NONE
+
+
+def test_deadlines_reconfigured():
+    motor = make_motor()
+    assert (motor.ack_timeout, motor.start_timeout, motor.settle_time) == (2.0, 5.0, 0.5)
+    motor.reconfigure({'motor': {'ack_timeout': 1, 'start_timeout': 10, 'settle_time': 1}})
+    assert (motor.ack_timeout, motor.start_timeout, motor.settle_time) == (1.0, 10.0, 1.0)
+
+
+def test_motor_status_decoding():
+    assert MotorStatus.from_msta(MSTA_LSN).limit == -1
+    assert MotorStatus.from_msta(MSTA_LSP).limit == 1
+    assert MotorStatus.from_msta(MSTA_LSN | MSTA_LSP).limit == -1000
+    status = MotorStatus.from_msta(MSTA_HOMED | MSTA_MOVING | 1)
+    assert status.homed and status.moving and status.dir == 1 and not status.error
+    assert MotorStatus.from_msta(None) == MotorStatus.from_msta(0)
+
+
+def test_status_accessors_use_the_monitor():
+    motor = make_motor()
+    motor.mot_msta.put(MSTA_HOMED | MSTA_LSN | MSTA_LSP)
+    assert default_dispatcher().flush(2)
+    snapshot = motor.msta_status()
+
+    def no_get(*args, **kwargs):
+        raise AssertionError("MSTA read over the network")
+
+    motor.mot_msta.get = no_get
+    assert motor.ishomed() and not motor.iserror() and not motor.moving
+    assert motor.limit() == -1000 and motor.dir() == 0
+    assert "- lsp+lsn ERROR" in motor.decode()
+    assert motor.msta_status() is snapshot